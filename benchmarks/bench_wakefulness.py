@@ -0,0 +1,286 @@
+"""Benchmarks for eugeroic.
+
+Measures wakefulness enter and exit latency, the throughput of short back-to-back blocks, the CPU
+time consumed while a block is held, thread and file-descriptor counts during concurrent use, and
+the per-call overhead of stay_awake-wrapped functions, the per-item overhead of awake_iter over a
+plain generator, the per-task overhead of AwakeExecutor over a plain thread pool, and on Linux the
+cost of sampling activity from /proc for a number of processes, through either D-Bus transport.
+Results are written as JSON so that they can be compared between versions.
+
+Example:
+    $ python benchmarks/bench_wakefulness.py --bus fake --output bench_output.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+
+def _percentiles(samples_ns):
+    quantiles = statistics.quantiles(samples_ns, n=100, method="inclusive")
+    return {
+        "p50_us": quantiles[49] / 1000,
+        "p99_us": quantiles[98] / 1000,
+        "mean_us": statistics.fmean(samples_ns) / 1000,
+    }
+
+
+def _fd_count():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def bench_enter_exit_latency(iterations):
+    from eugeroic import wakefulness
+
+    def cycle():
+        block = wakefulness("Benchmark latency")
+        start = time.perf_counter_ns()
+        block.__enter__()
+        entered = time.perf_counter_ns()
+        block.__exit__(None, None, None)
+        exited = time.perf_counter_ns()
+        return entered - start, exited - entered
+
+    # The first cycle loads the driver and makes any connections
+    cold_enter_ns, cold_exit_ns = cycle()
+    enter_ns, exit_ns = zip(*(cycle() for _ in range(iterations)))
+    return {
+        "cold_enter_us": cold_enter_ns / 1000,
+        "cold_exit_us": cold_exit_ns / 1000,
+        "enter": _percentiles(enter_ns),
+        "exit": _percentiles(exit_ns),
+    }
+
+
+def bench_throughput(iterations):
+    from eugeroic import wakefulness
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with wakefulness("Benchmark throughput"):
+            pass
+    elapsed = time.perf_counter() - start
+    return {"blocks": iterations, "seconds": elapsed, "blocks_per_second": iterations / elapsed}
+
+
+def bench_held_cpu(seconds):
+    from eugeroic import wakefulness
+
+    with wakefulness("Benchmark held CPU"):
+        cpu_start = time.process_time()
+        time.sleep(seconds)
+        cpu_held = time.process_time() - cpu_start
+    return {"held_seconds": seconds, "cpu_seconds": cpu_held, "cpu_fraction": cpu_held / seconds}
+
+
+def bench_concurrent_resources(threads, seconds):
+    from eugeroic import wakefulness
+
+    with wakefulness("Benchmark warm up"):
+        pass
+    baseline = {"threads": threading.active_count(), "fds": _fd_count()}
+    entered = threading.Barrier(threads + 1)
+    release = threading.Event()
+
+    def worker(i):
+        with wakefulness(f"Benchmark worker {i}"):
+            entered.wait()
+            release.wait()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    entered.wait()
+    time.sleep(seconds)
+    during = {"threads": threading.active_count() - threads, "fds": _fd_count()}
+    release.set()
+    for w in workers:
+        w.join()
+    return {"holders": threads, "baseline": baseline, "during": during}
+
+
+def bench_decorator_overhead(iterations):
+    from eugeroic import stay_awake, wakefulness
+
+    def plain():
+        pass
+
+    @stay_awake("Benchmark decorator")
+    def decorated():
+        pass
+
+    def per_call_ns(f):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            f()
+        return (time.perf_counter_ns() - start) / iterations
+
+    plain_ns = per_call_ns(plain)
+    cold_ns = per_call_ns(decorated)
+    # With an outer block held, the decorated call costs only the registry increment
+    with wakefulness("Benchmark outer"):
+        nested_ns = per_call_ns(decorated)
+    return {
+        "plain_us": plain_ns / 1000,
+        "decorated_us": cold_ns / 1000,
+        "decorated_nested_us": nested_ns / 1000,
+        "overhead_us": (cold_ns - plain_ns) / 1000,
+        "nested_overhead_us": (nested_ns - plain_ns) / 1000,
+    }
+
+
+def bench_iterator_overhead(items):
+    from eugeroic import awake_iter
+
+    def plain(iterable):
+        for item in iterable:
+            yield item
+
+    def per_item_ns(iterator):
+        start = time.perf_counter_ns()
+        for _ in iterator:
+            pass
+        return (time.perf_counter_ns() - start) / items
+
+    # Both wrap the same iterable, so the difference is the cost of detecting stalls
+    plain_ns = per_item_ns(plain(range(items)))
+    awake_ns = per_item_ns(awake_iter(range(items), "Benchmark iterator"))
+    return {
+        "items": items,
+        "plain_generator_ns": plain_ns,
+        "awake_iter_ns": awake_ns,
+        "overhead_ns": awake_ns - plain_ns,
+    }
+
+
+def bench_executor_overhead(tasks):
+    from concurrent.futures import ThreadPoolExecutor, wait
+
+    from eugeroic.executors import AwakeExecutor
+
+    def per_task_us(executor):
+        with executor:
+            start = time.perf_counter_ns()
+            wait([executor.submit(int) for _ in range(tasks)])
+            return (time.perf_counter_ns() - start) / tasks / 1000
+
+    # Both run the same tasks on one worker, so the difference is the cost of counting them
+    plain_us = per_task_us(ThreadPoolExecutor(1))
+    awake = AwakeExecutor(ThreadPoolExecutor(1), "Benchmark executor")
+    awake_us = per_task_us(awake)
+    return {
+        "tasks": tasks,
+        "plain_executor_us": plain_us,
+        "awake_executor_us": awake_us,
+        "overhead_us": awake_us - plain_us,
+        "awake_seconds": awake.awake_seconds,
+    }
+
+
+def bench_activity_sampling(processes, samples):
+    import subprocess
+
+    from eugeroic.activity import ProcSampler
+
+    if not os.path.exists("/proc/stat"):
+        return None
+    children = [subprocess.Popen(["sleep", "60"]) for _ in range(processes)]
+    try:
+        with ProcSampler([c.pid for c in children], tree=False) as sampler:
+            sampler.sample()
+            start = time.process_time_ns()
+            for _ in range(samples):
+                sampler.sample()
+            per_sample_ns = (time.process_time_ns() - start) / samples
+            watched = len(sampler.pids)
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    return {
+        "processes": watched,
+        "per_sample_us": per_sample_ns / 1000,
+        # The fraction of one core used when sampling once per second
+        "core_fraction_at_1s": per_sample_ns / 1e9,
+    }
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--bus",
+        choices=["fake", "session"],
+        default="session",
+        help="use the in-process fake D-Bus, or the session bus given by DBUS_SESSION_BUS_ADDRESS",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["dbus-next", "wire"],
+        default="dbus-next",
+        help="the client through which the Linux driver speaks to the D-Bus",
+    )
+    parser.add_argument("--iterations", type=int, default=1000, help="iterations for timed loops")
+    parser.add_argument(
+        "--held-seconds", type=float, default=2.0, help="duration of the held block"
+    )
+    parser.add_argument("--threads", type=int, default=32, help="concurrent holders")
+    parser.add_argument(
+        "--sampled-processes", type=int, default=200, help="processes sampled from /proc"
+    )
+    parser.add_argument("--output", help="file to which JSON results are written (default stdout)")
+    args = parser.parse_args(argv)
+
+    if args.bus == "fake":
+        # Without a session bus address the Linux driver falls back to its in-process fake
+        os.environ.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    elif "DBUS_SESSION_BUS_ADDRESS" not in os.environ and sys.platform.startswith("linux"):
+        parser.error("--bus session requires DBUS_SESSION_BUS_ADDRESS")
+
+    import_start = time.perf_counter()
+    import eugeroic
+
+    import_seconds = time.perf_counter() - import_start
+    if sys.platform.startswith("linux"):
+        from eugeroic.drivers.linux.config import set_transport
+
+        set_transport(args.transport)
+
+    results = {
+        "eugeroic_version": eugeroic.__version__,
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "bus": args.bus,
+        "transport": args.transport,
+        "import_ms": import_seconds * 1000,
+        "enter_exit_latency": bench_enter_exit_latency(args.iterations),
+        "throughput": bench_throughput(args.iterations),
+        "held_cpu": bench_held_cpu(args.held_seconds),
+        "concurrent_resources": bench_concurrent_resources(args.threads, 0.5),
+        "decorator_overhead": bench_decorator_overhead(args.iterations),
+        "iterator_overhead": bench_iterator_overhead(args.iterations * 1000),
+        "executor_overhead": bench_executor_overhead(args.iterations * 10),
+        "activity_sampling": bench_activity_sampling(args.sampled_processes, 20),
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+if test -z "$DBUS_SESSION_BUS_ADDRESS" ; then
+    echo "Starting dbus"
+    eval `dbus-launch --sh-syntax`
+    echo "D-Bus per-session daemon address is: $DBUS_SESSION_BUS_ADDRESS"
+fi
+python benchmarks/bench_wakefulness.py --bus fake --output bench_fake.json "$@"
+python benchmarks/bench_wakefulness.py --bus session --output bench_session.json "$@"
+python benchmarks/bench_wakefulness.py --bus session --transport wire --output bench_session_wire.json "$@"
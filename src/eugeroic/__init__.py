@@ -1,8 +1,28 @@
 from .version import __version__, __version_info__
-from .drivers import wakefulness
+from .drivers import awakefulness, flush, wakefulness
 from .decorator import stay_awake
 
 __all__ = [
+    "aawake_iter",
+    "awake_iter",
+    "awakefulness",
+    "flush",
+    "stats",
     "stay_awake",
     "wakefulness",
 ]
+
+# Imported on first use, so that importing eugeroic costs no more than the wakefulness blocks
+_lazy = {
+    "aawake_iter": "iterators",
+    "awake_iter": "iterators",
+    "stats": "metrics",
+}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        import importlib
+
+        return getattr(importlib.import_module(f".{_lazy[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
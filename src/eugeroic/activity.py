@@ -0,0 +1,465 @@
+"""Keep the display awake only while work is actually being done.
+
+An ActivityMonitor samples the load on the system at a regular interval, holding the OS-level
+inhibition while any of its thresholds is exceeded and releasing it after a sustained quiet
+period. It can watch system-wide CPU load, the CPU usage and disk I/O of a set of processes and
+their descendants, and the growth of output files.
+
+Samples are read from /proc, so activity monitoring is available only on Linux. Every /proc file
+is opened once and re-read in place with pread(), and only the fields needed are parsed, so that
+monitoring hundreds of processes at a one-second interval costs a small fraction of one core.
+Sampling runs on the shared timer thread, and needs no thread of its own. The display is held
+and released on the background thread of non-blocking wakefulness blocks, so that a slow platform
+delays neither sampling nor other timers.
+
+Example:
+
+    from eugeroic import wakefulness
+    from eugeroic.activity import ActivityMonitor
+
+    with wakefulness("Training", while_active=ActivityMonitor(pids=[pid], process_cpu=0.5)):
+        ...
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Optional
+
+from eugeroic.drivers.timers import Timer, call_later
+
+logger = logging.getLogger(__name__)
+
+PROC = "/proc"
+
+# The largest /proc/<pid>/stat or /proc/<pid>/io is well under this
+_READ_SIZE = 1024
+
+
+def _clock_ticks() -> int:
+    try:
+        return os.sysconf("SC_CLK_TCK")
+    except (AttributeError, ValueError, OSError):
+        return 100
+
+
+class Rates:
+    """The activity observed between two samples.
+
+    Attributes:
+        cpu: The fraction of the capacity of all CPUs which was busy, from 0 to 1.
+
+        process_cpu: The number of CPUs used by the watched processes.
+
+        io: The number of bytes per second read from and written to storage by the watched
+            processes.
+
+        growth: The number of bytes per second by which the watched files grew.
+    """
+
+    __slots__ = ("cpu", "process_cpu", "io", "growth")
+
+    def __init__(self, cpu: float, process_cpu: float, io: float, growth: float):
+        self.cpu = cpu
+        self.process_cpu = process_cpu
+        self.io = io
+        self.growth = growth
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(cpu={self.cpu:.3f}, process_cpu={self.process_cpu:.3f}, "
+            f"io={self.io:.0f}, growth={self.growth:.0f})"
+        )
+
+
+class _Process:
+    """The open /proc files of a watched process, and its counters at the last sample."""
+
+    __slots__ = ("pid", "stat_fd", "io_fd", "ticks", "io_bytes")
+
+    def __init__(self, pid: int, io: bool):
+        self.pid = pid
+        self.stat_fd = os.open(f"{PROC}/{pid}/stat", os.O_RDONLY)
+        self.io_fd = None
+        if io:
+            try:
+                self.io_fd = os.open(f"{PROC}/{pid}/io", os.O_RDONLY)
+            except PermissionError:
+                logger.debug("Cannot read the I/O counters of process %d", pid)
+        self.ticks: Optional[int] = None
+        self.io_bytes: Optional[int] = None
+
+    def close(self):
+        os.close(self.stat_fd)
+        if self.io_fd is not None:
+            os.close(self.io_fd)
+
+    def read_ticks(self) -> int:
+        data = os.pread(self.stat_fd, _READ_SIZE, 0)
+        # The command name, in parentheses, may itself contain spaces and parentheses
+        fields = data[data.rindex(b")") + 2 :].split(b" ", 13)
+        # utime and stime, the 14th and 15th fields of the whole line
+        return int(fields[11]) + int(fields[12])
+
+    def read_io_bytes(self) -> Optional[int]:
+        if self.io_fd is None:
+            return None
+        data = os.pread(self.io_fd, _READ_SIZE, 0)
+        total = 0
+        for line in data.splitlines():
+            if line.startswith((b"read_bytes:", b"write_bytes:")):
+                total += int(line.split(b":", 1)[1])
+        return total
+
+
+class ProcSampler:
+    """Samples the rates of activity of the system, of processes and of files, from /proc.
+
+    Args:
+        pids: The IDs of processes whose CPU usage and I/O to watch.
+
+        tree: If True, also watch the descendants of those processes, including those started
+            after sampling begins.
+
+        paths: The paths of files whose growth to watch. Files which do not exist are treated
+            as empty.
+
+        io: If True, read the I/O counters of the watched processes.
+
+        rescan: The minimum number of seconds between searches for new descendants.
+    """
+
+    def __init__(
+        self,
+        pids: Iterable[int] = (),
+        tree: bool = True,
+        paths: Iterable[str] = (),
+        io: bool = True,
+        rescan: float = 5.0,
+    ):
+        self._roots = set(pids)
+        self._tree = tree
+        self._paths = list(paths)
+        self._io = io
+        self._rescan = rescan
+        self._ticks_per_second = _clock_ticks()
+        self._stat_fd = os.open(f"{PROC}/stat", os.O_RDONLY)
+        self._processes: dict[int, _Process] = {}
+        self._last_scan = -float("inf")
+        self._time: Optional[float] = None
+        self._cpu: Optional[tuple[int, int]] = None
+        self._sizes: Optional[list[int]] = None
+        for pid in self._roots:
+            self._watch(pid)
+
+    def close(self):
+        """Close the /proc files held open."""
+        for process in self._processes.values():
+            process.close()
+        self._processes.clear()
+        if self._stat_fd is not None:
+            os.close(self._stat_fd)
+            self._stat_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    @property
+    def pids(self) -> set[int]:
+        """The IDs of the processes currently being watched."""
+        return set(self._processes)
+
+    def _watch(self, pid: int):
+        try:
+            self._processes[pid] = _Process(pid, self._io)
+        except (FileNotFoundError, ProcessLookupError):
+            pass
+
+    def _children(self, pid: int) -> list[int]:
+        children = []
+        try:
+            tids = os.listdir(f"{PROC}/{pid}/task")
+        except OSError:
+            return children
+        for tid in tids:
+            try:
+                with open(f"{PROC}/{pid}/task/{tid}/children", "rb") as f:
+                    children.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+        return children
+
+    def _scan_tree(self, now: float):
+        if not self._tree or now - self._last_scan < self._rescan:
+            return
+        self._last_scan = now
+        pending = list(self._processes)
+        while pending:
+            for child in self._children(pending.pop()):
+                if child not in self._processes:
+                    self._watch(child)
+                    if child in self._processes:
+                        pending.append(child)
+
+    def _read_cpu(self) -> tuple[int, int]:
+        data = os.pread(self._stat_fd, _READ_SIZE, 0)
+        # The first line, "cpu  user nice system idle iowait irq softirq steal ...", totals all CPUs
+        fields = data[: data.index(b"\n")].split()
+        times = [int(field) for field in fields[1:9]]
+        idle = times[3] + times[4]
+        total = sum(times)
+        return total - idle, total
+
+    def _read_sizes(self) -> list[int]:
+        sizes = []
+        for path in self._paths:
+            try:
+                sizes.append(os.stat(path).st_size)
+            except OSError:
+                sizes.append(0)
+        return sizes
+
+    def sample(self) -> Optional[Rates]:
+        """Take a sample.
+
+        Returns:
+            The rates of activity since the previous sample, or None for the first sample.
+        """
+        now = time.monotonic()
+        self._scan_tree(now)
+        busy, total = self._read_cpu()
+        sizes = self._read_sizes()
+        ticks = 0
+        io_bytes = 0
+        for pid, process in list(self._processes.items()):
+            try:
+                current_ticks = process.read_ticks()
+                current_io = process.read_io_bytes()
+            except (ProcessLookupError, OSError, ValueError):
+                # The process has exited
+                process.close()
+                del self._processes[pid]
+                continue
+            # Processes first seen in this sample contribute from the next
+            if process.ticks is not None:
+                ticks += current_ticks - process.ticks
+            if process.io_bytes is not None and current_io is not None:
+                io_bytes += current_io - process.io_bytes
+            process.ticks = current_ticks
+            process.io_bytes = current_io
+
+        previous_time, previous_cpu, previous_sizes = self._time, self._cpu, self._sizes
+        self._time, self._cpu, self._sizes = now, (busy, total), sizes
+        if previous_time is None:
+            return None
+        elapsed = max(now - previous_time, 1e-9)
+        total_delta = total - previous_cpu[1]
+        return Rates(
+            cpu=(busy - previous_cpu[0]) / total_delta if total_delta > 0 else 0.0,
+            process_cpu=ticks / self._ticks_per_second / elapsed,
+            io=io_bytes / elapsed,
+            growth=sum(max(0, size - before) for size, before in zip(sizes, previous_sizes))
+            / elapsed,
+        )
+
+
+class ActivityMonitor:
+    """Holds the display awake while activity exceeds any of a number of thresholds.
+
+    Pass an ActivityMonitor as the while_active argument of wakefulness() or awakefulness(). For
+    the duration of the block, the monitor samples activity every interval seconds. The
+    inhibition is acquired as soon as a sample exceeds any threshold, and released once no
+    sample has for quiet seconds.
+
+    Args:
+        cpu: The fraction of the capacity of all CPUs, from 0 to 1, above which the system is
+            busy.
+
+        pids: The IDs of processes to watch, with process_cpu or io.
+
+        tree: If True, also watch the descendants of those processes.
+
+        process_cpu: The number of CPUs used by the watched processes above which they are busy.
+
+        io: The number of bytes per second read from or written to storage by the watched
+            processes above which they are busy.
+
+        paths: The paths of files to watch, with growth.
+
+        growth: The number of bytes per second by which the watched files must grow for them to
+            be busy.
+
+        interval: The number of seconds between samples.
+
+        quiet: The number of seconds without activity after which the inhibition is released.
+
+    Raises:
+        ValueError: If no threshold is given, or a threshold is given without anything to watch.
+    """
+
+    def __init__(
+        self,
+        *,
+        cpu: Optional[float] = None,
+        pids: Iterable[int] = (),
+        tree: bool = True,
+        process_cpu: Optional[float] = None,
+        io: Optional[float] = None,
+        paths: Iterable[str] = (),
+        growth: Optional[float] = None,
+        interval: float = 1.0,
+        quiet: float = 60.0,
+    ):
+        self.pids = list(pids)
+        self.paths = list(paths)
+        if cpu is None and process_cpu is None and io is None and growth is None:
+            raise ValueError("At least one of cpu, process_cpu, io or growth is required")
+        if (process_cpu is not None or io is not None) and not self.pids:
+            raise ValueError("process_cpu and io require pids to watch")
+        if growth is not None and not self.paths:
+            raise ValueError("growth requires paths to watch")
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, not {interval!r}")
+        self.cpu = cpu
+        self.tree = tree
+        self.process_cpu = process_cpu
+        self.io = io
+        self.growth = growth
+        self.interval = interval
+        self.quiet = quiet
+        self._lock = threading.Lock()
+        self._sampler: Optional[ProcSampler] = None
+        self._timer: Optional[Timer] = None
+        self._acquire: Optional[Callable[[], None]] = None
+        self._release: Optional[Callable[[], None]] = None
+        # Whether the latest samples call for the display to be held, and whether it is. They
+        # differ while the holder is being acquired or released on the background thread, which
+        # alone changes _held.
+        self._active = False
+        self._held = False
+        self._last_active = 0.0
+        self._rates: Optional[Rates] = None
+        # Incremented on each start() and stop(), so that a sample in progress can tell whether
+        # it should schedule the next
+        self._generation = 0
+
+    @property
+    def held(self) -> bool:
+        """True while the monitor is holding the display awake."""
+        return self._held
+
+    @property
+    def rates(self) -> Optional[Rates]:
+        """The rates of activity at the most recent sample, or None before the second."""
+        return self._rates
+
+    def is_active(self, rates: Rates) -> bool:
+        """True if any of the rates exceeds its threshold."""
+        return (
+            (self.cpu is not None and rates.cpu > self.cpu)
+            or (self.process_cpu is not None and rates.process_cpu > self.process_cpu)
+            or (self.io is not None and rates.io > self.io)
+            or (self.growth is not None and rates.growth > self.growth)
+        )
+
+    def start(self, acquire: Callable[[], None], release: Callable[[], None]):
+        """Start sampling, calling acquire and release as activity starts and stops.
+
+        Raises:
+            OSError: If /proc cannot be read.
+        """
+        sampler = ProcSampler(self.pids, self.tree, self.paths, io=self.io is not None)
+        sampler.sample()
+        with self._lock:
+            if self._sampler is not None:
+                sampler.close()
+                raise RuntimeError("ActivityMonitor is already running")
+            self._generation += 1
+            self._sampler = sampler
+            self._acquire = acquire
+            self._release = release
+            self._timer = call_later(self.interval, self._tick, self._generation)
+
+    def stop(self):
+        """Stop sampling, releasing the display if it is being held.
+
+        Waits for any acquisition or release still in progress on the background thread.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._sampler is not None:
+                self._sampler.close()
+                self._sampler = None
+            busy = self._active or self._held
+            self._active = False
+            release = self._release
+            self._acquire = self._release = None
+        if busy:
+            from eugeroic.drivers.background import background
+
+            # After any change already queued, so that _held is settled
+            background.submit(self._release_if_held, release).result()
+
+    def _tick(self, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            try:
+                acquire = self._sample()
+            except Exception as e:
+                logger.warning("Could not sample activity: %s", e)
+                acquire = None
+            self._timer = call_later(self.interval, self._tick, generation)
+        if acquire is not None:
+            from eugeroic.drivers.background import background
+
+            # Acquiring and releasing may block on the platform, so they are done in order on the
+            # background thread, rather than on the timer thread or while holding the lock
+            background.submit(self._change, generation, acquire)
+
+    def _sample(self) -> Optional[bool]:
+        """Sample activity, returning True to acquire, False to release, or None for no change."""
+        rates = self._rates = self._sampler.sample()
+        now = time.monotonic()
+        if rates is not None and self.is_active(rates):
+            self._last_active = now
+            if not self._active:
+                logger.debug("Activity started: %r", rates)
+                self._active = True
+                return True
+        elif self._active and now - self._last_active >= self.quiet:
+            logger.debug("Activity stopped for %g seconds: %r", self.quiet, rates)
+            self._active = False
+            return False
+        return None
+
+    def _change(self, generation: int, acquire: bool):
+        with self._lock:
+            if generation != self._generation:
+                # Stopped meanwhile, so stop() releases whatever is held
+                return
+            change = self._acquire if acquire else self._release
+        try:
+            change()
+        except Exception as e:
+            logger.warning("Could not %s the display: %s", "hold" if acquire else "release", e)
+            with self._lock:
+                if generation == self._generation:
+                    # Try again at the next sample
+                    self._active = not acquire
+            return
+        self._held = acquire
+
+    def _release_if_held(self, release: Callable[[], None]):
+        if self._held:
+            self._held = False
+            release()
@@ -1,28 +1,244 @@
 """A simple command-line interface for the eugeroic package.
 
-Keep the display away for a given number of seconds.
+Keep the display awake for a given number of seconds or while processes run, or run a daemon
+which keeps the display awake on behalf of other processes.
 
 Example:
     $ python -m eugeroic 60
+    $ python -m eugeroic run --reason "Nightly backup" -- rsync -a src/ dest/
+    $ python -m eugeroic run --while-pid 1234
+    $ python -m eugeroic active --pid 1234 --process-cpu 0.5 --quiet 120
+    $ python -m eugeroic serve &
+    $ python -m eugeroic hold 60 --reason "Nightly backup"
+    $ python -m eugeroic status
 """
 
 import argparse
+import os
+import signal
 import sys
 import time
 
-from eugeroic import wakefulness
+COMMANDS = ("sleep", "run", "active", "serve", "hold", "status")
+
+
+def _sleep(args):
+    from eugeroic import wakefulness
+
+    with wakefulness(args.reason):
+        time.sleep(args.seconds)
+
+
+def _run(args):
+    from eugeroic.processes import run, while_pids
+
+    command = args.command_args
+    if command and command[0] == "--":
+        command = command[1:]
+    if not command:
+        while_pids(args.while_pid, args.reason)
+        return 0
+    returncode = run(command, args.reason, pids=args.while_pid)
+    if returncode < 0:
+        # Terminated by a signal, so terminate in the same way, for the benefit of our parent
+        signum = -returncode
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+        return 128 + signum
+    return returncode
+
+
+def _active(args):
+    from eugeroic import wakefulness
+    from eugeroic.activity import ActivityMonitor
+    from eugeroic.processes import wait_for_exit
+
+    try:
+        monitor = ActivityMonitor(
+            cpu=args.cpu,
+            pids=args.pid,
+            process_cpu=args.process_cpu,
+            io=args.io,
+            paths=args.file,
+            growth=args.growth,
+            interval=args.interval,
+            quiet=args.quiet,
+        )
+    except ValueError as e:
+        args.parser.error(str(e))
+    try:
+        with wakefulness(args.reason, while_active=monitor):
+            if args.pid:
+                wait_for_exit(args.pid)
+            else:
+                while True:
+                    time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _serve(args):
+    import logging
+
+    from eugeroic.server import serve
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    serve(args.socket)
+
+
+def _hold(args):
+    from eugeroic.client import Client
+
+    with Client(args.socket) as client, client.lease(args.reason):
+        time.sleep(args.seconds)
+
+
+def _status(args):
+    from eugeroic.client import Client
+
+    try:
+        client = Client(args.socket)
+    except OSError as e:
+        print(f"eugeroic daemon not running: {e}", file=sys.stderr)
+        return 1
+    with client:
+        print(client.ping())
+        for lease_id, reason in client.leases().items():
+            print(f"{lease_id}\t{reason}")
+    return 0
 
 
 def main(argv=None):
     if argv is None:
         argv = sys.argv[1:]
-    parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("seconds", type=int, help="number of seconds to keep the display awake")
-    parser.add_argument("--reason", default="eugeroic", help="reason for keeping the display awake")
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    sleep_parser = subparsers.add_parser(
+        "sleep", help="keep the display awake for a number of seconds"
+    )
+    sleep_parser.add_argument(
+        "seconds", type=int, help="number of seconds to keep the display awake"
+    )
+    sleep_parser.add_argument(
+        "--reason", default="eugeroic", help="reason for keeping the display awake"
+    )
+    sleep_parser.set_defaults(func=_sleep)
+
+    run_parser = subparsers.add_parser(
+        "run",
+        help="keep the display awake while a command or other processes run",
+    )
+    run_parser.add_argument(
+        "--reason", default="eugeroic", help="reason for keeping the display awake"
+    )
+    run_parser.add_argument(
+        "--while-pid",
+        type=int,
+        action="append",
+        default=[],
+        metavar="PID",
+        help="also keep the display awake until the process PID exits; may be repeated",
+    )
+    run_parser.add_argument(
+        "command_args",
+        nargs=argparse.REMAINDER,
+        metavar="-- COMMAND [ARG ...]",
+        help="command to run, whose exit status is returned",
+    )
+    run_parser.set_defaults(func=_run)
+
+    active_parser = subparsers.add_parser(
+        "active",
+        help="keep the display awake only while the system or processes are busy",
+    )
+    active_parser.add_argument(
+        "--reason", default="eugeroic", help="reason for keeping the display awake"
+    )
+    active_parser.add_argument(
+        "--cpu",
+        type=float,
+        metavar="FRACTION",
+        help="busy while more than this fraction of all CPUs, from 0 to 1, is in use",
+    )
+    active_parser.add_argument(
+        "--pid",
+        type=int,
+        action="append",
+        default=[],
+        help="watch the process PID and its descendants, until they exit; may be repeated",
+    )
+    active_parser.add_argument(
+        "--process-cpu",
+        type=float,
+        metavar="CPUS",
+        help="busy while the watched processes use more than this many CPUs",
+    )
+    active_parser.add_argument(
+        "--io",
+        type=float,
+        metavar="BYTES",
+        help="busy while the watched processes read or write more than this many bytes per second",
+    )
+    active_parser.add_argument(
+        "--file",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="watch the growth of the file PATH; may be repeated",
+    )
+    active_parser.add_argument(
+        "--growth",
+        type=float,
+        metavar="BYTES",
+        help="busy while the watched files grow by more than this many bytes per second",
+    )
+    active_parser.add_argument(
+        "--interval", type=float, default=1.0, help="seconds between samples"
+    )
+    active_parser.add_argument(
+        "--quiet",
+        type=float,
+        default=60.0,
+        help="seconds without activity before releasing the display",
+    )
+    active_parser.set_defaults(func=_active, parser=active_parser)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="run a daemon which holds leases for clients"
+    )
+    serve_parser.add_argument("--socket", help="path of the daemon's socket")
+    serve_parser.add_argument("--verbose", action="store_true", help="log each lease")
+    serve_parser.set_defaults(func=_serve)
+
+    hold_parser = subparsers.add_parser(
+        "hold", help="hold a lease from the daemon for a number of seconds"
+    )
+    hold_parser.add_argument("seconds", type=float, help="number of seconds to hold the lease")
+    hold_parser.add_argument(
+        "--reason", default="eugeroic", help="reason for keeping the display awake"
+    )
+    hold_parser.add_argument("--socket", help="path of the daemon's socket")
+    hold_parser.set_defaults(func=_hold)
+
+    status_parser = subparsers.add_parser("status", help="list the leases held from the daemon")
+    status_parser.add_argument("--socket", help="path of the daemon's socket")
+    status_parser.set_defaults(func=_status)
+
+    if argv and argv[0] not in (*COMMANDS, "-h", "--help"):
+        # The original interface: eugeroic SECONDS [--reason REASON]
+        argv = ["sleep", *argv]
     args = parser.parse_args(argv)
-    with wakefulness(args.reason):
-        time.sleep(args.seconds)
+    if args.command is None:
+        parser.error("a number of seconds or a command is required")
+    if args.command == "run" and not args.command_args and not args.while_pid:
+        run_parser.error("a command or --while-pid is required")
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""A lightweight client for the eugeroic daemon.
+
+The client uses only the standard library socket module, so a short-lived process can keep the
+display awake through a running daemon (see eugeroic.server) without importing a platform driver
+or connecting to a bus itself.
+
+Example:
+
+    from eugeroic.client import Client
+
+    with Client() as client, client.lease("Nightly backup"):
+        ...
+"""
+
+import contextlib
+import os
+import socket
+import stat
+from collections.abc import Generator
+from typing import Optional
+
+
+def default_socket_path() -> str:
+    """The path of the daemon's socket.
+
+    Taken from the EUGEROIC_SOCKET environment variable if set, otherwise in the user's runtime
+    directory, or failing that in a directory of the user's own within /tmp, which the daemon
+    creates accessible only to the user.
+    """
+    try:
+        return os.environ["EUGEROIC_SOCKET"]
+    except KeyError:
+        pass
+    return os.path.join(_default_socket_directory(), "eugeroic.sock")
+
+
+def _default_socket_directory() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return runtime_dir
+    return f"/tmp/eugeroic-{os.getuid()}"
+
+
+def check_socket_directory(path: str):
+    """Check that nobody but the current user can have placed or replaced the socket at path.
+
+    Sockets in the default directories, which may be predictable, are only trusted if their
+    directory is owned by the current user and inaccessible to anybody else. Sockets elsewhere,
+    as given explicitly, are trusted as they are.
+
+    Raises:
+        PermissionError: If the socket is in a default directory which is not private to the user.
+
+        FileNotFoundError: If the socket is in a default directory which does not exist.
+    """
+    directory = os.path.dirname(path)
+    if directory != _default_socket_directory():
+        return
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{directory} is not a directory private to the current user")
+
+
+class DaemonError(Exception):
+    """The daemon refused a request."""
+
+
+class Client:
+    """A connection to the eugeroic daemon.
+
+    Every lease acquired through the connection is released when it is closed, including by
+    the client process exiting.
+
+    Args:
+        path: The path of the daemon's socket. Defaults to default_socket_path().
+
+        timeout: The maximum number of seconds to wait for the daemon to respond, or None to
+            wait indefinitely.
+
+    Raises:
+        OSError: If the daemon is not running, or its socket is in a default directory which is
+            not private to the current user.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = 5.0):
+        self.path = path or default_socket_path()
+        check_socket_directory(self.path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(timeout)
+            self._socket.connect(self.path)
+        except BaseException:
+            self._socket.close()
+            raise
+        self._file = self._socket.makefile("rwb", buffering=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Close the connection, releasing every lease acquired through it."""
+        self._file.close()
+        self._socket.close()
+
+    def _request(self, line: str) -> str:
+        if "\n" in line or "\r" in line:
+            raise ValueError("Requests cannot contain line breaks")
+        self._socket.sendall(f"{line}\n".encode("utf-8"))
+        response = self._readline()
+        status, _, rest = response.partition(" ")
+        if status != "OK":
+            raise DaemonError(rest)
+        return rest
+
+    def _readline(self) -> str:
+        data = self._file.readline()
+        if not data:
+            raise ConnectionError("Connection closed by the daemon")
+        return data.decode("utf-8").rstrip("\n")
+
+    def ping(self) -> str:
+        """The daemon's name and version."""
+        return self._request("PING")
+
+    def acquire(self, reason: str) -> str:
+        """Acquire a lease, keeping the display awake until it is released.
+
+        Args:
+            reason: The reason for keeping the display awake.
+
+        Returns:
+            The ID of the lease, to be passed to release().
+
+        Raises:
+            DaemonError: If the daemon could not keep the display awake.
+        """
+        return self._request(f"ACQUIRE {reason}")
+
+    def release(self, lease_id: str):
+        """Release a lease acquired through this connection.
+
+        Raises:
+            DaemonError: If no such lease is held by this connection.
+        """
+        self._request(f"RELEASE {lease_id}")
+
+    def leases(self) -> dict[str, str]:
+        """The reason for every lease held by any client of the daemon, by lease ID."""
+        count = int(self._request("LIST"))
+        leases = {}
+        for _ in range(count):
+            lease_id, _, reason = self._readline().partition(" ")
+            leases[lease_id] = reason
+        return leases
+
+    @contextlib.contextmanager
+    def lease(self, reason: str) -> Generator[str, None, None]:
+        """A context manager which holds a lease for its duration, yielding the lease ID."""
+        lease_id = self.acquire(reason)
+        try:
+            yield lease_id
+        finally:
+            self.release(lease_id)
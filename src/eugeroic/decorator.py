@@ -1,13 +1,15 @@
 import functools
-import inspect
 
-from eugeroic import wakefulness
+from eugeroic import awakefulness, wakefulness
 
 
-def stay_awake(arg=None, reason: str | None=None):
+def stay_awake(arg=None, reason: str | None = None, linger: float = 0.0):
     """A decorator to prevent the display from sleeping.
 
-    The display will be kept awake for the duration of the decorated function.
+    The display will be kept awake for the duration of the decorated function. If the decorated
+    function is a coroutine function the display is kept awake while the coroutine runs, and if it
+    is a generator or asynchronous generator function the display is kept awake until the
+    generator is exhausted or closed.
 
     This decorator may be used with or without arguments.
 
@@ -25,6 +27,10 @@ def stay_awake(arg=None, reason: str | None=None):
         def my_function():
             ...
 
+        @stay_awake(linger=5.0)
+        def my_short_batch_job():
+            ...
+
     Args:
         arg: Either the function to decorate, or the reason (see below) supplied as a positional
             argument.
@@ -32,18 +38,26 @@ def stay_awake(arg=None, reason: str | None=None):
         reason: An descriptive reason for keeping the display awake. If not provided the
             first line of the docstring of the decorated function will be used, or if not
             available the name of the decorated function will be used.
+
+        linger: The number of seconds for which to keep the display awake after the decorated
+            function returns, if nothing else is keeping it awake. A call made meanwhile reuses
+            the existing OS-level inhibition, so decorated functions called in quick succession
+            share one inhibition. Defaults to 0.
     """
 
+    # Imported here, rather than at module level, to keep the import of eugeroic itself cheap
+    import inspect
+
     if (not callable(arg)) and isinstance(arg, str):
         if  reason is None:
-            return functools.partial(stay_awake, reason=arg)
+            return functools.partial(stay_awake, reason=arg, linger=linger)
         else:
             raise TypeError(
                 "Cannot specify 'reason' as both a positional argument and "
                 "a keyword argument to stay_awake."
             )
     elif arg is None:
-        return functools.partial(stay_awake, reason=reason)
+        return functools.partial(stay_awake, reason=reason, linger=linger)
     else:
         f = arg
 
@@ -52,9 +66,47 @@ def stay_awake(arg=None, reason: str | None=None):
         docstring = docstring and docstring.splitlines()[0].strip()
         reason = docstring or f.__name__
 
-    @functools.wraps(f)
-    def wrapper(*args, **kwargs):
-        with wakefulness(reason):
-            return f(*args, **kwargs)
+    if inspect.iscoroutinefunction(f):
+
+        @functools.wraps(f)
+        async def wrapper(*args, **kwargs):
+            async with awakefulness(reason, linger=linger):
+                return await f(*args, **kwargs)
+
+    elif inspect.isasyncgenfunction(f):
+
+        @functools.wraps(f)
+        async def wrapper(*args, **kwargs):
+            async with awakefulness(reason, linger=linger):
+                agen = f(*args, **kwargs)
+                try:
+                    item = await agen.__anext__()
+                    while True:
+                        try:
+                            sent = yield item
+                        except GeneratorExit:
+                            raise
+                        except BaseException as e:
+                            item = await agen.athrow(e)
+                        else:
+                            item = await agen.asend(sent)
+                except StopAsyncIteration:
+                    pass
+                finally:
+                    await agen.aclose()
+
+    elif inspect.isgeneratorfunction(f):
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with wakefulness(reason, linger=linger):
+                return (yield from f(*args, **kwargs))
+
+    else:
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with wakefulness(reason, linger=linger):
+                return f(*args, **kwargs)
 
     return wrapper
@@ -1,25 +1,304 @@
 import sys
+import atexit
 import contextlib
+import functools
+import importlib
 import logging
-from collections.abc import Generator
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncGenerator, Generator
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from eugeroic.activity import ActivityMonitor
+    from eugeroic.drivers.breaker import BreakerState, CircuitBreaker
+    from eugeroic.drivers.heartbeat import Heartbeat
+
+    from .background import Handle
+    from .sharing import ChildChannels, ParentChannel
 
 logger = logging.getLogger(__name__)
 
 platform = sys.platform.lower()
 if platform == "win32":
-    from .windows.driver import wakefulness as _wakefulness
+    _driver_module = "windows"
 elif platform == "darwin":
-    from .macos.driver import wakefulness as _wakefulness
+    _driver_module = "macos"
 elif platform.startswith("linux"):
-    from .linux.driver import wakefulness as _wakefulness
+    _driver_module = "linux"
 else:
-    from .null.driver import wakefulness as _wakefulness
+    _driver_module = "null"
+
+# The platform driver, and the registry through which it is used, are only imported and
+# created when the first inhibition is requested, so that importing eugeroic doesn't pay
+# for platform dependencies (dbus_next, asyncio, PyObjC) which may never be used.
+_registry = None
+_registry_lock = threading.Lock()
+
+# Diverts inhibitions to the null driver while the platform driver is failing, created on first
+# use, as are the heartbeat and the metrics below
+_breaker: Optional["CircuitBreaker"] = None
+
+# Simulates user activity periodically while the OS-level inhibition is held, if enabled
+_heartbeat: Optional["Heartbeat"] = None
+
+# Records metrics of wakefulness blocks
+_metrics_module = None
+
+# Whether forked child processes share this process's inhibition, rather than making their own
+_fork_sharing = True
+
+# This process's connections to the children it has forked, and to the parent which forked it
+_children: Optional["ChildChannels"] = None
+_parent: Optional["ParentChannel"] = None
+
+
+def _get_breaker() -> "CircuitBreaker":
+    """The circuit breaker, created if necessary."""
+    global _breaker
+    if _breaker is None:
+        from .breaker import CircuitBreaker
+
+        _breaker = CircuitBreaker()
+    return _breaker
+
+
+def _get_heartbeat() -> "Heartbeat":
+    """The heartbeat, created if necessary."""
+    global _heartbeat
+    if _heartbeat is None:
+        from .heartbeat import Heartbeat
+
+        _heartbeat = Heartbeat()
+    return _heartbeat
+
+
+def _metrics():
+    """The metrics module, imported if necessary."""
+    global _metrics_module
+    if _metrics_module is None:
+        from eugeroic import metrics
+
+        _metrics_module = metrics
+    return _metrics_module
+
+
+def _driver(name: str = _driver_module):
+    """The platform driver module, imported if necessary."""
+    return importlib.import_module(f".{name}.driver", __name__)
+
+
+@contextlib.contextmanager
+def _guarded_wakefulness(driver, reason: str, wake: bool) -> Generator[None, None, None]:
+    """The driver's wakefulness, or the null driver's if the circuit breaker is open."""
+    breaker, heartbeat = _get_breaker(), _get_heartbeat()
+    if not breaker.allow():
+        logger.debug("Circuit breaker open; not inhibiting through the platform driver")
+        with _driver("null").wakefulness(logger, reason, wake):
+            yield
+        return
+    stack = contextlib.ExitStack()
+    try:
+        stack.enter_context(driver.wakefulness(logger, reason, wake))
+    except Exception as e:
+        breaker.record_failure(e)
+        raise
+    breaker.record_success()
+    _metrics().record_inhibition()
+    heartbeat.start(functools.partial(driver.simulate_user_activity, logger, reason))
+    try:
+        yield
+    finally:
+        heartbeat.stop()
+        try:
+            stack.close()
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+
+
+@contextlib.asynccontextmanager
+async def _guarded_awakefulness(driver, reason: str, wake: bool) -> AsyncGenerator[None, None]:
+    """The driver's awakefulness, or the null driver's if the circuit breaker is open."""
+    breaker, heartbeat = _get_breaker(), _get_heartbeat()
+    if not breaker.allow():
+        logger.debug("Circuit breaker open; not inhibiting through the platform driver")
+        async with _driver("null").awakefulness(logger, reason, wake):
+            yield
+        return
+    stack = contextlib.AsyncExitStack()
+    try:
+        await stack.enter_async_context(driver.awakefulness(logger, reason, wake))
+    except Exception as e:
+        breaker.record_failure(e)
+        raise
+    breaker.record_success()
+    _metrics().record_inhibition()
+    heartbeat.start(functools.partial(driver.simulate_user_activity, logger, reason))
+    try:
+        yield
+    finally:
+        heartbeat.stop()
+        try:
+            await stack.aclose()
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+
+
+@contextlib.contextmanager
+def _shared_wakefulness(driver, reason: str, wake: bool) -> Generator[None, None, None]:
+    """The parent process's inhibition if this is a forked child, else the guarded wakefulness."""
+    global _parent
+    parent = _parent
+    if parent is not None:
+        try:
+            parent.acquire(reason, wake)
+        except OSError as e:
+            logger.warning(
+                "Could not share the parent process's inhibition; inhibiting directly: %s", e
+            )
+            _parent = None
+        else:
+            try:
+                yield
+            finally:
+                parent.release()
+            return
+    with _guarded_wakefulness(driver, reason, wake):
+        yield
+
+
+@contextlib.asynccontextmanager
+async def _shared_awakefulness(driver, reason: str, wake: bool) -> AsyncGenerator[None, None]:
+    global _parent
+    parent = _parent
+    if parent is not None:
+        import asyncio
+
+        try:
+            # The parent may need to acquire its own inhibition before responding, so the
+            # request is made on a worker thread rather than blocking the event loop
+            await asyncio.to_thread(parent.acquire, reason, wake)
+        except OSError as e:
+            logger.warning(
+                "Could not share the parent process's inhibition; inhibiting directly: %s", e
+            )
+            _parent = None
+        else:
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(parent.release)
+            return
+    async with _guarded_awakefulness(driver, reason, wake):
+        yield
+
+
+def _get_registry():
+    """The registry of wakefulness holders, created if necessary."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from .registry import InhibitionRegistry
+
+                driver = _driver()
+
+                def inhibit(reason, wake):
+                    return _shared_wakefulness(driver, reason, wake)
+
+                def ainhibit(reason, wake):
+                    return _shared_awakefulness(driver, reason, wake)
+
+                _registry = InhibitionRegistry(inhibit, ainhibit)
+                # A lingering inhibition would otherwise be left to the OS to clean up
+                atexit.register(_registry.release_lingering)
+    return _registry
+
+
+def __getattr__(name):
+    if name == "registry":
+        return _get_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _acquire(registry, reason: str, wake: bool) -> float:
+    """Register a holder, recording metrics, and return the time at which it was registered."""
+    start = time.perf_counter()
+    try:
+        registry.acquire(reason, wake)
+    except Exception as e:
+        _metrics().record_error(reason, e)
+        raise
+    entered = time.perf_counter()
+    _metrics().record_acquire(reason, entered - start)
+    return entered
+
+
+def _release(registry, reason: str, linger: float, entered: float):
+    """Unregister a holder, recording metrics."""
+    exiting = time.perf_counter()
+    try:
+        registry.release(reason, linger)
+    except Exception as e:
+        _metrics().record_error(reason, e)
+        raise
+    finally:
+        _metrics().record_release(reason, time.perf_counter() - exiting, exiting - entered)
+
+
+async def _aacquire(registry, reason: str, wake: bool) -> float:
+    start = time.perf_counter()
+    try:
+        await registry.aacquire(reason, wake)
+    except Exception as e:
+        _metrics().record_error(reason, e)
+        raise
+    entered = time.perf_counter()
+    _metrics().record_acquire(reason, entered - start)
+    return entered
+
+
+async def _arelease(registry, reason: str, linger: float, entered: float):
+    exiting = time.perf_counter()
+    try:
+        await registry.arelease(reason, linger)
+    except Exception as e:
+        _metrics().record_error(reason, e)
+        raise
+    finally:
+        _metrics().record_release(reason, time.perf_counter() - exiting, exiting - entered)
+
+
+def _start_monitor(monitor: "ActivityMonitor", registry, reason: str, wake: bool, linger: float):
+    """Start an activity monitor acquiring and releasing a holder as activity comes and goes."""
+    entered = []
+
+    def acquire():
+        entered.append(_acquire(registry, reason, wake))
+
+    def release():
+        _release(registry, reason, linger, entered.pop())
+
+    monitor.start(acquire, release)
 
 
 @contextlib.contextmanager
-def wakefulness(reason: str, wake: bool=True) -> Generator[None, None, None]:
+def wakefulness(
+    reason: str,
+    wake: bool = True,
+    linger: float = 0.0,
+    blocking: bool = True,
+    while_active: Optional["ActivityMonitor"] = None,
+) -> Generator[Optional["Handle"], None, None]:
     """A context manager which prevents the display from sleeping.
 
+    Nested and concurrent wakefulness blocks, in any thread, share a single OS-level inhibition
+    which is held while at least one of them is active.
+
     Note:
         This will not awaken the display if it is already asleep.
 
@@ -27,10 +306,299 @@ def wakefulness(reason: str, wake: bool=True) -> Generator[None, None, None]:
         reason: The reason for keeping the display awake.
 
         wake: Whether to simulate user activity to awaken the display if it is already asleep.
-            Defaults to True.
+            Defaults to True. Only has an effect if no other wakefulness block is active.
+
+        linger: If this is the last wakefulness block to exit, the number of seconds for which
+            to keep the display awake afterwards. A wakefulness block entered meanwhile reuses
+            the existing OS-level inhibition at no cost. Defaults to 0, releasing immediately.
+            Any lingering inhibition is released when the interpreter exits.
+
+        blocking: If True (the default), entering waits until the display is being kept awake,
+            and exiting waits until it no longer is. If False, both return immediately, the
+            inhibition being acquired and released in the background, and the block yields a
+            Handle reporting the eventual outcome. Failures are then logged rather than raised.
+            Use flush() to wait for background operations to complete.
+
+        while_active: An eugeroic.activity.ActivityMonitor. If given, rather than for the whole
+            block, the display is kept awake only while the monitor observes activity, such as
+            CPU load or I/O, and is released after it has been quiet for a while.
+
+    Raises:
+        ValueError: If while_active is given and blocking is False.
     """
-    with _wakefulness(logger, reason, wake):
-        yield
+    logger.debug("Entering wakefulness state during: %r", reason)
+    try:
+        if while_active is not None and not blocking:
+            raise ValueError("while_active cannot be used with blocking=False")
+        registry = _get_registry()
+        if while_active is not None:
+            _start_monitor(while_active, registry, reason, wake, linger)
+            try:
+                yield
+            finally:
+                while_active.stop()
+            return
+        if not blocking:
+            from .background import background
+
+            handle = background.enter(reason, functools.partial(_acquire, registry, reason, wake))
+            try:
+                yield handle
+            finally:
+                background.exit(handle, functools.partial(_release, registry, reason, linger))
+            return
+        entered = _acquire(registry, reason, wake)
+        try:
+            yield
+        finally:
+            _release(registry, reason, linger, entered)
+    finally:
+        logger.debug("Exiting wakefulness state after: %r", reason)
+
+
+@contextlib.asynccontextmanager
+async def awakefulness(
+    reason: str,
+    wake: bool = True,
+    linger: float = 0.0,
+    blocking: bool = True,
+    while_active: Optional["ActivityMonitor"] = None,
+) -> AsyncGenerator[Optional["Handle"], None]:
+    """An asynchronous context manager which prevents the display from sleeping.
+
+    Where the platform driver communicates asynchronously, as on Linux, it does so directly on
+    the running event loop, so entering and exiting never blocks the loop. Asynchronous
+    wakefulness blocks share the same single OS-level inhibition as wakefulness blocks.
+
+    Note:
+        This will not awaken the display if it is already asleep.
+
+    Args:
+        reason: The reason for keeping the display awake.
+
+        wake: Whether to simulate user activity to awaken the display if it is already asleep.
+            Defaults to True. Only has an effect if no other wakefulness block is active.
+
+        linger: If this is the last wakefulness block to exit, the number of seconds for which
+            to keep the display awake afterwards. A wakefulness block entered meanwhile reuses
+            the existing OS-level inhibition at no cost. Defaults to 0, releasing immediately.
+            Any lingering inhibition is released when the interpreter exits.
+
+        blocking: If True (the default), entering waits until the display is being kept awake,
+            and exiting waits until it no longer is. If False, both return immediately, without
+            awaiting anything, the inhibition being acquired and released in the background,
+            and the block yields a Handle reporting the eventual outcome. Failures are then
+            logged rather than raised. Use flush() to wait for background operations to
+            complete.
+
+        while_active: An eugeroic.activity.ActivityMonitor. If given, rather than for the whole
+            block, the display is kept awake only while the monitor observes activity, such as
+            CPU load or I/O, and is released after it has been quiet for a while.
+
+    Raises:
+        ValueError: If while_active is given and blocking is False.
+    """
+    logger.debug("Entering wakefulness state during: %r", reason)
+    try:
+        if while_active is not None and not blocking:
+            raise ValueError("while_active cannot be used with blocking=False")
+        registry = _get_registry()
+        if while_active is not None:
+            import asyncio
+
+            _start_monitor(while_active, registry, reason, wake, linger)
+            try:
+                yield
+            finally:
+                # Releasing may wait on the platform driver, so is kept off the event loop
+                await asyncio.to_thread(while_active.stop)
+            return
+        if not blocking:
+            from .background import background
+
+            handle = background.enter(reason, functools.partial(_acquire, registry, reason, wake))
+            try:
+                yield handle
+            finally:
+                background.exit(handle, functools.partial(_release, registry, reason, linger))
+            return
+        entered = await _aacquire(registry, reason, wake)
+        try:
+            yield
+        finally:
+            await _arelease(registry, reason, linger, entered)
+    finally:
+        logger.debug("Exiting wakefulness state after: %r", reason)
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Wait for the background operations of non-blocking wakefulness blocks to complete.
+
+    Operations still pending when the interpreter exits are completed before it does, but
+    calling this at shutdown allows a bound to be placed on the wait.
+
+    Args:
+        timeout: The maximum number of seconds to wait, or None to wait indefinitely.
+
+    Returns:
+        True if every operation requested so far has completed, or False if the timeout
+        expired first.
+    """
+    if "eugeroic.drivers.background" not in sys.modules:
+        return True
+    from .background import background
+
+    return background.flush(timeout)
+
+
+def set_circuit_breaker(threshold: Optional[int] = 3, cooldown: float = 30.0):
+    """Configure the circuit breaker which diverts inhibitions from a failing platform driver.
+
+    After threshold consecutive failures to inhibit or release through the platform driver,
+    inhibitions are made through the null driver instead, without attempting the platform
+    driver, for cooldown seconds. The platform driver is then tried again.
+
+    Args:
+        threshold: The number of consecutive failures after which to stop using the platform
+            driver, or None always to use it. Defaults to 3.
+
+        cooldown: The number of seconds for which to stop using the platform driver.
+            Defaults to 30.
+
+    Raises:
+        ValueError: If threshold is less than 1 or cooldown is negative.
+    """
+    if threshold is not None and threshold < 1:
+        raise ValueError(f"Circuit breaker threshold {threshold!r} is less than 1")
+    if cooldown < 0:
+        raise ValueError(f"Circuit breaker cooldown {cooldown!r} is negative")
+    breaker = _get_breaker()
+    breaker.threshold = threshold
+    breaker.cooldown = cooldown
+    breaker.reset()
+
+
+def set_heartbeat(interval: Optional[float]):
+    """Simulate user activity periodically while the display is being kept awake.
+
+    Some compositors ignore requests to inhibit the screensaver, but respect simulated user
+    activity. However many wakefulness blocks are active, user activity is simulated once per
+    interval.
+
+    Args:
+        interval: The number of seconds between simulations of user activity, or None (the
+            default) to simulate it only on entry to a wakefulness block with wake=True.
+
+    Raises:
+        ValueError: If interval is not positive.
+    """
+    if interval is not None and interval <= 0:
+        raise ValueError(f"Heartbeat interval {interval!r} is not positive")
+    _get_heartbeat().interval = interval
+
+
+def set_fork_sharing(enabled: bool = True):
+    """Choose whether forked child processes share this process's inhibition.
+
+    When enabled, as it is by default, a child forked with os.fork(), such as a worker of a
+    multiprocessing pool using the "fork" start method, keeps the display awake by asking this
+    process to, over a pair of sockets made as it is forked, rather than by opening bus
+    connections of its own. However many children are forked, a single OS-level inhibition is
+    held, and anything held on behalf of a child is released when it exits. Children forked
+    before this process has ever kept the display awake are not connected, so that forking in
+    processes which don't use this package costs nothing extra.
+
+    Child processes started by other means, such as the "spawn" and "forkserver" start methods,
+    are not connected to this process, and make their own inhibitions.
+
+    Args:
+        enabled: True to share with children forked from now on, or False for them to make
+            their own inhibitions.
+    """
+    global _fork_sharing
+    _fork_sharing = enabled
+
+
+def _acquire_for_child(reason: str, wake: bool):
+    registry = _get_registry()
+    return registry, reason, _acquire(registry, reason, wake)
+
+
+def _release_for_child(token):
+    registry, reason, entered = token
+    _release(registry, reason, 0.0, entered)
+
+
+def _before_fork():
+    global _children
+    if not _fork_sharing:
+        return
+    if _registry is None:
+        # Nothing has been held here, so no sockets or thread are made for the child
+        return
+    if _children is None:
+        from .sharing import ChildChannels
+
+        _children = ChildChannels(_acquire_for_child, _release_for_child)
+    _children.before_fork()
+
+
+def _after_fork_in_parent():
+    if _children is not None:
+        _children.after_fork_in_parent()
+
+
+def _after_fork_in_child():
+    # Only the thread which forked survives in the child, so none of the parent's threads, event
+    # loops or connections can be used, and locks held by other threads would never be released
+    global _registry, _registry_lock, _children, _parent
+    if _registry is not None:
+        _registry.abandon()
+        _registry = None
+    _registry_lock = threading.Lock()
+    if _breaker is not None:
+        _breaker._after_fork_in_child()
+    if _heartbeat is not None:
+        _heartbeat._after_fork_in_child()
+    child_end = _children.after_fork_in_child() if _children is not None else None
+    _children = None
+    if _parent is not None:
+        # The connection from our parent to its parent is not this child's to use
+        _parent.close()
+        _parent = None
+    if child_end is not None:
+        from .sharing import ParentChannel
+
+        _parent = ParentChannel(child_end)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=_before_fork,
+        after_in_parent=_after_fork_in_parent,
+        after_in_child=_after_fork_in_child,
+    )
+
+
+def circuit_breaker_state() -> "BreakerState":
+    """A snapshot of the state of the circuit breaker, for monitoring."""
+    return _get_breaker().state()
+
+
+def active_reasons() -> Counter:
+    """The number of active wakefulness blocks for each reason."""
+    if _registry is None:
+        return Counter()
+    return _registry.reasons()
 
 
-__all__ = ["wakefulness"]
+__all__ = [
+    "active_reasons",
+    "awakefulness",
+    "circuit_breaker_state",
+    "flush",
+    "set_circuit_breaker",
+    "set_fork_sharing",
+    "set_heartbeat",
+    "wakefulness",
+]
@@ -0,0 +1,149 @@
+"""Acquisition and release of wakefulness holders in the background.
+
+For callers which must never wait on the platform, such as request handlers for which keeping
+the display awake is merely best-effort, holders can be acquired and released on a single shared
+background thread. Operations are run in the order in which they were requested, so a holder is
+always released after it was acquired, and flush() waits for every operation requested so far.
+Operations still pending when the interpreter exits are completed before it does.
+"""
+
+import logging
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Handle:
+    """The eventual outcome of a non-blocking wakefulness block.
+
+    Attributes:
+        reason: The reason given for keeping the display awake.
+
+        acquired: A Future which resolves once the holder is registered and the OS-level
+            inhibition is in place, or to the exception which prevented it.
+
+        released: A Future which resolves once the holder has been unregistered and, if it was
+            the last, the OS-level inhibition released; or to the exception which prevented it.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.acquired: Future = Future()
+        self.released: Future = Future()
+        self._entered: Optional[float] = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.reason!r})"
+
+
+class BackgroundWorker:
+    """A single thread on which holders are acquired and released in order.
+
+    The thread is started when first needed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _after_fork_in_child(self):
+        # The thread did not survive the fork, and the pending operations belong to the parent
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Call fn with args on the background thread, after every operation requested so far.
+
+        Returns:
+            A Future for the result of the call.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="eugeroic-background"
+                )
+            return self._executor.submit(fn, *args)
+
+    def enter(self, reason: str, acquire: Callable[[], float]) -> Handle:
+        """Acquire a holder in the background.
+
+        Args:
+            reason: The reason for keeping the display awake.
+
+            acquire: A callable which registers the holder, returning the time at which it did.
+
+        Returns:
+            A handle for the eventual outcome, to be passed to exit().
+        """
+        handle = Handle(reason)
+        self.submit(self._acquire, handle, acquire)
+        return handle
+
+    def exit(self, handle: Handle, release: Callable[[float], None]):
+        """Release, in the background, a holder acquired with enter().
+
+        Args:
+            handle: The handle returned by enter().
+
+            release: A callable which unregisters the holder, accepting the time at which it
+                was registered.
+        """
+        self.submit(self._release, handle, release)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every operation requested so far to complete.
+
+        Args:
+            timeout: The maximum number of seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            True if every operation completed, or False if the timeout expired first.
+        """
+        with self._lock:
+            if self._executor is None:
+                return True
+        try:
+            self.submit(_nothing).result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    @staticmethod
+    def _acquire(handle: Handle, acquire: Callable[[], float]):
+        try:
+            handle._entered = acquire()
+        except Exception as e:
+            logger.warning("Could not keep the display awake during %r: %s", handle.reason, e)
+            handle.acquired.set_exception(e)
+        else:
+            handle.acquired.set_result(None)
+
+    @staticmethod
+    def _release(handle: Handle, release: Callable[[float], None]):
+        if handle._entered is None:
+            # Never acquired, so there is nothing to release
+            handle.released.set_result(None)
+            return
+        try:
+            release(handle._entered)
+        except Exception as e:
+            logger.warning(
+                "Could not stop keeping the display awake after %r: %s", handle.reason, e
+            )
+            handle.released.set_exception(e)
+        else:
+            handle.released.set_result(None)
+
+
+def _nothing():
+    pass
+
+
+background = BackgroundWorker()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=background._after_fork_in_child)
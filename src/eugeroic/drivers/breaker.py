@@ -0,0 +1,153 @@
+"""A circuit breaker which stops a failing platform driver being retried on every inhibition.
+
+While the breaker is closed, inhibitions are made through the platform driver as usual. After a
+number of consecutive failures the breaker opens, and for a cool-down period inhibitions are
+made through the null driver instead, at no cost. Once the cool-down period has passed the
+breaker is half-open: the next inhibition is again attempted through the platform driver, and
+the breaker closes if it succeeds or reopens if it fails.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class BreakerState:
+    """A snapshot of the state of a circuit breaker.
+
+    Attributes:
+        state: One of "closed", "open" or "half-open".
+
+        failures: The number of consecutive failures.
+
+        trips: The number of times the breaker has opened.
+
+        retry_in: While open, the number of seconds until the platform driver will be tried
+            again, otherwise None.
+
+        last_error: The most recent failure, or None.
+    """
+
+    def __init__(
+        self,
+        *,
+        state: str,
+        failures: int,
+        trips: int,
+        retry_in: Optional[float],
+        last_error: Optional[BaseException],
+    ):
+        self.state = state
+        self.failures = failures
+        self.trips = trips
+        self.retry_in = retry_in
+        self.last_error = last_error
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(state={self.state!r}, failures={self.failures}, "
+            f"trips={self.trips}, retry_in={self.retry_in!r})"
+        )
+
+
+class CircuitBreaker:
+    """A circuit breaker counting consecutive failures of an operation.
+
+    Args:
+        threshold: The number of consecutive failures after which the breaker opens, or None
+            never to open.
+
+        cooldown: The number of seconds for which the breaker stays open.
+
+        clock: A callable returning the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[int] = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._trips = 0
+        self._opened_at: Optional[float] = None
+        self._last_error: Optional[BaseException] = None
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if now - self._opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        """True unless the breaker is open, in which case the operation should not be attempted."""
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            return self._state(self._clock()) != OPEN
+
+    def record_success(self):
+        """Record that the operation succeeded, closing the breaker."""
+        if self._failures == 0 and self._opened_at is None:
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit breaker closed; platform driver available again")
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self, error: BaseException):
+        """Record that the operation failed, opening the breaker if the threshold is reached."""
+        with self._lock:
+            now = self._clock()
+            self._failures += 1
+            self._last_error = error
+            half_open = self._state(now) == HALF_OPEN
+            if half_open or (self.threshold is not None and self._failures >= self.threshold):
+                if self._opened_at is None or half_open:
+                    self._trips += 1
+                    logger.warning(
+                        "Circuit breaker opened after %d consecutive failures; not using the "
+                        "platform driver for %g seconds: %s",
+                        self._failures,
+                        self.cooldown,
+                        error,
+                    )
+                self._opened_at = now
+
+    def reset(self):
+        """Close the breaker and forget any failures."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._last_error = None
+
+    def _after_fork_in_child(self):
+        # The lock may have been held by a thread which did not survive the fork
+        self._lock = threading.Lock()
+
+    def state(self) -> BreakerState:
+        """A snapshot of the state of the breaker."""
+        with self._lock:
+            now = self._clock()
+            state = self._state(now)
+            return BreakerState(
+                state=state,
+                failures=self._failures,
+                trips=self._trips,
+                retry_in=self._opened_at + self.cooldown - now if state == OPEN else None,
+                last_error=self._last_error,
+            )
@@ -0,0 +1,111 @@
+"""A periodic heartbeat of simulated user activity while the display is being kept awake.
+
+Some compositors ignore requests to inhibit the screensaver, but do respect simulated user
+activity. While a heartbeat interval is set, user activity is simulated at that interval for as
+long as the OS-level inhibition is held. Since nested and concurrent wakefulness blocks share a
+single OS-level inhibition, any number of them produce a single heartbeat, which is timed by
+the shared timer thread rather than a thread of its own. Since simulating user activity may block
+on the platform, each beat is made on the background thread of non-blocking wakefulness blocks,
+so that a stalled bus delays no other timed callback.
+"""
+
+import logging
+import threading
+from collections.abc import Callable
+from typing import Optional
+
+from eugeroic.drivers.timers import Timer, call_later
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat:
+    """Calls a function periodically between start() and stop().
+
+    Args:
+        interval: The number of seconds between beats, or None for no heartbeat.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._interval = interval
+        self._beat: Optional[Callable[[], None]] = None
+        self._timer: Optional[Timer] = None
+        # Incremented on each start() and stop(), so that a scheduled tick can tell whether it
+        # still applies
+        self._generation = 0
+        # Whether a beat is waiting for or running on the background thread, so that beats do not
+        # pile up behind one which is blocked
+        self._beating = False
+
+    @property
+    def interval(self) -> Optional[float]:
+        """The number of seconds between beats, or None for no heartbeat."""
+        return self._interval
+
+    @interval.setter
+    def interval(self, interval: Optional[float]):
+        with self._lock:
+            self._interval = interval
+            beat = self._beat
+        if beat is not None:
+            # Restart at the new interval
+            self.start(beat)
+
+    @property
+    def running(self) -> bool:
+        """True between start() and stop()."""
+        return self._beat is not None
+
+    def start(self, beat: Callable[[], None]):
+        """Start calling beat at the interval, replacing any beat already started."""
+        with self._lock:
+            self._generation += 1
+            self._beat = beat
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._interval is not None:
+                self._timer = call_later(self._interval, self._tick, self._generation)
+
+    def stop(self):
+        """Stop calling the beat."""
+        with self._lock:
+            self._generation += 1
+            self._beat = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _after_fork_in_child(self):
+        # The beat belongs to the parent's inhibition, and its timer did not survive the fork
+        self._lock = threading.Lock()
+        self._generation += 1
+        self._beat = None
+        self._timer = None
+        self._beating = False
+
+    def _tick(self, generation: int):
+        with self._lock:
+            if generation != self._generation or self._beat is None:
+                return
+            if self._interval is not None:
+                self._timer = call_later(self._interval, self._tick, generation)
+            if self._beating:
+                logger.debug("Previous heartbeat still in progress; skipping this one")
+                return
+            self._beating = True
+            beat = self._beat
+        from eugeroic.drivers.background import background
+
+        background.submit(self._run, beat, generation)
+
+    def _run(self, beat: Callable[[], None], generation: int):
+        try:
+            if generation == self._generation:
+                beat()
+        except Exception as e:
+            logger.warning("Could not simulate user activity: %s", e)
+        finally:
+            with self._lock:
+                self._beating = False
@@ -0,0 +1,252 @@
+"""D-Bus services through which the display can be kept awake.
+
+Different desktop environments provide different services, and many provide several. Each
+backend knows how to inhibit, and later release the inhibition, through one of them.
+"""
+
+import asyncio
+import functools
+import os
+
+from dbus_next import BusType, Variant
+from dbus_next.errors import DBusError
+
+from eugeroic.drivers.linux import config, logind, wire
+from eugeroic.drivers.linux.introspection import (
+    GNOME_SESSION_MANAGER_XML,
+    LOGIN1_MANAGER_XML,
+    PORTAL_INHIBIT_XML,
+    PORTAL_REQUEST_XML,
+    POWER_MANAGEMENT_XML,
+    SCREENSAVER_XML,
+)
+from eugeroic.drivers.linux.proxies import proxy_interface
+
+
+class Backend:
+    """A D-Bus service through which the display can be kept awake.
+
+    Subclasses describe where the service is found, and implement inhibit() and uninhibit()
+    for its particular interface.
+    """
+
+    # A short name by which the backend can be selected
+    name: str
+
+    bus_type = BusType.SESSION
+
+    # Whether the service releases the inhibition itself when the connection is lost. Backends
+    # whose inhibitions are not held by the connection make connections of their own, rather
+    # than using the shared connection to the bus.
+    held_by_connection = True
+
+    bus_name: str
+    path: str
+    interface: str
+    xml: str
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    async def proxy(self, bus):
+        """The proxy interface for the service, or None if it is not available."""
+        return await proxy_interface(bus, self.bus_name, self.path, self.interface, self.xml)
+
+    async def inhibit(self, proxy, app_name: str, reason: str):
+        """Inhibit the display from sleeping.
+
+        Returns:
+            A token to be passed to uninhibit().
+
+        Raises:
+            DBusError: If the service refused or failed to inhibit.
+        """
+        raise NotImplementedError
+
+    async def uninhibit(self, bus, proxy, token):
+        """Release an inhibition previously made through inhibit().
+
+        Raises:
+            DBusError: If the service failed to release the inhibition.
+        """
+        raise NotImplementedError
+
+    async def simulate_user_activity(self, proxy) -> bool:
+        """Simulate user activity to wake the display, if the service supports it.
+
+        Returns:
+            True if user activity was simulated, otherwise False.
+        """
+        return False
+
+
+class ScreenSaverBackend(Backend):
+    """The freedesktop.org org.freedesktop.ScreenSaver service."""
+
+    name = "screensaver"
+    bus_name = "org.freedesktop.ScreenSaver"
+    path = "/org/freedesktop/ScreenSaver"
+    interface = "org.freedesktop.ScreenSaver"
+    xml = SCREENSAVER_XML
+
+    async def inhibit(self, proxy, app_name, reason):
+        return await proxy.call_inhibit(app_name, reason)
+
+    async def uninhibit(self, bus, proxy, token):
+        await proxy.call_un_inhibit(token)
+
+    async def simulate_user_activity(self, proxy):
+        await proxy.call_simulate_user_activity()
+        return True
+
+
+class GnomeSessionManagerBackend(Backend):
+    """The GNOME org.gnome.SessionManager service."""
+
+    name = "gnome"
+    bus_name = "org.gnome.SessionManager"
+    path = "/org/gnome/SessionManager"
+    interface = "org.gnome.SessionManager"
+    xml = GNOME_SESSION_MANAGER_XML
+
+    # Inhibit the session being marked as idle
+    INHIBIT_IDLE = 8
+
+    async def inhibit(self, proxy, app_name, reason):
+        return await proxy.call_inhibit(app_name, 0, reason, self.INHIBIT_IDLE)
+
+    async def uninhibit(self, bus, proxy, token):
+        await proxy.call_uninhibit(token)
+
+
+class PowerManagementBackend(Backend):
+    """The freedesktop.org org.freedesktop.PowerManagement.Inhibit service."""
+
+    name = "power-management"
+    bus_name = "org.freedesktop.PowerManagement"
+    path = "/org/freedesktop/PowerManagement/Inhibit"
+    interface = "org.freedesktop.PowerManagement.Inhibit"
+    xml = POWER_MANAGEMENT_XML
+
+    async def inhibit(self, proxy, app_name, reason):
+        return await proxy.call_inhibit(app_name, reason)
+
+    async def uninhibit(self, bus, proxy, token):
+        await proxy.call_un_inhibit(token)
+
+
+class PortalBackend(Backend):
+    """The org.freedesktop.portal.Inhibit desktop portal."""
+
+    name = "portal"
+    bus_name = "org.freedesktop.portal.Desktop"
+    path = "/org/freedesktop/portal/desktop"
+    interface = "org.freedesktop.portal.Inhibit"
+    xml = PORTAL_INHIBIT_XML
+
+    # Inhibit the session being marked as idle
+    INHIBIT_IDLE = 8
+
+    async def inhibit(self, proxy, app_name, reason):
+        return await proxy.call_inhibit("", self.INHIBIT_IDLE, {"reason": Variant("s", reason)})
+
+    async def uninhibit(self, bus, proxy, token):
+        # The inhibition is released by closing the request object returned by Inhibit
+        request = await proxy_interface(
+            bus,
+            self.bus_name,
+            token,
+            "org.freedesktop.portal.Request",
+            PORTAL_REQUEST_XML,
+            cache=False,
+        )
+        if request is None:
+            raise DBusError("org.freedesktop.DBus.Error.UnknownObject", f"No request at {token}")
+        await request.call_close()
+
+
+class Login1Backend(Backend):
+    """The systemd-logind org.freedesktop.login1 idle inhibitor, on the system bus.
+
+    The inhibition is held for as long as the file descriptor returned by Inhibit is open.
+    Nothing else need be kept alive, so rather than through the shared connection, the inhibition
+    is made by logind.inhibit(), through a connection which is closed as soon as the file
+    descriptor is received, as with the wire transport. A forked child closes its copies of the
+    file descriptors, so that the lock is released when the parent releases it.
+    """
+
+    name = "login1"
+    bus_type = BusType.SYSTEM
+    held_by_connection = False
+    bus_name = "org.freedesktop.login1"
+    path = "/org/freedesktop/login1"
+    interface = "org.freedesktop.login1.Manager"
+    xml = LOGIN1_MANAGER_XML
+
+    async def proxy(self, bus):
+        # No proxy is needed, since the connection is made by logind.inhibit()
+        return self
+
+    async def inhibit(self, proxy, app_name, reason):
+        call = functools.partial(
+            _take_lock,
+            reason,
+            config.login1_targets,
+            app_name=app_name,
+            timeout=config.enter_deadline,
+        )
+        # The call blocks, so is made in the event loop's default executor
+        taking = asyncio.get_running_loop().run_in_executor(None, call)
+        try:
+            return await asyncio.shield(taking)
+        except asyncio.CancelledError:
+            # Nobody remains to release a lock taken after all
+            taking.add_done_callback(_close_late_lock)
+            raise
+        except wire.DBusError as e:
+            raise DBusError(e.type, e.text) from e
+        except TimeoutError as e:
+            raise DBusError("org.freedesktop.DBus.Error.NoReply", str(e)) from e
+        except OSError as e:
+            raise DBusError("org.freedesktop.DBus.Error.NoServer", str(e)) from e
+
+    async def uninhibit(self, bus, proxy, token):
+        _held_fds.discard(token)
+        os.close(token)
+
+
+# The file descriptors holding logind inhibitor locks
+_held_fds: set[int] = set()
+
+
+def _take_lock(reason, targets, **kwargs) -> int:
+    fd = logind.inhibit(reason, targets, **kwargs)
+    _held_fds.add(fd)
+    return fd
+
+
+def _close_late_lock(taking: asyncio.Future):
+    if not taking.cancelled() and taking.exception() is None:
+        _held_fds.discard(taking.result())
+        os.close(taking.result())
+
+
+def _after_fork_in_child():
+    # Otherwise the child would go on holding the parent's logind locks after the parent
+    # released them
+    for fd in _held_fds:
+        os.close(fd)
+    _held_fds.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+BACKENDS = (
+    ScreenSaverBackend(),
+    GnomeSessionManagerBackend(),
+    PowerManagementBackend(),
+    PortalBackend(),
+    Login1Backend(),
+)
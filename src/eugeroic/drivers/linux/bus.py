@@ -2,89 +2,138 @@ from contextlib import asynccontextmanager, contextmanager
 import logging
 import sys
 import asyncio
+import functools
+import os
 import threading
-import concurrent.futures
+import weakref
+from collections.abc import Awaitable, Callable
 from typing import Optional
-import time
 
+from dbus_next import BusType
 from dbus_next.aio import MessageBus
-from dbus_next.errors import (
-    DBusError,
-    InvalidAddressError,
-    InvalidIntrospectionError,
-    InvalidInterfaceNameError,
-    InvalidBusNameError,
-    InvalidObjectPathError,
-    InvalidMemberNameError,
-)
+from dbus_next.errors import DBusError
+
+from eugeroic import metrics
+from eugeroic.drivers.linux import config
+from eugeroic.drivers.linux.backends import BACKENDS, Backend, ScreenSaverBackend
+from eugeroic.drivers.linux.introspection import DBUS_XML
+from eugeroic.drivers.linux.proxies import proxy_interface, set_static_introspection
+
+# The driver's configuration is shared by both transports, but remains available here
+from eugeroic.drivers.linux.config import set_backends, set_deadlines
 
 logger = logging.getLogger(__name__)
 
 # This code is particularly convoluted because we want to use the dbus_next package
 # which is async, but we don't want to force the callers of this function to be async
-# as well. So we start a separate thread with its own event loop, run the async stuff,
-# and then shut it down.
+# as well. So we run the async stuff on an event loop in a separate, long-lived daemon thread
+# which is shared by every inhibition in the process, and submit coroutines to it from the
+# calling threads.
 #
 # We also can't call Inhibit with one bus connection, retain the cookie, and call UnInhibit [sic]
 # with another bus connection, because the cookie is only valid for the connection it was
-# created on. So we need to maintain the bus connection for the duration of the context manager.
+# created on. So we maintain a single bus connection for the lifetime of the process, and
+# remember which connection each cookie was issued on. Should the connection be lost, the
+# bus daemon releases any inhibitions made through it, and a new connection is made lazily
+# the next time one is needed.
 #
 # Additional complexity is added by the fact that we want to be able to raise exceptions
-# from the async code in the main thread, so we need to use threading.Event to signal
-# when the async code has finished, and then raise the exception in the main thread.
+# from the async code in the calling thread, so we wait on the concurrent.futures.Future
+# returned when the coroutine is submitted to the event loop, which re-raises any exception
+# in the calling thread.
+#
+# Which services are available to inhibit through differs between desktop environments, so
+# we discover the names present on the bus once per process, and thereafter inhibit through
+# every enabled backend whose service is present.
 #
-# Finally, we want to be able to use this code as a context manager, so we need to
-# be able to signal as the async code progresses and when the async code has finished, and then
-# wait in the main thread for those signals.
+# Whether the screensaver is active is watched through its ActiveChanged signal, subscribed to once
+# per connection, so that user activity is only simulated on entry when the display may be asleep,
+# and callers can ask without a round trip to the bus.
 #
 # Finally, a D-Bus may not be available, so we need to be able to fall back to a fake implementation
 # if the real one isn't available to allow the implementation to proceed gracefully (and be tested
-# in environments without a D-Bus). Even if the D-Bus is available, the required endpoints may not
-# be available, so we need to be able to fall back to a fake implementation in that case as well.
+# in environments without a D-Bus).
 
 
-SCREENSAVER_BUS = "org.freedesktop.ScreenSaver"
-SCREENSAVER_PATH = "/org/freedesktop/ScreenSaver"
+SCREENSAVER_BUS = ScreenSaverBackend.bus_name
+SCREENSAVER_PATH = ScreenSaverBackend.path
+
+DBUS_BUS = "org.freedesktop.DBus"
+DBUS_PATH = "/org/freedesktop/DBus"
 
 
 class FakeMessageBus:
 
-    def __init__(self):
+    # The fake services present on each type of bus, mapping well-known names to
+    # factories for the fake interfaces they provide
+    services = {
+        BusType.SESSION: {
+            SCREENSAVER_BUS: {ScreenSaverBackend.interface: lambda: FakeScreenSaver()},
+        },
+        BusType.SYSTEM: {},
+    }
+
+    def __init__(self, bus_type: BusType = BusType.SESSION):
+        self.bus_type = bus_type
         self._connected = False
+        self._disconnected: Optional[asyncio.Event] = None
+
+    @property
+    def connected(self):
+        return self._connected
 
     async def connect(self):
         self._connected = True
+        self._disconnected = asyncio.Event()
         logger.debug("Connect to fake D-Bus")
         return self
 
     def disconnect(self):
         logger.debug("Disconnect from fake D-Bus")
         self._connected = False
+        if self._disconnected is not None:
+            self._disconnected.set()
 
     async def wait_for_disconnect(self):
-        while self._connected:
-            await asyncio.sleep(0)
+        if self._disconnected is not None:
+            await self._disconnected.wait()
         logger.debug("Disconnected from fake D-Bus")
 
     async def introspect(self, name, path):
-        assert name == SCREENSAVER_BUS
-        assert path == SCREENSAVER_PATH
+        if name != DBUS_BUS and name not in self.services[self.bus_type]:
+            raise DBusError("org.freedesktop.DBus.Error.ServiceUnknown", f"No fake {name}")
         return dict(name=name, path=path)
 
     def get_proxy_object(self, name, path, introspection):
-        assert introspection["name"] == name
-        assert introspection["path"] == path
-        return FakeBusProxy(introspection)
+        if isinstance(introspection, dict):
+            assert introspection["name"] == name
+            assert introspection["path"] == path
+        return FakeBusProxy(self, name)
 
 
 class FakeBusProxy:
 
-    def __init__(self, introspection):
-        self.introspection = introspection
+    def __init__(self, bus: FakeMessageBus, name: str):
+        self.bus = bus
+        self.name = name
+
+    def get_interface(self, interface):
+        services = self.bus.services[self.bus.bus_type]
+        if self.name == DBUS_BUS:
+            return FakeDBus(services)
+        return services[self.name][interface]()
+
+
+class FakeDBus:
+
+    def __init__(self, services):
+        self.services = services
+
+    async def call_list_names(self):
+        return [DBUS_BUS, *self.services]
 
-    def get_interface(self, name):
-        assert self.introspection["name"] == name
-        return FakeScreenSaver()
+    async def call_list_activatable_names(self):
+        return [DBUS_BUS]
 
 
 class FakeScreenSaver:
@@ -107,137 +156,624 @@ class FakeScreenSaver:
     async def call_simulate_user_activity(self):
         logger.debug("Fake ScreenSaver SimulateUserActivity")
 
+    async def call_get_active(self):
+        return False
 
-def _make_bus():
+    async def call_get_session_idle_time(self):
+        return 0
+
+    def on_active_changed(self, handler):
+        pass
+
+
+def _make_bus(bus_type: BusType = BusType.SESSION):
     try:
-        return MessageBus()
+        # File descriptors are only needed from the system bus, for logind inhibitors
+        return MessageBus(bus_type=bus_type, negotiate_unix_fd=(bus_type == BusType.SYSTEM))
     except Exception:
-        return FakeMessageBus()
+        metrics.record_fallback()
+        return FakeMessageBus(bus_type)
 
 
-@asynccontextmanager
-async def _bus():
-    bus = await _make_bus().connect()
+class Connection:
+    """A bus connection for use on one event loop, made lazily and remade if lost.
+
+    All methods must be awaited on the same event loop.
+
+    Args:
+        bus_type: The type of bus to connect to.
+    """
+
+    def __init__(self, bus_type: BusType = BusType.SESSION):
+        self._bus_type = bus_type
+        self._bus = None
+        self._connecting: Optional[asyncio.Lock] = None
+
+    async def get(self):
+        """The bus connection, connected (or reconnected) if necessary."""
+        if self._connecting is None:
+            self._connecting = asyncio.Lock()
+        async with self._connecting:
+            if self._bus is None or not self._bus.connected:
+                if self._bus is not None:
+                    logger.debug("D-Bus connection lost; reconnecting")
+                self._bus = await _make_bus(self._bus_type).connect()
+            return self._bus
+
+    async def disconnect(self):
+        """Disconnect the bus connection, if any."""
+        bus, self._bus = self._bus, None
+        if bus is not None and bus.connected:
+            bus.disconnect()
+            await bus.wait_for_disconnect()
+
+
+class BusManager:
+    """A process-wide manager for shared connections to the D-Bus session and system buses.
+
+    A single daemon thread runs an event loop on which all D-Bus communication takes place. The
+    thread and its loop are started on first use and live for the remainder of the process. A
+    single connection to each bus is made lazily on that loop, reused by every inhibition, and
+    remade if the connection is lost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._connections = {bus_type: Connection(bus_type) for bus_type in BusType}
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop on which D-Bus communication takes place, started if necessary."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="eugeroic-dbus",
+                    daemon=True,
+                )
+                self._thread.start()
+            return self._loop
+
+    async def connection(self, bus_type: BusType = BusType.SESSION):
+        """The shared bus connection, connected (or reconnected) if necessary.
+
+        Must be awaited on the manager's event loop.
+
+        Args:
+            bus_type: The type of bus. Defaults to the session bus.
+        """
+        return await self._connections[bus_type].get()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the manager's event loop, and wait for its result.
+
+        Args:
+            coro: The coroutine to run.
+
+            timeout: The maximum number of seconds to wait for the result, or None to wait
+                indefinitely.
+
+        Returns:
+            The result of the coroutine.
+
+        Raises:
+            Exception: Any exception raised by the coroutine.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout=timeout)
+
+    def _after_fork_in_child(self):
+        # The thread did not survive the fork, and the connections' sockets are shared with the
+        # parent, so must never be used or closed here. They are kept referenced, so that they
+        # are never finalized either.
+        _inherited.append((self._loop, self._connections))
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._connections = {bus_type: Connection(bus_type) for bus_type in BusType}
+
+    async def _disconnect(self):
+        for connection in self._connections.values():
+            await connection.disconnect()
+
+    def disconnect(self, timeout: Optional[float] = 5.0):
+        """Disconnect the shared bus connections, if any.
+
+        Any inhibitions made through the connections will be released by the bus. New
+        connections will be made when next needed.
+        """
+        with self._lock:
+            if self._loop is None:
+                return
+        self.run(self._disconnect(), timeout=timeout)
+
+
+bus_manager = BusManager()
+
+
+# Connections for use by asynchronous callers, directly on their own event loops
+_loop_connections: dict[asyncio.AbstractEventLoop, dict[BusType, Connection]] = {}
+
+# Event loops and connections inherited from the parent process by a forked child
+_inherited: list = []
+
+
+def _after_fork_in_child():
+    bus_manager._after_fork_in_child()
+    _inherited.append(dict(_loop_connections))
+    _loop_connections.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+async def _loop_connect(bus_type: BusType = BusType.SESSION):
+    """The connection to a bus for the running event loop."""
+    for loop in [loop for loop in _loop_connections if loop.is_closed()]:
+        # Whatever the state of the connections, their loop can no longer drive them
+        del _loop_connections[loop]
+    connections = _loop_connections.setdefault(asyncio.get_running_loop(), {})
+    connection = connections.setdefault(bus_type, Connection(bus_type))
+    return await connection.get()
+
+
+# The names present on each bus, keyed by bus type and address, discovered once per process
+_discovered_names: dict[tuple[BusType, Optional[str]], frozenset[str]] = {}
+
+_backends_by_name = {backend.name: backend for backend in BACKENDS}
+
+
+def _bus_address(bus, bus_type: BusType) -> Optional[str]:
+    if isinstance(bus, FakeMessageBus):
+        return None
+    if bus_type == BusType.SESSION:
+        return os.environ.get("DBUS_SESSION_BUS_ADDRESS")
+    return os.environ.get("DBUS_SYSTEM_BUS_ADDRESS", "unix:path=/var/run/dbus/system_bus_socket")
+
+
+async def discover_names(bus, bus_type: BusType = BusType.SESSION) -> frozenset[str]:
+    """The names present, or activatable, on a bus.
+
+    The names are discovered once per process for each bus address, and cached thereafter.
+    """
+    key = (bus_type, _bus_address(bus, bus_type))
     try:
-        yield bus
+        return _discovered_names[key]
+    except KeyError:
+        pass
+    names, activatable_names = [], []
+    dbus = await proxy_interface(bus, DBUS_BUS, DBUS_PATH, DBUS_BUS, DBUS_XML)
+    if dbus is not None:
+        metrics.record_dbus_calls(2)
+        try:
+            names, activatable_names = await asyncio.gather(
+                dbus.call_list_names(),
+                dbus.call_list_activatable_names(),
+            )
+        except DBusError as e:
+            logger.debug("Could not list names on the %s bus: %s", bus_type.name.lower(), e)
+    discovered = _discovered_names[key] = frozenset(names) | frozenset(activatable_names)
+    if bus_type == BusType.SESSION and not any(
+        backend.bus_name in discovered for backend in BACKENDS
+    ):
+        logger.warning(
+            "No service on the D-Bus session bus through which to keep the display awake"
+        )
+    return discovered
+
+
+async def available_backends(connect: Callable[[BusType], Awaitable]) -> list[Backend]:
+    """The enabled backends whose services are present, in order of preference.
+
+    Args:
+        connect: A coroutine function returning a connection to the given type of bus.
+    """
+    names = {}
+    available = []
+    for backend in (_backends_by_name[name] for name in config.enabled_backends):
+        if backend.bus_type not in names and backend.held_by_connection:
+            names[backend.bus_type] = await discover_names(
+                await connect(backend.bus_type),
+                backend.bus_type,
+            )
+        elif backend.bus_type not in names:
+            names[backend.bus_type] = await _discover_names_transiently(backend.bus_type)
+        if backend.bus_name in names[backend.bus_type]:
+            available.append(backend)
+    if not available:
+        logger.debug("No D-Bus service available to inhibit the display from sleeping")
+    return available
+
+
+async def _discover_names_transiently(bus_type: BusType) -> frozenset[str]:
+    """The names on a bus, discovered through a connection which is closed afterwards.
+
+    For buses used only by backends which make connections of their own, so that no connection
+    to them is kept.
+    """
+    try:
+        return _discovered_names[(bus_type, _bus_address(None, bus_type))]
+    except KeyError:
+        pass
+    try:
+        bus = await _make_bus(bus_type).connect()
+    except OSError as e:
+        # Unlike the session bus, the system bus is only needed by some backends
+        logger.debug("Could not connect to the D-Bus %s bus: %s", bus_type.name.lower(), e)
+        return frozenset()
+    try:
+        return await discover_names(bus, bus_type)
     finally:
         bus.disconnect()
         await bus.wait_for_disconnect()
-        pass
+
 
 async def screensaver(bus):
-    try:
-        introspection = await bus.introspect(
-            SCREENSAVER_BUS,
-            SCREENSAVER_PATH,
-        )
-        obj = bus.get_proxy_object(
-            SCREENSAVER_BUS,
-            SCREENSAVER_PATH,
-            introspection,
-        )
-        return obj.get_interface(SCREENSAVER_BUS)
-    except (
-        InvalidBusNameError,
-        InvalidObjectPathError,
-        InvalidInterfaceNameError,
-        InvalidMemberNameError,
-    ):
-        # The required endpoints for the screensaver aren't available
-        return FakeScreenSaver()
+    """The proxy for the ScreenSaver interface, or a fake if it is not available."""
+    return await ScreenSaverBackend().proxy(bus) or FakeScreenSaver()
 
 
-async def _inhibit(bus, reason: str, app_name: Optional[str]=None) -> int | None:
-    if app_name is None:
-        app_name = sys.argv[0]
-    s = await screensaver(bus)
+async def _inhibit(backend: Backend, bus, reason: str, app_name: str):
+    proxy = await backend.proxy(bus)
+    if proxy is None:
+        return None
+    metrics.record_dbus_calls()
+    try:
+        token = await backend.inhibit(proxy, app_name, reason)
+    except DBusError as e:
+        logger.debug("%s Inhibit not available: %s", backend.interface, e)
+        metrics.record_backend_failure(backend.name, e, reason)
+        return None
+    logger.debug("%s Inhibit: %r gives %r", backend.interface, reason, token)
+    return backend, bus, proxy, token
+
+
+async def _uninhibit(backend: Backend, bus, proxy, token):
+    if backend.held_by_connection and not bus.connected:
+        # The bus has already released any inhibition made through this connection
+        logger.debug("D-Bus connection lost while inhibited; %r already released", token)
+        return
+    if backend.held_by_connection:
+        # Otherwise the inhibition is held by a file descriptor, released without a call
+        metrics.record_dbus_calls()
     try:
-        cookie = await s.call_inhibit(app_name, reason)
-    except DBusError:
-        logger.debug("ScreenSaver Inhibit not available")
-        cookie = None
+        await backend.uninhibit(bus, proxy, token)
+    except DBusError as e:
+        logger.debug("%s UnInhibit not available: %s", backend.interface, e)
+        metrics.record_backend_failure(backend.name, e)
     else:
-        logger.debug("ScreenSaver Inhibit: %r gives cookie %r", reason, cookie)
-    return cookie
+        logger.debug("%s UnInhibit: %r", backend.interface, token)
+
+
+async def _simulate_user_activity(backends: list[Backend], connect: Callable[[BusType], Awaitable]):
+    for backend in backends:
+        if not backend.held_by_connection:
+            # Neither can logind simulate user activity, nor is it kept connected to
+            continue
+        proxy = await backend.proxy(await connect(backend.bus_type))
+        if proxy is None:
+            continue
+        metrics.record_dbus_calls()
+        try:
+            if await backend.simulate_user_activity(proxy):
+                logger.debug("%s SimulateUserActivity", backend.interface)
+                return
+        except DBusError as e:
+            logger.debug("%s SimulateUserActivity not available: %s", backend.interface, e)
+            metrics.record_backend_failure(backend.name, e)
 
 
-async def _uninhibit(bus, cookie: int | None):
-    s = await screensaver(bus)
-    if cookie is not None:
-        try:
-            await s.call_un_inhibit(cookie)
-        except DBusError:
-            logger.debug("ScreenSaver UnInhibit not available")
-        else:
-            logger.debug("ScreenSaver UnInhibit: cookie %r", cookie)
+# Whether the screensaver is active, as last reported on each connection watching ActiveChanged
+_screensaver_active: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
+# The subscription to ActiveChanged on each connection, made once
+_screensaver_watches: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
-async def _simulate_user_activity(bus):
-    s = await screensaver(bus)
+
+async def _watch_screensaver(bus):
+    if SCREENSAVER_BUS not in await discover_names(bus):
+        return
+    proxy = await ScreenSaverBackend().proxy(bus)
+    if proxy is None:
+        return
+
+    def active_changed(active):
+        logger.debug("%s ActiveChanged: %r", ScreenSaverBackend.interface, active)
+        _screensaver_active[bus] = active
+
+    proxy.on_active_changed(active_changed)
+    metrics.record_dbus_calls()
     try:
-        await s.call_simulate_user_activity()
-    except DBusError:
-        logger.debug("ScreenSaver SimulateUserActivity not available")
-    else:
-        logger.debug("ScreenSaver SimulateUserActivity")
+        active = await proxy.call_get_active()
+    except DBusError as e:
+        logger.debug("%s GetActive not available: %s", ScreenSaverBackend.interface, e)
+        return
+    # Any ActiveChanged received meanwhile is at least as recent as the reply
+    _screensaver_active.setdefault(bus, active)
+
+
+async def screensaver_active(bus) -> Optional[bool]:
+    """Whether the screensaver is active, or None if it is not known.
+
+    On first use of a connection, subscribes to ActiveChanged and asks the screensaver once.
+    Thereafter the state is kept up to date by the signal, with no further calls.
+    """
+    watch = _screensaver_watches.get(bus)
+    if watch is None:
+        watch = _screensaver_watches[bus] = asyncio.ensure_future(_watch_screensaver(bus))
+        watch.add_done_callback(functools.partial(_forget_failed_watch, bus))
+    # Shielded, so that the subscription is completed for later callers if this one gives up
+    await asyncio.shield(watch)
+    return _screensaver_active.get(bus)
+
+
+def _forget_failed_watch(bus, watch: asyncio.Future):
+    # So that the next caller subscribes afresh, rather than every caller getting the same error
+    if (watch.cancelled() or watch.exception() is not None) and (
+        _screensaver_watches.get(bus) is watch
+    ):
+        del _screensaver_watches[bus]
+
+
+async def _wake(backends: list[Backend], connect: Callable[[BusType], Awaitable]):
+    """Simulate user activity, unless the screensaver is known not to be active."""
+    # Only the ScreenSaver can say whether it is active, and only it can simulate user activity
+    if not any(isinstance(backend, ScreenSaverBackend) for backend in backends):
+        return
+    if await screensaver_active(await connect(BusType.SESSION)) is False:
+        logger.debug("Screensaver is not active; not simulating user activity")
+        return
+    await _simulate_user_activity(backends, connect)
+
+
+class Inhibitions:
+    """The inhibitions made through each backend for one inhibited period.
+
+    The calls to each backend are made concurrently, and some may still be in progress.
+
+    Args:
+        inhibits: Tasks for the Inhibit calls, each resulting in an inhibition to be released
+            or None.
+
+        others: Tasks for any other calls made on entry, such as to simulate user activity.
+    """
+
+    def __init__(self, inhibits: list[asyncio.Task], others: list[asyncio.Task]):
+        self._inhibits = inhibits
+        self._others = others
+
+    async def confirmed(self):
+        """Wait until the first backend confirms an inhibition, or all have failed.
+
+        Raises:
+            Exception: If no backend made an inhibition, and at least one raised an exception.
+        """
+        pending = set(self._inhibits)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(not task.exception() and task.result() is not None for task in done):
+                return
+        for task in self._inhibits:
+            if task.exception():
+                await self.release()
+                raise task.exception()
+
+    async def release(self):
+        """Wait for any calls still in progress, then release every inhibition concurrently."""
+        results = await asyncio.gather(*self._inhibits, *self._others, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.debug("D-Bus call failed while inhibited: %r", result)
+        await asyncio.gather(
+            *(
+                _uninhibit(*inhibition)
+                for inhibition in results[: len(self._inhibits)]
+                if isinstance(inhibition, tuple)
+            )
+        )
+
+
+# Releases which may be left to finish in the background, which the event loop holds only weakly
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _in_background(coro) -> asyncio.Task:
+    """Run a coroutine in a task which is kept until it is done, logging any exception."""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("D-Bus call failed in the background: %r", task.exception())
+
 
 async def _inhibited_screensaver(
+    connect: Callable[[BusType], Awaitable],
     reason: str,
     app_name: Optional[str],
-    on_inhibited: threading.Event,
-    on_uninhibit: threading.Event,
-    on_error: threading.Event,
-    wake: bool=True,
-):
+    wake: bool = True,
+) -> Inhibitions:
+    if app_name is None:
+        app_name = sys.argv[0]
+    backends = await available_backends(connect)
+    inhibits = [
+        asyncio.ensure_future(
+            _inhibit(
+                backend,
+                await connect(backend.bus_type) if backend.held_by_connection else None,
+                reason,
+                app_name,
+            )
+        )
+        for backend in backends
+    ]
+    others = [asyncio.ensure_future(_wake(backends, connect))] if wake else []
+    inhibitions = Inhibitions(inhibits, others)
     try:
-        async with _bus() as bus:
-            cookie = await _inhibit(bus, reason, app_name)
+        await inhibitions.confirmed()
+    except asyncio.CancelledError:
+        # The deadline expired, so release whatever the calls in progress eventually acquire
+        _in_background(inhibitions.release())
+        raise
+    return inhibitions
 
-            if wake:
-                await _simulate_user_activity(bus)
 
-            on_inhibited.set()
+async def _within_deadline(coro, deadline: Optional[float]):
+    try:
+        return await asyncio.wait_for(coro, deadline)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"No response from D-Bus within {deadline} seconds") from None
 
-            while not on_uninhibit.is_set():
-                await asyncio.sleep(0)
 
-            await _uninhibit(bus, cookie)
-    except:
-        # If an error occurs, tell the parent thread to stop waiting
-        on_error.set()
-        raise
+async def _uninhibited_screensaver(inhibitions: Inhibitions):
+    # Shielded, so that the release continues in the background if the deadline expires
+    release = _in_background(inhibitions.release())
+    await _within_deadline(asyncio.shield(release), config.exit_deadline)
 
 
 @contextmanager
 def inhibited_screensaver(reason: str, *, app_name: Optional[str]=None, wake: bool=True):
     """A context manager to inhibit the screensaver.
 
+    Inhibits through every enabled backend whose service is present on the bus. The calls to
+    each backend are made concurrently, and the block is entered as soon as the first of them
+    confirms the inhibition; the remainder complete in the background. On exit, every
+    inhibition is released concurrently.
+
     Args:
         reason: A descriptive reason for inhibiting the screensaver.
 
         app_name: The name of the application inhibiting the screensaver. Defaults to the
             name of the current executable.
 
-        wake: Whether to simulate user activity to wake the display. Defaults to True.
+        wake: Whether to simulate user activity to wake the display, if the screensaver is
+            active or not known not to be. Defaults to True.
 
     Raises:
+        TimeoutError: If the D-Bus does not respond within the deadlines given to set_deadlines().
         Exception: If an error occurs while inhibiting the screensaver.
     """
-    on_inhibited = threading.Event()
-    on_uninhibit = threading.Event()
-    on_error = threading.Event()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-        coro = _inhibited_screensaver(reason, app_name, on_inhibited, on_uninhibit, on_error, wake)
-        future = pool.submit(asyncio.run, coro)
-
-        # Wait for on_inhibited, but accept that an error may have happened
-        while not on_inhibited.is_set():
-            if on_error.is_set():
-                future.result(timeout=5.0)  # Should raise
-            time.sleep(0)
+    inhibitions = bus_manager.run(
+        _within_deadline(
+            _inhibited_screensaver(bus_manager.connection, reason, app_name, wake),
+            config.enter_deadline,
+        )
+    )
+    try:
+        yield
+    finally:
+        bus_manager.run(_uninhibited_screensaver(inhibitions))
 
-        try:
-            yield
-        finally:
-            on_uninhibit.set()
-            future.result(timeout=5.0) # Raises if an error occurred
+
+async def _simulated_user_activity(connect: Callable[[BusType], Awaitable]):
+    await _simulate_user_activity(await available_backends(connect), connect)
+
+
+def simulate_user_activity():
+    """Simulate user activity, through the first available backend which supports it.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the entry deadline given to
+            set_deadlines().
+        Exception: If an error occurs while communicating with the D-Bus.
+    """
+    bus_manager.run(
+        _within_deadline(_simulated_user_activity(bus_manager.connection), config.enter_deadline)
+    )
+
+
+async def _session_screensaver_active(connect: Callable[[BusType], Awaitable]) -> Optional[bool]:
+    return await screensaver_active(await connect(BusType.SESSION))
+
+
+def is_screensaver_active() -> Optional[bool]:
+    """Whether the screensaver is active, as last reported by the ScreenSaver service.
+
+    The first call subscribes to the ActiveChanged signal on the shared connection, and asks the
+    screensaver once. Thereafter the state is kept up to date by the signal, so is returned
+    without a round trip to the bus.
+
+    Returns:
+        True if the screensaver is active, False if it is not, or None if there is no
+        ScreenSaver service or it did not say.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the entry deadline given to
+            set_deadlines().
+    """
+    return bus_manager.run(
+        _within_deadline(
+            _session_screensaver_active(bus_manager.connection),
+            config.enter_deadline,
+        )
+    )
+
+
+async def _session_idle_time(connect: Callable[[BusType], Awaitable]) -> Optional[int]:
+    bus = await connect(BusType.SESSION)
+    if SCREENSAVER_BUS not in await discover_names(bus):
+        return None
+    proxy = await ScreenSaverBackend().proxy(bus)
+    if proxy is None:
+        return None
+    metrics.record_dbus_calls()
+    try:
+        return await proxy.call_get_session_idle_time()
+    except DBusError as e:
+        logger.debug("%s GetSessionIdleTime not available: %s", ScreenSaverBackend.interface, e)
+        return None
+
+
+def session_idle_time() -> Optional[int]:
+    """The number of seconds for which the session has been idle, asked of the ScreenSaver service.
+
+    Unlike is_screensaver_active(), each call is a round trip to the bus.
+
+    Returns:
+        The number of seconds, or None if there is no ScreenSaver service or it does not say.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the entry deadline given to
+            set_deadlines().
+    """
+    return bus_manager.run(
+        _within_deadline(_session_idle_time(bus_manager.connection), config.enter_deadline)
+    )
+
+
+@asynccontextmanager
+async def ainhibited_screensaver(reason: str, *, app_name: Optional[str] = None, wake: bool = True):
+    """An asynchronous context manager to inhibit the screensaver.
+
+    The D-Bus calls are made directly on the running event loop, through connections
+    belonging to that loop, without involving any other thread.
+
+    Args:
+        reason: A descriptive reason for inhibiting the screensaver.
+
+        app_name: The name of the application inhibiting the screensaver. Defaults to the
+            name of the current executable.
+
+        wake: Whether to simulate user activity to wake the display, if the screensaver is
+            active or not known not to be. Defaults to True.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the deadlines given to set_deadlines().
+        Exception: If an error occurs while inhibiting the screensaver.
+    """
+    inhibitions = await _within_deadline(
+        _inhibited_screensaver(_loop_connect, reason, app_name, wake),
+        config.enter_deadline,
+    )
+    try:
+        yield
+    finally:
+        await _uninhibited_screensaver(inhibitions)
@@ -0,0 +1,113 @@
+"""Configuration of the Linux driver, shared by both of its D-Bus transports.
+
+Importing this module is cheap, so the driver can be configured, and its transport chosen,
+without importing dbus_next.
+"""
+
+from collections.abc import Iterable
+from typing import Optional
+
+# The names of the backends, in their default order of preference
+BACKEND_NAMES = ("screensaver", "gnome", "power-management", "portal", "login1")
+
+# The inhibitor lock targets through which logind can keep the display, or the system, awake
+LOGIN1_TARGETS = ("idle", "sleep", "handle-lid-switch")
+
+# The clients through which the D-Bus can be spoken to
+TRANSPORTS = ("dbus-next", "wire")
+
+enabled_backends: tuple[str, ...] = BACKEND_NAMES
+
+login1_targets: tuple[str, ...] = ("idle",)
+
+# The maximum number of seconds to wait for an inhibition to be made, and to be released
+enter_deadline: Optional[float] = 5.0
+exit_deadline: Optional[float] = 5.0
+
+transport = "dbus-next"
+
+
+def set_backends(names: Optional[Iterable[str]] = None):
+    """Choose the backends through which to inhibit.
+
+    Args:
+        names: The names of the backends to enable, in order of preference, or None to enable
+            all of them. The available backends are: screensaver, gnome, power-management,
+            portal and login1.
+
+    Raises:
+        ValueError: If any of the names is not a known backend.
+    """
+    global enabled_backends
+    if names is None:
+        enabled_backends = BACKEND_NAMES
+        return
+    names = tuple(names)
+    for name in names:
+        if name not in BACKEND_NAMES:
+            raise ValueError(f"Unknown backend {name!r}")
+    enabled_backends = names
+
+
+def set_login1_targets(targets: Iterable[str] = ("idle",)):
+    """Choose what the login1 backend inhibits.
+
+    Args:
+        targets: Any of "idle", which keeps the display awake (the default), "sleep", which
+            keeps the system from suspending, and "handle-lid-switch", which keeps closing the
+            lid from suspending it.
+
+    Raises:
+        ValueError: If there are no targets, or any is not a known target.
+    """
+    global login1_targets
+    targets = tuple(targets)
+    if not targets:
+        raise ValueError("At least one login1 target is required")
+    for target in targets:
+        if target not in LOGIN1_TARGETS:
+            raise ValueError(f"Unknown login1 target {target!r}")
+    login1_targets = targets
+
+
+def set_deadlines(enter: Optional[float] = 5.0, exit: Optional[float] = 5.0):
+    """Choose how long to wait for the D-Bus when inhibiting and releasing.
+
+    Args:
+        enter: The maximum number of seconds to wait for an inhibition to be made, including
+            connecting to the bus, or None to wait indefinitely. If it expires, entry fails
+            with TimeoutError, and any inhibition which is made later is released.
+
+        exit: The maximum number of seconds to wait for an inhibition to be released, or None
+            to wait indefinitely. If it expires, exit fails with TimeoutError. Through the
+            dbus-next transport the release continues in the background, and through the wire
+            transport the connection is closed, so that the bus releases the inhibition.
+
+    Raises:
+        ValueError: If either deadline is not positive.
+    """
+    global enter_deadline, exit_deadline
+    for deadline in (enter, exit):
+        if deadline is not None and deadline <= 0:
+            raise ValueError(f"Deadline {deadline!r} is not positive")
+    enter_deadline, exit_deadline = enter, exit
+
+
+def set_transport(name: str = "dbus-next"):
+    """Choose the client through which the D-Bus is spoken to.
+
+    Inhibitions already held continue to be released through the transport which made them.
+
+    Args:
+        name: Either "dbus-next" (the default), which makes calls through dbus_next on an event
+            loop in a helper thread, concurrently to every backend; or "wire", which makes
+            them with the minimal synchronous client in eugeroic.drivers.linux.wire, directly
+            on the calling thread, without importing dbus_next or asyncio.
+
+    Raises:
+        ValueError: If the name is not a known transport.
+    """
+    global transport
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {name!r}")
+    transport = name
@@ -1,16 +1,82 @@
 import contextlib
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from typing import Optional
 
-from eugeroic.drivers.linux.bus import inhibited_screensaver
+from eugeroic.drivers.linux import config
+
+
+def _bus():
+    """The module through which to inhibit, for the transport chosen with set_transport().
+
+    The modules are only imported when first used, so that the wire transport never pays for
+    importing dbus_next.
+    """
+    if config.transport == "wire":
+        from eugeroic.drivers.linux import wirebus
+
+        return wirebus
+    from eugeroic.drivers.linux import bus
+
+    return bus
 
 
 @contextlib.contextmanager
 def wakefulness(logger, reason: str, wake: bool=True) -> Generator[None, None, None]:
     """A context manager which prevents the display from sleeping.
     """
-    logger.debug("Entering wakefulness state during: %r", reason)
+    logger.debug("Inhibiting display sleep during: %r", reason)
     try:
-        with inhibited_screensaver(reason, wake=wake):
+        with _bus().inhibited_screensaver(reason, wake=wake):
             yield
     finally:
-        logger.debug("Exiting wakefulness state after: %r", reason)
+        logger.debug("Releasing display sleep inhibition after: %r", reason)
+
+
+@contextlib.asynccontextmanager
+async def awakefulness(logger, reason: str, wake: bool = True) -> AsyncGenerator[None, None]:
+    """An asynchronous context manager which prevents the display from sleeping."""
+    logger.debug("Inhibiting display sleep during: %r", reason)
+    try:
+        if config.transport == "wire":
+            # The wire transport blocks, so is kept off the event loop
+            import asyncio
+            from eugeroic.drivers.linux import wirebus
+
+            stack = contextlib.ExitStack()
+            await asyncio.to_thread(
+                stack.enter_context, wirebus.inhibited_screensaver(reason, wake=wake)
+            )
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(stack.close)
+        else:
+            from eugeroic.drivers.linux import bus
+
+            async with bus.ainhibited_screensaver(reason, wake=wake):
+                yield
+    finally:
+        logger.debug("Releasing display sleep inhibition after: %r", reason)
+
+
+def simulate_user_activity(logger, reason: str):
+    """Simulate user activity, to keep the display awake where inhibition is ignored."""
+    logger.debug("Simulating user activity during: %r", reason)
+    _bus().simulate_user_activity()
+
+
+def is_screensaver_active() -> Optional[bool]:
+    """Whether the screensaver is active, as last reported by the ScreenSaver service.
+
+    After the first call, the state is kept up to date by the ActiveChanged signal, so is
+    returned without a round trip to the bus.
+
+    Returns:
+        True if the screensaver is active, False if it is not, or None if it is not known.
+    """
+    return _bus().is_screensaver_active()
+
+
+def session_idle_time() -> Optional[int]:
+    """The number of seconds for which the session has been idle, or None if it is not known."""
+    return _bus().session_idle_time()
@@ -0,0 +1,128 @@
+"""Static introspection data for the D-Bus interfaces used by the Linux driver.
+
+Building proxy objects from these bundled definitions, rather than introspecting the remote
+objects at runtime, saves a round trip to the bus for each proxy.
+"""
+
+import functools
+
+from dbus_next.introspection import Node
+
+DBUS_XML = """
+<node>
+  <interface name="org.freedesktop.DBus">
+    <method name="ListNames">
+      <arg type="as" direction="out"/>
+    </method>
+    <method name="ListActivatableNames">
+      <arg type="as" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+SCREENSAVER_XML = """
+<node>
+  <interface name="org.freedesktop.ScreenSaver">
+    <method name="Inhibit">
+      <arg name="application_name" type="s" direction="in"/>
+      <arg name="reason_for_inhibit" type="s" direction="in"/>
+      <arg name="cookie" type="u" direction="out"/>
+    </method>
+    <method name="UnInhibit">
+      <arg name="cookie" type="u" direction="in"/>
+    </method>
+    <method name="SimulateUserActivity"/>
+    <method name="GetActive">
+      <arg type="b" direction="out"/>
+    </method>
+    <method name="GetActiveTime">
+      <arg name="seconds" type="u" direction="out"/>
+    </method>
+    <method name="GetSessionIdleTime">
+      <arg name="seconds" type="u" direction="out"/>
+    </method>
+    <method name="SetActive">
+      <arg type="b" direction="out"/>
+      <arg name="e" type="b" direction="in"/>
+    </method>
+    <method name="Lock"/>
+    <signal name="ActiveChanged">
+      <arg type="b"/>
+    </signal>
+  </interface>
+</node>
+"""
+
+GNOME_SESSION_MANAGER_XML = """
+<node>
+  <interface name="org.gnome.SessionManager">
+    <method name="Inhibit">
+      <arg name="app_id" type="s" direction="in"/>
+      <arg name="toplevel_xid" type="u" direction="in"/>
+      <arg name="reason" type="s" direction="in"/>
+      <arg name="flags" type="u" direction="in"/>
+      <arg name="inhibit_cookie" type="u" direction="out"/>
+    </method>
+    <method name="Uninhibit">
+      <arg name="inhibit_cookie" type="u" direction="in"/>
+    </method>
+  </interface>
+</node>
+"""
+
+POWER_MANAGEMENT_XML = """
+<node>
+  <interface name="org.freedesktop.PowerManagement.Inhibit">
+    <method name="Inhibit">
+      <arg name="application" type="s" direction="in"/>
+      <arg name="reason" type="s" direction="in"/>
+      <arg name="cookie" type="u" direction="out"/>
+    </method>
+    <method name="UnInhibit">
+      <arg name="cookie" type="u" direction="in"/>
+    </method>
+  </interface>
+</node>
+"""
+
+PORTAL_INHIBIT_XML = """
+<node>
+  <interface name="org.freedesktop.portal.Inhibit">
+    <method name="Inhibit">
+      <arg name="window" type="s" direction="in"/>
+      <arg name="flags" type="u" direction="in"/>
+      <arg name="options" type="a{sv}" direction="in"/>
+      <arg name="handle" type="o" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+PORTAL_REQUEST_XML = """
+<node>
+  <interface name="org.freedesktop.portal.Request">
+    <method name="Close"/>
+  </interface>
+</node>
+"""
+
+LOGIN1_MANAGER_XML = """
+<node>
+  <interface name="org.freedesktop.login1.Manager">
+    <method name="Inhibit">
+      <arg name="what" type="s" direction="in"/>
+      <arg name="who" type="s" direction="in"/>
+      <arg name="why" type="s" direction="in"/>
+      <arg name="mode" type="s" direction="in"/>
+      <arg name="pipe_fd" type="h" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+
+@functools.cache
+def node(xml: str) -> Node:
+    """The parsed introspection data for one of the definitions above."""
+    return Node.parse(xml)
@@ -0,0 +1,112 @@
+"""systemd-logind inhibitor locks, held by nothing but a file descriptor.
+
+org.freedesktop.login1.Manager.Inhibit returns a file descriptor, and logind holds the lock for
+as long as any copy of it remains open. So nothing else need be kept alive while a lock is held:
+the connection to the system bus through which it was taken is closed as soon as the file
+descriptor is received, and there is no event loop or thread. Closing the file descriptor, or
+the process exiting, releases the lock.
+
+Example:
+
+    from eugeroic.drivers.linux.logind import inhibitor
+
+    with inhibitor("Nightly backup", ("sleep", "handle-lid-switch")):
+        ...
+"""
+
+import contextlib
+import os
+import sys
+from collections.abc import Generator, Iterable
+from typing import Optional
+
+from eugeroic.drivers.linux.config import LOGIN1_TARGETS
+from eugeroic.drivers.linux.wire import Connection, bus_address
+
+BUS_NAME = "org.freedesktop.login1"
+PATH = "/org/freedesktop/login1"
+INTERFACE = "org.freedesktop.login1.Manager"
+
+# Whether a lock blocks the targets outright, or only delays sleep and shutdown briefly
+MODES = ("block", "delay")
+
+
+def inhibit(
+    reason: str,
+    targets: Iterable[str] = ("idle",),
+    *,
+    app_name: Optional[str] = None,
+    mode: str = "block",
+    address: Optional[str] = None,
+    timeout: Optional[float] = 5.0,
+) -> int:
+    """Take an inhibitor lock, through a connection which is closed once it is taken.
+
+    The file descriptor is not inherited by programs this process executes, but is by children
+    it forks, which then also hold the lock until they close it or exit.
+
+    Args:
+        reason: The reason for taking the lock.
+
+        targets: What to inhibit: any of "idle", "sleep" and "handle-lid-switch".
+
+        app_name: The name of the application taking the lock. Defaults to the name of the
+            current executable.
+
+        mode: Either "block" (the default) or "delay".
+
+        address: The address of the system bus. Defaults to the DBUS_SYSTEM_BUS_ADDRESS
+            environment variable, or the standard system bus socket.
+
+        timeout: The maximum number of seconds to wait for logind, or None to wait indefinitely.
+
+    Returns:
+        The file descriptor holding the lock, to be closed with os.close() to release it.
+
+    Raises:
+        ValueError: If any target, or the mode, is unknown.
+        DBusError: If logind refused the lock.
+        OSError: If the system bus could not be reached, or would not pass file descriptors.
+    """
+    targets = tuple(targets)
+    if not targets or any(target not in LOGIN1_TARGETS for target in targets):
+        raise ValueError(f"Targets {targets!r} are not among {LOGIN1_TARGETS!r}")
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}")
+    if app_name is None:
+        app_name = sys.argv[0]
+    with Connection(
+        address or bus_address("system"), negotiate_unix_fd=True, timeout=timeout
+    ) as connection:
+        if not connection.unix_fd:
+            raise ConnectionError("The system bus will not pass file descriptors")
+        (fd,) = connection.call(
+            BUS_NAME,
+            PATH,
+            INTERFACE,
+            "Inhibit",
+            "ssss",
+            (":".join(targets), app_name, reason, mode),
+        )
+    return fd
+
+
+@contextlib.contextmanager
+def inhibitor(
+    reason: str,
+    targets: Iterable[str] = ("idle",),
+    *,
+    app_name: Optional[str] = None,
+    mode: str = "block",
+    address: Optional[str] = None,
+    timeout: Optional[float] = 5.0,
+) -> Generator[int, None, None]:
+    """A context manager which holds an inhibitor lock, yielding its file descriptor.
+
+    Takes the same arguments as inhibit().
+    """
+    fd = inhibit(reason, targets, app_name=app_name, mode=mode, address=address, timeout=timeout)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
@@ -0,0 +1,93 @@
+"""Cached D-Bus proxy interfaces.
+
+Proxy interfaces are only valid for the bus connection through which they were made, so are
+cached per connection. They are built either from bundled static introspection data, with no
+round trip to the bus, or by introspecting the remote object once per connection.
+"""
+
+import logging
+import weakref
+from typing import Optional
+
+from dbus_next.errors import (
+    DBusError,
+    InterfaceNotFoundError,
+    InvalidBusNameError,
+    InvalidInterfaceNameError,
+    InvalidIntrospectionError,
+    InvalidMemberNameError,
+    InvalidObjectPathError,
+)
+
+from eugeroic import metrics
+from eugeroic.drivers.linux.introspection import node
+
+logger = logging.getLogger(__name__)
+
+_interfaces: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+_static_introspection = True
+
+
+def set_static_introspection(enabled: bool):
+    """Choose how proxy interfaces are built.
+
+    Args:
+        enabled: If True (the default), build proxy interfaces from bundled static
+            introspection data, with no round trip to the bus. If False, introspect each
+            remote object on first use of each connection.
+    """
+    global _static_introspection
+    _static_introspection = enabled
+    _interfaces.clear()
+
+
+async def proxy_interface(
+    bus, bus_name: str, path: str, interface: str, xml: str, cache: bool = True
+):
+    """A proxy for an interface on a remote object, or None if it is not available.
+
+    Args:
+        bus: The bus connection through which the proxy will communicate.
+
+        bus_name: The well-known name of the service exporting the object.
+
+        path: The path of the object.
+
+        interface: The name of the interface.
+
+        xml: The static introspection data for the object.
+
+        cache: Whether to cache the proxy for the connection. Disable this for transient
+            objects.
+    """
+    interfaces = _interfaces.setdefault(bus, {})
+    key = (bus_name, path, interface)
+    try:
+        return interfaces[key]
+    except KeyError:
+        pass
+    proxy: Optional[object]
+    try:
+        if _static_introspection:
+            introspection = node(xml)
+        else:
+            metrics.record_dbus_calls()
+            introspection = await bus.introspect(bus_name, path)
+        proxy = bus.get_proxy_object(bus_name, path, introspection).get_interface(interface)
+    except (
+        DBusError,
+        InterfaceNotFoundError,
+        InvalidBusNameError,
+        InvalidIntrospectionError,
+        InvalidObjectPathError,
+        InvalidInterfaceNameError,
+        InvalidMemberNameError,
+    ) as e:
+        logger.debug(
+            "D-Bus interface %s at %s on %s not available: %s", interface, path, bus_name, e
+        )
+        proxy = None
+    if cache:
+        interfaces[key] = proxy
+    return proxy
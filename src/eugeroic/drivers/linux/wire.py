@@ -0,0 +1,746 @@
+"""A minimal synchronous D-Bus client, speaking the wire protocol over a Unix socket.
+
+The Linux driver needs only a handful of method calls, so rather than importing dbus_next and
+bridging into its event loop on a helper thread, this client makes them directly on the calling
+thread, using nothing but the standard library. It implements only what those calls need:
+connecting to a Unix socket address, EXTERNAL authentication, optionally negotiating the passing
+of file descriptors, Hello, method calls, and marshalling of the basic types, arrays, structs,
+dict entries and variants. Signals are passed to any handlers added with add_signal_handler(),
+as they are received while making a call or in dispatch(), and other messages which are not
+replies to a call are discarded.
+
+Example:
+
+    with Connection(bus_address("session")) as connection:
+        (cookie,) = connection.call(
+            "org.freedesktop.ScreenSaver",
+            "/org/freedesktop/ScreenSaver",
+            "org.freedesktop.ScreenSaver",
+            "Inhibit",
+            "ss",
+            ("my-app", "Nightly backup"),
+        )
+"""
+
+import array
+import functools
+import itertools
+import os
+import re
+import socket
+import struct
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Any, Optional
+
+DBUS_NAME = "org.freedesktop.DBus"
+DBUS_PATH = "/org/freedesktop/DBus"
+
+SYSTEM_BUS_ADDRESS = "unix:path=/var/run/dbus/system_bus_socket"
+
+# Message types
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+
+# Header field codes
+_PATH = 1
+_INTERFACE = 2
+_MEMBER = 3
+_ERROR_NAME = 4
+_REPLY_SERIAL = 5
+_DESTINATION = 6
+_SENDER = 7
+_SIGNATURE = 8
+_UNIX_FDS = 9
+
+# The struct format of each fixed-size type, whose alignment is its size
+_FIXED = {
+    "y": "B",
+    "b": "I",
+    "n": "h",
+    "q": "H",
+    "i": "i",
+    "u": "I",
+    "x": "q",
+    "t": "Q",
+    "d": "d",
+    "h": "I",
+}
+
+_ALIGNMENT = {
+    **{code: struct.calcsize(fmt) for code, fmt in _FIXED.items()},
+    "s": 4,
+    "o": 4,
+    "g": 1,
+    "a": 4,
+    "(": 8,
+    "{": 8,
+    "v": 1,
+}
+
+# The most file descriptors accepted with a single read from the socket
+MAX_FDS = 16
+
+_RECEIVE_SIZE = 65536
+
+
+class DBusError(Exception):
+    """An error returned in reply to a method call.
+
+    Attributes:
+        type: The name of the error, such as org.freedesktop.DBus.Error.ServiceUnknown.
+
+        text: The message describing the error, which may be empty.
+    """
+
+    def __init__(self, type: str, text: str = ""):
+        super().__init__(f"{type}: {text}" if text else type)
+        self.type = type
+        self.text = text
+
+
+class Variant:
+    """A value marshalled together with its signature.
+
+    Args:
+        signature: The signature of a single complete type.
+
+        value: The value.
+    """
+
+    __slots__ = ("signature", "value")
+
+    def __init__(self, signature: str, value: Any):
+        self.signature = signature
+        self.value = value
+
+    def __eq__(self, other):
+        if not isinstance(other, Variant):
+            return NotImplemented
+        return (self.signature, self.value) == (other.signature, other.value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.signature!r}, {self.value!r})"
+
+
+def _end_of_type(signature: str, start: int) -> int:
+    """The index just past the single complete type beginning at start."""
+    code = signature[start]
+    if code == "a":
+        return _end_of_type(signature, start + 1)
+    if code in "({":
+        close = ")" if code == "(" else "}"
+        index = start + 1
+        while signature[index] != close:
+            index = _end_of_type(signature, index)
+        return index + 1
+    if code not in _ALIGNMENT:
+        raise ValueError(f"Unsupported type {code!r} in signature {signature!r}")
+    return start + 1
+
+
+@functools.lru_cache(maxsize=None)
+def split_signature(signature: str) -> tuple[str, ...]:
+    """The single complete types of which a signature is composed.
+
+    Raises:
+        ValueError: If the signature is malformed, or contains unsupported types.
+    """
+    types = []
+    start = 0
+    try:
+        while start < len(signature):
+            end = _end_of_type(signature, start)
+            types.append(signature[start:end])
+            start = end
+    except IndexError:
+        raise ValueError(f"Malformed signature {signature!r}") from None
+    return tuple(types)
+
+
+class _Writer:
+
+    def __init__(self):
+        self.data = bytearray()
+        self.fds: list[int] = []
+
+    def align(self, alignment: int):
+        self.data += bytes(-len(self.data) % alignment)
+
+    def write(self, signature: str, value: Any):
+        code = signature[0]
+        if code in _FIXED:
+            if code == "h":
+                self.fds.append(value)
+                value = len(self.fds) - 1
+            self.align(_ALIGNMENT[code])
+            self.data += struct.pack(f"<{_FIXED[code]}", value)
+        elif code in "so":
+            encoded = value.encode("utf-8")
+            self.align(4)
+            self.data += struct.pack("<I", len(encoded)) + encoded + b"\0"
+        elif code == "g":
+            encoded = value.encode("ascii")
+            self.data += struct.pack("<B", len(encoded)) + encoded + b"\0"
+        elif code == "v":
+            self.write("g", value.signature)
+            self.write(value.signature, value.value)
+        elif code == "(":
+            self.align(8)
+            types = split_signature(signature[1:-1])
+            if len(value) != len(types):
+                raise ValueError(f"{value!r} does not match signature {signature!r}")
+            for item_signature, item in zip(types, value):
+                self.write(item_signature, item)
+        elif code == "a":
+            element = signature[1:]
+            self.align(4)
+            length_at = len(self.data)
+            self.data += bytes(4)
+            # Padding before the first element is not counted in the array's length
+            self.align(_ALIGNMENT[element[0]])
+            start = len(self.data)
+            if element[0] == "{":
+                key_signature, value_signature = split_signature(element[1:-1])
+                for key, item in value.items():
+                    self.align(8)
+                    self.write(key_signature, key)
+                    self.write(value_signature, item)
+            else:
+                for item in value:
+                    self.write(element, item)
+            struct.pack_into("<I", self.data, length_at, len(self.data) - start)
+        else:
+            raise ValueError(f"Unsupported type {code!r}")
+
+
+class _Reader:
+
+    def __init__(self, data: bytes, big_endian: bool = False, fds: Sequence[int] = ()):
+        self.data = data
+        self.position = 0
+        self.order = ">" if big_endian else "<"
+        self.fds = fds
+
+    def align(self, alignment: int):
+        self.position += -self.position % alignment
+
+    def read(self, signature: str) -> Any:
+        code = signature[0]
+        if code in _FIXED:
+            self.align(_ALIGNMENT[code])
+            (value,) = struct.unpack_from(f"{self.order}{_FIXED[code]}", self.data, self.position)
+            self.position += _ALIGNMENT[code]
+            if code == "b":
+                return bool(value)
+            if code == "h":
+                return self.fds[value]
+            return value
+        if code in "sog":
+            length = self.read("y" if code == "g" else "u")
+            end = self.position + length
+            if end >= len(self.data):
+                raise ValueError("String extends beyond the end of the message")
+            value = self.data[self.position : end].decode("utf-8")
+            self.position = end + 1
+            return value
+        if code == "v":
+            value_signature = self.read("g")
+            return Variant(value_signature, self.read(value_signature))
+        if code == "(":
+            self.align(8)
+            return tuple(
+                self.read(item_signature) for item_signature in split_signature(signature[1:-1])
+            )
+        if code == "a":
+            length = self.read("u")
+            element = signature[1:]
+            self.align(_ALIGNMENT[element[0]])
+            end = self.position + length
+            if element[0] == "{":
+                key_signature, value_signature = split_signature(element[1:-1])
+                entries = {}
+                while self.position < end:
+                    self.align(8)
+                    key = self.read(key_signature)
+                    entries[key] = self.read(value_signature)
+                return entries
+            items = []
+            while self.position < end:
+                items.append(self.read(element))
+            return items
+        raise ValueError(f"Unsupported type {code!r}")
+
+
+def marshal(signature: str, body: Sequence) -> tuple[bytes, list[int]]:
+    """Marshal the values of a message body, in little-endian byte order.
+
+    Args:
+        signature: The signature of the body.
+
+        body: A value for each single complete type in the signature. Arrays are given as
+            sequences, dicts as mappings, structs as tuples and variants as Variants.
+
+    Returns:
+        The marshalled body, and the file descriptors to be passed with it, which are indexed
+        by its unix fd values.
+
+    Raises:
+        ValueError: If the values do not match the signature.
+    """
+    types = split_signature(signature)
+    if len(body) != len(types):
+        raise ValueError(f"{len(body)} values do not match signature {signature!r}")
+    writer = _Writer()
+    try:
+        for item_signature, item in zip(types, body):
+            writer.write(item_signature, item)
+    except (AttributeError, TypeError, struct.error) as e:
+        raise ValueError(f"Values do not match signature {signature!r}: {e}") from None
+    return bytes(writer.data), writer.fds
+
+
+def unmarshal(
+    signature: str, data: bytes, big_endian: bool = False, fds: Sequence[int] = ()
+) -> list:
+    """Unmarshal the values of a message body.
+
+    Args:
+        signature: The signature of the body.
+
+        data: The marshalled body.
+
+        big_endian: Whether the body was marshalled in big-endian byte order.
+
+        fds: The file descriptors passed with the body.
+
+    Returns:
+        A value for each single complete type in the signature.
+
+    Raises:
+        ValueError: If the data does not match the signature.
+    """
+    reader = _Reader(data, big_endian, fds)
+    try:
+        return [reader.read(item_signature) for item_signature in split_signature(signature)]
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise ValueError(f"Data does not match signature {signature!r}: {e}") from None
+
+
+class Message:
+    """A message received from the bus.
+
+    Attributes:
+        type: The type of the message: METHOD_CALL, METHOD_RETURN, ERROR or SIGNAL.
+
+        serial: The serial number of the message.
+
+        reply_serial: For a reply, the serial number of the call to which it replies.
+
+        path, interface, member, error_name, sender: The header fields, or None where absent.
+
+        body: The values of the body.
+
+        fds: The file descriptors passed with the message.
+    """
+
+    __slots__ = (
+        "type",
+        "serial",
+        "reply_serial",
+        "path",
+        "interface",
+        "member",
+        "error_name",
+        "sender",
+        "body",
+        "fds",
+    )
+
+    def __init__(
+        self, message_type: int, serial: int, fields: dict[int, Any], body: list, fds: list[int]
+    ):
+        self.type = message_type
+        self.serial = serial
+        self.reply_serial = fields.get(_REPLY_SERIAL)
+        self.path = fields.get(_PATH)
+        self.interface = fields.get(_INTERFACE)
+        self.member = fields.get(_MEMBER)
+        self.error_name = fields.get(_ERROR_NAME)
+        self.sender = fields.get(_SENDER)
+        self.body = body
+        self.fds = fds
+
+    def close_fds(self):
+        """Close the file descriptors passed with the message."""
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+
+
+def _message(
+    message_type: int,
+    serial: int,
+    fields: dict[int, Variant],
+    signature: str = "",
+    body: Sequence = (),
+    flags: int = 0,
+) -> tuple[bytes, list[int]]:
+    """Marshal a whole message, returning it and the file descriptors to be passed with it."""
+    data, fds = marshal(signature, body)
+    if signature:
+        fields[_SIGNATURE] = Variant("g", signature)
+    if fds:
+        fields[_UNIX_FDS] = Variant("u", len(fds))
+    header = _Writer()
+    for field_signature, value in zip(
+        ("y", "y", "y", "y", "u", "u", "a(yv)"),
+        (ord("l"), message_type, flags, 1, len(data), serial, list(fields.items())),
+    ):
+        header.write(field_signature, value)
+    header.align(8)
+    return bytes(header.data) + data, fds
+
+
+def bus_address(bus: str = "session") -> Optional[str]:
+    """The address of the session or system bus.
+
+    Args:
+        bus: Either "session" or "system".
+
+    Returns:
+        The address, or None if there is no session bus.
+    """
+    if bus == "session":
+        return os.environ.get("DBUS_SESSION_BUS_ADDRESS")
+    return os.environ.get("DBUS_SYSTEM_BUS_ADDRESS", SYSTEM_BUS_ADDRESS)
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"%([0-9A-Fa-f]{2})", lambda match: chr(int(match.group(1), 16)), value)
+
+
+def _open_socket(address: str, timeout: Optional[float]) -> socket.socket:
+    """A socket connected to the first reachable Unix socket in a D-Bus address."""
+    errors = []
+    for entry in address.split(";"):
+        transport, _, parameters = entry.partition(":")
+        options = dict(
+            parameter.partition("=")[::2] for parameter in parameters.split(",") if parameter
+        )
+        if transport != "unix":
+            errors.append(f"unsupported transport {transport!r}")
+            continue
+        if "path" in options:
+            target = _unescape(options["path"])
+        elif "abstract" in options:
+            target = "\0" + _unescape(options["abstract"])
+        else:
+            errors.append(f"no path in {entry!r}")
+            continue
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(target)
+        except OSError as e:
+            sock.close()
+            errors.append(str(e))
+            continue
+        return sock
+    raise ConnectionError(f"Could not connect to the bus at {address!r}: {'; '.join(errors)}")
+
+
+class Connection:
+    """A synchronous connection to a message bus.
+
+    Calls may be made from any thread, and are made one at a time. There is no thread reading
+    from the bus, so signals are only received while a call is made, or when dispatch() is called.
+
+    Args:
+        address: The address of the bus, such as returned by bus_address().
+
+        negotiate_unix_fd: Whether to ask the bus to pass file descriptors, as returned by
+            logind's Inhibit method.
+
+        timeout: The maximum number of seconds to wait to connect, and by default for each
+            call, or None to wait indefinitely.
+
+    Raises:
+        ConnectionError: If the bus could not be reached, or refused to authenticate.
+        TimeoutError: If the bus did not respond within the timeout.
+    """
+
+    def __init__(
+        self, address: str, negotiate_unix_fd: bool = False, timeout: Optional[float] = 5.0
+    ):
+        self.address = address
+        self.timeout = timeout
+        self.unix_fd = False
+        self.unique_name: Optional[str] = None
+        self._lock = threading.Lock()
+        self._serials = itertools.count(1)
+        self._buffer = bytearray()
+        self._fds: list[int] = []
+        self._signal_handlers: list[Callable[[Message], None]] = []
+        self._socket: Optional[socket.socket] = _open_socket(address, timeout)
+        try:
+            deadline = self._deadline(timeout)
+            self._authenticate(negotiate_unix_fd, deadline)
+            (self.unique_name,) = self.call(
+                DBUS_NAME, DBUS_PATH, DBUS_NAME, "Hello", timeout=timeout
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.address!r})"
+
+    @property
+    def connected(self) -> bool:
+        """False once the connection has been closed, by either end.
+
+        A connection closed by the bus is only noticed when next used.
+        """
+        return self._socket is not None
+
+    def close(self):
+        """Close the connection. The bus releases anything held through it."""
+        sock, self._socket = self._socket, None
+        if sock is not None:
+            sock.close()
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+
+    @staticmethod
+    def _deadline(timeout: Optional[float]) -> Optional[float]:
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _settimeout(self, deadline: Optional[float]):
+        if deadline is None:
+            self._socket.settimeout(None)
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("No response from the bus")
+        self._socket.settimeout(remaining)
+
+    def _fill(self, deadline: Optional[float], wait: bool = True) -> bool:
+        """Read whatever is available from the socket into the buffer, waiting until the deadline.
+
+        Returns:
+            False if nothing was available and wait was False, otherwise True.
+        """
+        if self._socket is None:
+            raise ConnectionError("Not connected to the bus")
+        if wait:
+            self._settimeout(deadline)
+        else:
+            self._socket.settimeout(0)
+        ancillary_size = socket.CMSG_SPACE(MAX_FDS * 4) if self.unix_fd else 0
+        try:
+            data, ancillary, _, _ = self._socket.recvmsg(
+                _RECEIVE_SIZE,
+                ancillary_size,
+                getattr(socket, "MSG_CMSG_CLOEXEC", 0),
+            )
+        except BlockingIOError:
+            return False
+        except socket.timeout:
+            raise TimeoutError("No response from the bus") from None
+        for level, kind, payload in ancillary:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds = array.array("i")
+                fds.frombytes(payload[: len(payload) - len(payload) % fds.itemsize])
+                self._fds.extend(fds)
+        if not data:
+            self.close()
+            raise ConnectionError("Connection closed by the bus")
+        self._buffer += data
+        return True
+
+    def _read_line(self, deadline: Optional[float]) -> bytes:
+        while b"\r\n" not in self._buffer:
+            self._fill(deadline)
+        end = self._buffer.index(b"\r\n")
+        line = bytes(self._buffer[:end])
+        del self._buffer[: end + 2]
+        return line
+
+    def _authenticate(self, negotiate_unix_fd: bool, deadline: Optional[float]):
+        self._settimeout(deadline)
+        uid = str(os.getuid()).encode("ascii").hex()
+        self._socket.sendall(f"\0AUTH EXTERNAL {uid}\r\n".encode("ascii"))
+        response = self._read_line(deadline)
+        if not response.startswith(b"OK "):
+            raise ConnectionError(
+                f"The bus refused authentication: {response.decode('ascii', 'replace')}"
+            )
+        if negotiate_unix_fd:
+            self._socket.sendall(b"NEGOTIATE_UNIX_FD\r\n")
+            self.unix_fd = self._read_line(deadline) == b"AGREE_UNIX_FD"
+        self._socket.sendall(b"BEGIN\r\n")
+
+    def _parse(self) -> Optional[Message]:
+        """The first message in the buffer, or None if it has not yet been wholly received."""
+        if len(self._buffer) < 16:
+            return None
+        big_endian = self._buffer[0] == ord("B")
+        order = ">" if big_endian else "<"
+        body_length, serial, fields_length = struct.unpack_from(f"{order}III", self._buffer, 4)
+        header_length = 16 + fields_length
+        header_length += -header_length % 8
+        if len(self._buffer) < header_length + body_length:
+            return None
+        data = bytes(self._buffer[: header_length + body_length])
+        del self._buffer[: header_length + body_length]
+        reader = _Reader(data, big_endian)
+        reader.position = 12
+        fields = {code: variant.value for code, variant in reader.read("a(yv)")}
+        fd_count = fields.get(_UNIX_FDS, 0)
+        fds, self._fds = self._fds[:fd_count], self._fds[fd_count:]
+        try:
+            body = unmarshal(fields.get(_SIGNATURE, ""), data[header_length:], big_endian, fds)
+        except ValueError:
+            for fd in fds:
+                os.close(fd)
+            raise
+        return Message(data[1], serial, fields, body, fds)
+
+    def _receive(self, deadline: Optional[float]) -> Message:
+        while True:
+            message = self._parse()
+            if message is not None:
+                return message
+            self._fill(deadline)
+
+    def _handle(self, message: Message):
+        """Pass a message which is not an awaited reply to the signal handlers, if a signal."""
+        try:
+            if message.type == SIGNAL:
+                for handler in self._signal_handlers:
+                    handler(message)
+        finally:
+            message.close_fds()
+
+    def add_signal_handler(self, handler: Callable[[Message], None]):
+        """Pass every signal received to a handler.
+
+        Only signals matched by a rule added with the bus's AddMatch method, or addressed to
+        this connection, are received. The handler is called on whichever thread is making a
+        call, or calling dispatch(), when the signal is received, and must not use the
+        connection itself.
+
+        Args:
+            handler: A function taking the Message.
+        """
+        self._signal_handlers.append(handler)
+
+    def dispatch(self):
+        """Pass any signals already received to the signal handlers, without waiting.
+
+        Raises:
+            ConnectionError: If the connection is closed.
+        """
+        with self._lock:
+            while True:
+                message = self._parse()
+                if message is not None:
+                    self._handle(message)
+                elif not self._fill(None, wait=False):
+                    return
+
+    def _send(self, data: bytes, fds: list[int], deadline: Optional[float]):
+        if self._socket is None:
+            raise ConnectionError("Not connected to the bus")
+        if fds and not self.unix_fd:
+            raise ValueError("The bus has not agreed to pass file descriptors")
+        self._settimeout(deadline)
+        try:
+            if fds:
+                sent = self._socket.sendmsg(
+                    [data],
+                    [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))],
+                )
+                self._socket.sendall(data[sent:])
+            else:
+                self._socket.sendall(data)
+        except OSError:
+            # A message only partly sent leaves the connection unusable
+            self.close()
+            raise
+
+    def call(
+        self,
+        destination: str,
+        path: str,
+        interface: Optional[str],
+        member: str,
+        signature: str = "",
+        body: Sequence = (),
+        timeout: Optional[float] = None,
+    ) -> list:
+        """Call a method, and wait for its reply.
+
+        Signals received meanwhile are passed to the signal handlers, and any other messages
+        which are not the reply are discarded. If the timeout expires, the connection remains
+        usable, and the reply is discarded if it arrives later.
+
+        Args:
+            destination: The name of the service.
+
+            path: The path of the object.
+
+            interface: The name of the interface, or None.
+
+            member: The name of the method.
+
+            signature: The signature of the arguments.
+
+            body: The arguments.
+
+            timeout: The maximum number of seconds to wait for the reply. Defaults to the
+                connection's timeout.
+
+        Returns:
+            The values returned by the method.
+
+        Raises:
+            DBusError: If the method returned an error.
+            TimeoutError: If no reply was received within the timeout.
+            ConnectionError: If the connection is closed.
+            ValueError: If the arguments do not match the signature.
+        """
+        fields = {
+            _PATH: Variant("o", path),
+            _MEMBER: Variant("s", member),
+            _DESTINATION: Variant("s", destination),
+        }
+        if interface is not None:
+            fields[_INTERFACE] = Variant("s", interface)
+        deadline = self._deadline(self.timeout if timeout is None else timeout)
+        with self._lock:
+            serial = next(self._serials)
+            data, fds = _message(METHOD_CALL, serial, fields, signature, body)
+            self._send(data, fds, deadline)
+            while True:
+                message = self._receive(deadline)
+                if message.reply_serial == serial and message.type in (METHOD_RETURN, ERROR):
+                    break
+                self._handle(message)
+        if message.type == ERROR:
+            message.close_fds()
+            text = message.body[0] if message.body and isinstance(message.body[0], str) else ""
+            raise DBusError(message.error_name, text)
+        return message.body
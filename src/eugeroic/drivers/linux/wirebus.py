@@ -0,0 +1,672 @@
+"""Inhibition over the minimal synchronous D-Bus client in eugeroic.drivers.linux.wire.
+
+This is the "wire" transport, chosen with eugeroic.drivers.linux.config.set_transport(). It
+inhibits through the same services as eugeroic.drivers.linux.bus, but makes every call directly
+on the calling thread, through a single connection to the session bus shared by the process, so
+there is no event loop or helper thread, and dbus_next is not imported. The calls to each backend
+are made one after another, each a single round trip over a local socket. logind's locks are
+held by file descriptors, so are taken through connections to the system bus which are closed
+once they are taken.
+
+Whether the screensaver is active is watched through its ActiveChanged signal, which is received
+whenever the shared connection is next used, so user activity is only simulated on entry when the
+display may be asleep.
+
+Should a deadline expire while waiting for the bus, the connection is closed, so that the bus
+releases anything made through it, including by a reply which is yet to arrive.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Optional
+
+from eugeroic import metrics
+from eugeroic.drivers.linux import config, logind
+from eugeroic.drivers.linux.wire import (
+    DBUS_NAME,
+    DBUS_PATH,
+    Connection,
+    DBusError,
+    Message,
+    Variant,
+    bus_address,
+)
+
+logger = logging.getLogger(__name__)
+
+SESSION = "session"
+SYSTEM = "system"
+
+
+class WireBackend:
+    """A D-Bus service through which the display can be kept awake, called over the wire transport.
+
+    Each is the counterpart of the backend of the same name in eugeroic.drivers.linux.backends.
+    """
+
+    # A short name by which the backend can be selected
+    name: str
+
+    bus = SESSION
+
+    # Whether the service releases the inhibition itself when the connection is lost
+    held_by_connection = True
+
+    bus_name: str
+    path: str
+    interface: str
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    def call(
+        self, connection: Connection, member: str, signature: str = "", body=(), timeout=None
+    ) -> list:
+        return connection.call(
+            self.bus_name, self.path, self.interface, member, signature, body, timeout
+        )
+
+    def inhibit(self, connection: Connection, app_name: str, reason: str, timeout: Optional[float]):
+        """Inhibit the display from sleeping.
+
+        Returns:
+            A token to be passed to uninhibit().
+
+        Raises:
+            DBusError: If the service refused or failed to inhibit.
+        """
+        raise NotImplementedError
+
+    def uninhibit(self, connection: Connection, token, timeout: Optional[float]):
+        """Release an inhibition previously made through inhibit().
+
+        Raises:
+            DBusError: If the service failed to release the inhibition.
+        """
+        raise NotImplementedError
+
+    def simulate_user_activity(self, connection: Connection, timeout: Optional[float]) -> bool:
+        """Simulate user activity to wake the display, if the service supports it.
+
+        Returns:
+            True if user activity was simulated, otherwise False.
+        """
+        return False
+
+
+class ScreenSaverBackend(WireBackend):
+
+    name = "screensaver"
+    bus_name = "org.freedesktop.ScreenSaver"
+    path = "/org/freedesktop/ScreenSaver"
+    interface = "org.freedesktop.ScreenSaver"
+
+    def inhibit(self, connection, app_name, reason, timeout):
+        (cookie,) = self.call(connection, "Inhibit", "ss", (app_name, reason), timeout)
+        return cookie
+
+    def uninhibit(self, connection, token, timeout):
+        self.call(connection, "UnInhibit", "u", (token,), timeout)
+
+    def simulate_user_activity(self, connection, timeout):
+        self.call(connection, "SimulateUserActivity", timeout=timeout)
+        return True
+
+    def get_active(self, connection, timeout) -> bool:
+        (active,) = self.call(connection, "GetActive", timeout=timeout)
+        return active
+
+    def get_session_idle_time(self, connection, timeout) -> int:
+        (seconds,) = self.call(connection, "GetSessionIdleTime", timeout=timeout)
+        return seconds
+
+
+class GnomeSessionManagerBackend(WireBackend):
+
+    name = "gnome"
+    bus_name = "org.gnome.SessionManager"
+    path = "/org/gnome/SessionManager"
+    interface = "org.gnome.SessionManager"
+
+    # Inhibit the session being marked as idle
+    INHIBIT_IDLE = 8
+
+    def inhibit(self, connection, app_name, reason, timeout):
+        (cookie,) = self.call(
+            connection, "Inhibit", "susu", (app_name, 0, reason, self.INHIBIT_IDLE), timeout
+        )
+        return cookie
+
+    def uninhibit(self, connection, token, timeout):
+        self.call(connection, "Uninhibit", "u", (token,), timeout)
+
+
+class PowerManagementBackend(WireBackend):
+
+    name = "power-management"
+    bus_name = "org.freedesktop.PowerManagement"
+    path = "/org/freedesktop/PowerManagement/Inhibit"
+    interface = "org.freedesktop.PowerManagement.Inhibit"
+
+    def inhibit(self, connection, app_name, reason, timeout):
+        (cookie,) = self.call(connection, "Inhibit", "ss", (app_name, reason), timeout)
+        return cookie
+
+    def uninhibit(self, connection, token, timeout):
+        self.call(connection, "UnInhibit", "u", (token,), timeout)
+
+
+class PortalBackend(WireBackend):
+
+    name = "portal"
+    bus_name = "org.freedesktop.portal.Desktop"
+    path = "/org/freedesktop/portal/desktop"
+    interface = "org.freedesktop.portal.Inhibit"
+
+    # Inhibit the session being marked as idle
+    INHIBIT_IDLE = 8
+
+    def inhibit(self, connection, app_name, reason, timeout):
+        options = {"reason": Variant("s", reason)}
+        (handle,) = self.call(
+            connection, "Inhibit", "sua{sv}", ("", self.INHIBIT_IDLE, options), timeout
+        )
+        return handle
+
+    def uninhibit(self, connection, token, timeout):
+        # The inhibition is released by closing the request object returned by Inhibit
+        connection.call(
+            self.bus_name, token, "org.freedesktop.portal.Request", "Close", timeout=timeout
+        )
+
+
+class Login1Backend(WireBackend):
+    """The inhibition is held for as long as the file descriptor returned by Inhibit is open.
+
+    Nothing else need be kept alive, so rather than the shared connection, the inhibition is made
+    through a connection which is closed as soon as the file descriptor is received.
+    """
+
+    name = "login1"
+    bus = SYSTEM
+    held_by_connection = False
+    bus_name = logind.BUS_NAME
+    path = logind.PATH
+    interface = logind.INTERFACE
+
+    def inhibit(self, connection, app_name, reason, timeout):
+        fd = logind.inhibit(reason, config.login1_targets, app_name=app_name, timeout=timeout)
+        _held_fds.add(fd)
+        return fd
+
+    def uninhibit(self, connection, token, timeout):
+        _held_fds.discard(token)
+        os.close(token)
+
+
+BACKENDS = (
+    ScreenSaverBackend(),
+    GnomeSessionManagerBackend(),
+    PowerManagementBackend(),
+    PortalBackend(),
+    Login1Backend(),
+)
+
+_backends_by_name = {backend.name: backend for backend in BACKENDS}
+
+_lock = threading.Lock()
+
+# Serialises subscribing to ActiveChanged
+_watch_lock = threading.Lock()
+
+# The shared connection to each bus
+_connections: dict[str, Connection] = {}
+
+# The names present on each bus, keyed by bus and address, discovered once per process
+_discovered_names: dict[tuple[str, str], frozenset[str]] = {}
+
+# The connections on which ActiveChanged is watched, and whether the screensaver is active, as
+# last reported on each, if known
+_screensaver_watched: weakref.WeakSet = weakref.WeakSet()
+_screensaver_active: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# The file descriptors holding logind inhibitor locks
+_held_fds: set[int] = set()
+
+# Connections inherited from the parent process by a forked child
+_inherited: list = []
+
+
+def _after_fork_in_child():
+    # The connections' sockets are shared with the parent, so must never be used or closed
+    # here. They are kept referenced, so that they are never finalized either.
+    global _lock, _watch_lock
+    _inherited.append(dict(_connections))
+    _connections.clear()
+    _lock = threading.Lock()
+    _watch_lock = threading.Lock()
+    # Otherwise the child would go on holding the parent's logind locks after the parent
+    # released them
+    for fd in _held_fds:
+        os.close(fd)
+    _held_fds.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _deadline(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else time.monotonic() + seconds
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("No response from D-Bus")
+    return remaining
+
+
+def connection(bus: str = SESSION, deadline: Optional[float] = None) -> Optional[Connection]:
+    """The shared connection to a bus, connected (or reconnected) if necessary.
+
+    Args:
+        bus: Either "session" or "system".
+
+        deadline: The time.monotonic() time by which to have connected, or None to wait
+            indefinitely.
+
+    Returns:
+        The connection, or None if there is no session bus.
+
+    Raises:
+        OSError: If the bus could not be connected to.
+    """
+    with _lock:
+        existing = _connections.get(bus)
+        if existing is not None and existing.connected:
+            return existing
+        if existing is not None:
+            logger.debug("D-Bus connection lost; reconnecting")
+        address = bus_address(bus)
+        if address is None:
+            metrics.record_fallback()
+            logger.debug("No D-Bus %s bus", bus)
+            return None
+        connected = _connections[bus] = Connection(
+            address,
+            negotiate_unix_fd=(bus == SYSTEM),
+            timeout=_remaining(deadline),
+        )
+        # Calls are made with the remaining time of each deadline
+        connected.timeout = None
+        return connected
+
+
+def disconnect():
+    """Close the shared connections, if any.
+
+    Any inhibitions made through the connections will be released by the bus. New connections
+    will be made when next needed.
+    """
+    with _lock:
+        connections = list(_connections.values())
+        _connections.clear()
+    for existing in connections:
+        existing.close()
+
+
+def _call(connection: Connection, deadline: Optional[float], method, *args):
+    """Call a backend's method, closing the connection if the deadline expires first."""
+    try:
+        return method(connection, *args, _remaining(deadline))
+    except TimeoutError:
+        connection.close()
+        raise
+
+
+def discover_names(
+    connection: Connection, bus: str, deadline: Optional[float] = None
+) -> frozenset[str]:
+    """The names present, or activatable, on a bus.
+
+    The names are discovered once per process for each bus address, and cached thereafter.
+    """
+    key = (bus, connection.address)
+    try:
+        return _discovered_names[key]
+    except KeyError:
+        pass
+    names = set()
+    for member in ("ListNames", "ListActivatableNames"):
+        metrics.record_dbus_calls()
+        try:
+            (listed,) = connection.call(
+                DBUS_NAME, DBUS_PATH, DBUS_NAME, member, timeout=_remaining(deadline)
+            )
+        except DBusError as e:
+            logger.debug("Could not list names on the %s bus: %s", bus, e)
+        else:
+            names.update(listed)
+    discovered = _discovered_names[key] = frozenset(names)
+    if bus == SESSION and not any(backend.bus_name in discovered for backend in BACKENDS):
+        logger.warning(
+            "No service on the D-Bus session bus through which to keep the display awake"
+        )
+    return discovered
+
+
+def _names_on(bus: str, deadline: Optional[float]) -> frozenset[str]:
+    """The names present on a bus, or none if the bus is not available."""
+    if bus == SESSION:
+        bus_connection = connection(SESSION, deadline)
+        return (
+            frozenset()
+            if bus_connection is None
+            else discover_names(bus_connection, SESSION, deadline)
+        )
+    # The system bus is only needed to take logind's file descriptors, so it is not kept connected
+    address = bus_address(SYSTEM)
+    try:
+        return _discovered_names[(SYSTEM, address)]
+    except KeyError:
+        pass
+    try:
+        with Connection(address, timeout=_remaining(deadline)) as transient:
+            return discover_names(transient, SYSTEM, deadline)
+    except TimeoutError:
+        raise
+    except OSError as e:
+        # Unlike the session bus, the system bus is only needed by some backends
+        logger.debug("Could not connect to the D-Bus system bus: %s", e)
+        return frozenset()
+
+
+def available_backends(deadline: Optional[float] = None) -> list[WireBackend]:
+    """The enabled backends whose services are present, in order of preference."""
+    names = {}
+    available = []
+    for backend in (_backends_by_name[name] for name in config.enabled_backends):
+        if backend.bus not in names:
+            names[backend.bus] = _names_on(backend.bus, deadline)
+        if backend.bus_name in names[backend.bus]:
+            available.append(backend)
+    if not available:
+        logger.debug("No D-Bus service available to inhibit the display from sleeping")
+    return available
+
+
+def _inhibit(backend: WireBackend, reason: str, app_name: str, deadline: Optional[float]):
+    # Backends not held by the connection make their own
+    bus_connection = connection(backend.bus, deadline) if backend.held_by_connection else None
+    metrics.record_dbus_calls()
+    try:
+        if bus_connection is None:
+            token = backend.inhibit(None, app_name, reason, _remaining(deadline))
+        else:
+            token = _call(bus_connection, deadline, backend.inhibit, app_name, reason)
+    except (DBusError, ConnectionError) as e:
+        if isinstance(e, ConnectionError) and bus_connection is not None:
+            raise
+        logger.debug("%s Inhibit not available: %s", backend.interface, e)
+        metrics.record_backend_failure(backend.name, e, reason)
+        return None
+    logger.debug("%s Inhibit: %r gives %r", backend.interface, reason, token)
+    return backend, bus_connection, token
+
+
+def _release(inhibitions: list, deadline: Optional[float]):
+    """Release every inhibition, raising TimeoutError afterwards if the deadline expired."""
+    timed_out = False
+    for backend, bus_connection, token in inhibitions:
+        if not backend.held_by_connection:
+            # The inhibition is held by a file descriptor, released without a call
+            backend.uninhibit(bus_connection, token, None)
+            logger.debug("%s UnInhibit: %r", backend.interface, token)
+            continue
+        if not bus_connection.connected:
+            # The bus has already released any inhibition made through this connection
+            logger.debug("D-Bus connection lost while inhibited; %r already released", token)
+            continue
+        metrics.record_dbus_calls()
+        try:
+            _call(bus_connection, deadline, backend.uninhibit, token)
+        except TimeoutError:
+            timed_out = True
+        except ConnectionError:
+            logger.debug("D-Bus connection lost while inhibited; %r already released", token)
+        except DBusError as e:
+            logger.debug("%s UnInhibit not available: %s", backend.interface, e)
+            metrics.record_backend_failure(backend.name, e)
+        else:
+            logger.debug("%s UnInhibit: %r", backend.interface, token)
+    if timed_out:
+        raise TimeoutError(f"No response from D-Bus within {config.exit_deadline} seconds")
+
+
+def _simulate_user_activity(backends: list[WireBackend], deadline: Optional[float]):
+    for backend in backends:
+        if not backend.held_by_connection:
+            # Neither can logind simulate user activity, nor is it kept connected to
+            continue
+        bus_connection = connection(backend.bus, deadline)
+        metrics.record_dbus_calls()
+        try:
+            if _call(bus_connection, deadline, backend.simulate_user_activity):
+                logger.debug("%s SimulateUserActivity", backend.interface)
+                return
+        except DBusError as e:
+            logger.debug("%s SimulateUserActivity not available: %s", backend.interface, e)
+            metrics.record_backend_failure(backend.name, e)
+
+
+def _add_match(bus_connection: Connection, rule: str, timeout: Optional[float]):
+    bus_connection.call(DBUS_NAME, DBUS_PATH, DBUS_NAME, "AddMatch", "s", (rule,), timeout)
+
+
+def _watch_screensaver(bus_connection: Connection, deadline: Optional[float]):
+    screensaver = _backends_by_name["screensaver"]
+
+    def active_changed(message: Message):
+        if (message.path, message.interface, message.member) == (
+            screensaver.path,
+            screensaver.interface,
+            "ActiveChanged",
+        ):
+            logger.debug("%s ActiveChanged: %r", screensaver.interface, message.body[0])
+            _screensaver_active[bus_connection] = message.body[0]
+
+    rule = (
+        f"type='signal',sender='{screensaver.bus_name}',path='{screensaver.path}',"
+        f"interface='{screensaver.interface}',member='ActiveChanged'"
+    )
+    metrics.record_dbus_calls()
+    try:
+        # Not through _call(), since the connection, and what is held through it, remains
+        # usable if the deadline expires
+        _add_match(bus_connection, rule, _remaining(deadline))
+    except (DBusError, TimeoutError) as e:
+        # The state is unknown, and another subscription is attempted on next use
+        logger.debug("Could not watch %s ActiveChanged: %r", screensaver.interface, e)
+        return
+    bus_connection.add_signal_handler(active_changed)
+    _screensaver_watched.add(bus_connection)
+    metrics.record_dbus_calls()
+    try:
+        active = _call(bus_connection, deadline, screensaver.get_active)
+    except DBusError as e:
+        logger.debug("%s GetActive not available: %s", screensaver.interface, e)
+        return
+    # Any ActiveChanged received meanwhile is at least as recent as the reply
+    _screensaver_active.setdefault(bus_connection, active)
+
+
+def screensaver_active(deadline: Optional[float] = None) -> Optional[bool]:
+    """Whether the screensaver is active, or None if it is not known.
+
+    On first use of a connection, subscribes to ActiveChanged and asks the screensaver once.
+    Thereafter the state is kept up to date by the signal, with no further calls.
+    """
+    bus_connection = connection(SESSION, deadline)
+    if bus_connection is None:
+        return None
+    with _watch_lock:
+        if bus_connection in _screensaver_watched:
+            # Receive any ActiveChanged already sent, without waiting
+            try:
+                bus_connection.dispatch()
+            except ConnectionError:
+                logger.debug("D-Bus connection lost while watching the screensaver")
+                return None
+        elif _backends_by_name["screensaver"].bus_name in discover_names(
+            bus_connection, SESSION, deadline
+        ):
+            _watch_screensaver(bus_connection, deadline)
+    return _screensaver_active.get(bus_connection)
+
+
+def _wake(backends: list[WireBackend], deadline: Optional[float]):
+    """Simulate user activity, unless the screensaver is known not to be active."""
+    # Only the ScreenSaver can say whether it is active, and only it can simulate user activity
+    if _backends_by_name["screensaver"] not in backends:
+        return
+    if screensaver_active(deadline) is False:
+        logger.debug("Screensaver is not active; not simulating user activity")
+        return
+    _simulate_user_activity(backends, deadline)
+
+
+def _inhibited_screensaver(
+    reason: str, app_name: str, wake: bool, deadline: Optional[float]
+) -> list:
+    inhibitions = []
+    try:
+        backends = available_backends(deadline)
+        for backend in backends:
+            inhibition = _inhibit(backend, reason, app_name, deadline)
+            if inhibition is not None:
+                inhibitions.append(inhibition)
+        if wake:
+            _wake(backends, deadline)
+    except BaseException:
+        # Closing the connection on a timeout has already released anything it held
+        try:
+            _release(inhibitions, _deadline(config.exit_deadline))
+        except Exception as e:
+            logger.debug("Could not release inhibitions after failing to inhibit: %r", e)
+        raise
+    return inhibitions
+
+
+@contextmanager
+def inhibited_screensaver(reason: str, *, app_name: Optional[str] = None, wake: bool = True):
+    """A context manager to inhibit the screensaver.
+
+    Inhibits through every enabled backend whose service is present on the bus, one after
+    another. On exit, every inhibition is released.
+
+    Args:
+        reason: A descriptive reason for inhibiting the screensaver.
+
+        app_name: The name of the application inhibiting the screensaver. Defaults to the
+            name of the current executable.
+
+        wake: Whether to simulate user activity to wake the display, if the screensaver is
+            active or not known not to be. Defaults to True.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the deadlines given to set_deadlines().
+        Exception: If an error occurs while inhibiting the screensaver.
+    """
+    if app_name is None:
+        app_name = sys.argv[0]
+    try:
+        inhibitions = _inhibited_screensaver(
+            reason, app_name, wake, _deadline(config.enter_deadline)
+        )
+    except TimeoutError:
+        raise TimeoutError(
+            f"No response from D-Bus within {config.enter_deadline} seconds"
+        ) from None
+    try:
+        yield
+    finally:
+        _release(inhibitions, _deadline(config.exit_deadline))
+
+
+def simulate_user_activity():
+    """Simulate user activity, through the first available backend which supports it.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the entry deadline given to
+            set_deadlines().
+        Exception: If an error occurs while communicating with the D-Bus.
+    """
+    deadline = _deadline(config.enter_deadline)
+    try:
+        _simulate_user_activity(available_backends(deadline), deadline)
+    except TimeoutError:
+        raise TimeoutError(
+            f"No response from D-Bus within {config.enter_deadline} seconds"
+        ) from None
+
+
+def is_screensaver_active() -> Optional[bool]:
+    """Whether the screensaver is active, as last reported by the ScreenSaver service.
+
+    The first call subscribes to the ActiveChanged signal on the shared connection, and asks the
+    screensaver once. Thereafter the state is kept up to date by the signal, so is returned
+    without a round trip to the bus.
+
+    Returns:
+        True if the screensaver is active, False if it is not, or None if there is no
+        ScreenSaver service or it did not say.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the entry deadline given to
+            set_deadlines().
+    """
+    try:
+        return screensaver_active(_deadline(config.enter_deadline))
+    except TimeoutError:
+        raise TimeoutError(
+            f"No response from D-Bus within {config.enter_deadline} seconds"
+        ) from None
+
+
+def session_idle_time() -> Optional[int]:
+    """The number of seconds for which the session has been idle, asked of the ScreenSaver service.
+
+    Unlike is_screensaver_active(), each call is a round trip to the bus.
+
+    Returns:
+        The number of seconds, or None if there is no ScreenSaver service or it does not say.
+
+    Raises:
+        TimeoutError: If the D-Bus does not respond within the entry deadline given to
+            set_deadlines().
+    """
+    deadline = _deadline(config.enter_deadline)
+    screensaver = _backends_by_name["screensaver"]
+    try:
+        bus_connection = connection(SESSION, deadline)
+        if bus_connection is None or screensaver.bus_name not in discover_names(
+            bus_connection, SESSION, deadline
+        ):
+            return None
+        metrics.record_dbus_calls()
+        return _call(bus_connection, deadline, screensaver.get_session_idle_time)
+    except DBusError as e:
+        logger.debug("%s GetSessionIdleTime not available: %s", screensaver.interface, e)
+        return None
+    except TimeoutError:
+        raise TimeoutError(
+            f"No response from D-Bus within {config.enter_deadline} seconds"
+        ) from None
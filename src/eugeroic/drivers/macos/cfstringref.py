@@ -1,21 +1,91 @@
+import threading
+from collections import OrderedDict
+
 import objc
 from CoreFoundation import CFStringCreateWithCString, kCFStringEncodingUTF8
 
 
+def cfstring(string: str):
+    """A new CFString with the same contents as string."""
+    return CFStringCreateWithCString(
+        None,
+        string.encode("utf-8"),
+        kCFStringEncodingUTF8,
+    )
+
+
 # noinspection PyUnresolvedReferences
 def cfstringref(string: str):
-    return objc.pyobjc_id(
-        CFStringCreateWithCString(
-            None,
-            string.encode("utf-8"),
-            kCFStringEncodingUTF8,
-        ).nsstring()
-    )
+    """A CFStringRef for string.
+
+    The referenced CFString is not retained, so must be used immediately. Prefer CFStringCache,
+    which retains the CFStrings it converts while they are cached.
+    """
+    return objc.pyobjc_id(cfstring(string).nsstring())
+
+
+class CFStringCache:
+    """A cache of CFStringRefs, converted from Python strings once rather than on every use.
+
+    Each CFString is retained for as long as it is cached. Pinned strings, such as the names of
+    assertion types, are retained for the life of the cache; others are retained in a bounded
+    least-recently-used cache, so that arbitrary reason strings cannot grow it without limit.
+
+    Args:
+        maxsize: The maximum number of unpinned strings to cache.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._pinned: dict[str, tuple[object, int]] = {}
+        self._recent: OrderedDict[str, tuple[object, int]] = OrderedDict()
+
+    def _after_fork_in_child(self):
+        # The cached CFStrings are copied into the child with the rest of its memory, but the lock
+        # may have been held by a thread which did not survive the fork
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pinned) + len(self._recent)
+
+    @staticmethod
+    def _convert(string: str) -> tuple[object, int]:
+        # The CFString object is kept alongside its reference, so that it outlives the reference
+        cf = cfstring(string)
+        return cf, objc.pyobjc_id(cf.nsstring())
+
+    def pin(self, string: str) -> int:
+        """The CFStringRef for string, retained for the life of the cache."""
+        try:
+            return self._pinned[string][1]
+        except KeyError:
+            pass
+        with self._lock:
+            entry = self._recent.pop(string, None) or self._convert(string)
+            self._pinned.setdefault(string, entry)
+            return self._pinned[string][1]
 
+    def ref(self, string: str) -> int:
+        """The CFStringRef for string, retained while it remains among the most recently used."""
+        try:
+            return self._pinned[string][1]
+        except KeyError:
+            pass
+        with self._lock:
+            try:
+                self._recent.move_to_end(string)
+                return self._recent[string][1]
+            except KeyError:
+                pass
+            entry = self._recent[string] = self._convert(string)
+            while len(self._recent) > self.maxsize:
+                self._recent.popitem(last=False)
+            return entry[1]
 
 
 if __name__ == "__main__":
     # Test the function
     python_string = "Hello, CFStringRef!"
     cf_string_ref = cfstringref(python_string)
-    print(cf_string_ref)
\ No newline at end of file
+    print(cf_string_ref)
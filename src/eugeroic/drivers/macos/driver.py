@@ -1,5 +1,5 @@
 import contextlib
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
 from eugeroic.drivers.macos.iokit import (
     power_management_assertion, AssertionType, Level,
@@ -9,11 +9,27 @@ from eugeroic.drivers.macos.iokit import (
 
 @contextlib.contextmanager
 def wakefulness(logger, reason: str, wake: bool=True) -> Generator[None, None, None]:
-    logger.debug("Entering wakefulness state during: %r", reason)
+    logger.debug("Inhibiting display sleep during: %r", reason)
     try:
         with power_management_assertion(AssertionType.PreventUserIdleDisplaySleep, Level.On, reason):
             if wake:
                 declare_local_user_activity(reason)
             yield
     finally:
-        logger.debug("Exiting wakefulness state after: %r", reason)
+        logger.debug("Releasing display sleep inhibition after: %r", reason)
+
+
+@contextlib.asynccontextmanager
+async def awakefulness(logger, reason: str, wake: bool = True) -> AsyncGenerator[None, None]:
+    """An asynchronous context manager which prevents the display from sleeping.
+
+    The underlying calls are cheap and non-blocking, so are made directly.
+    """
+    with wakefulness(logger, reason, wake):
+        yield
+
+
+def simulate_user_activity(logger, reason: str):
+    """Simulate user activity, to keep the display awake where inhibition is ignored."""
+    logger.debug("Simulating user activity during: %r", reason)
+    declare_local_user_activity(reason)
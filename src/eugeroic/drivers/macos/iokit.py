@@ -1,17 +1,28 @@
+import atexit
 import contextlib
 import ctypes.util
-import time
+import os
+import threading
 from enum import IntEnum
+from typing import Optional
 
 try:
     from enum import StrEnum  # Introduced in Python 3.11
 except ImportError:
     from backports.strenum import StrEnum
 
-from eugeroic.drivers.macos.cfstringref import cfstringref
+from eugeroic.drivers.macos.cfstringref import CFStringCache
 
 _iokit = None
 
+# Assertion types and names are converted to CFStrings once, rather than on every call. Reasons
+# are arbitrary, so only the most recently used are retained.
+_cfstrings = CFStringCache(maxsize=128)
+
+# The assertion through which user activity is declared, reused for every declaration
+_user_activity_lock = threading.Lock()
+_user_activity_assertion_id: Optional[ctypes.c_uint32] = None
+
 
 def get_iokit():
     global _iokit
@@ -67,10 +78,7 @@ class UserActiveType(IntEnum):
 def assertion_create_name(iokit, assertion_type: str, level: Level, reason: str):
     assertion_id = ctypes.c_uint32()
     status = iokit.IOPMAssertionCreateWithName(
-        cfstringref(assertion_type),
-        level,
-        cfstringref(reason),
-        ctypes.byref(assertion_id)
+        _cfstrings.pin(assertion_type), level, _cfstrings.ref(reason), ctypes.byref(assertion_id)
     )
     if status != 0:
         raise RuntimeError(f"Failed to create assertion with name: {assertion_type!r}")
@@ -83,12 +91,31 @@ def assertion_release(iokit, assertion_id: int):
         raise RuntimeError(f"Failed to release assertion: {assertion_id}")
 
 
-def assertion_declare_user_activity(iokit, assertion_name: str, user_active_type: UserActiveType):
-    assertion_id = ctypes.c_uint32()
+def assertion_declare_user_activity(
+    iokit,
+    assertion_name: str,
+    user_active_type: UserActiveType,
+    assertion_id: Optional[ctypes.c_uint32] = None,
+):
+    """Declare user activity, creating an assertion or updating an existing one.
+
+    Args:
+        iokit: The IOKit library.
+
+        assertion_name: The name of the assertion.
+
+        user_active_type: Whether the activity is local or remote.
+
+        assertion_id: The ID of an assertion previously returned by this function, which is
+            updated rather than a new one created, or None to create a new one.
+
+    Returns:
+        The assertion ID, to be released with assertion_release() when no longer needed.
+    """
+    if assertion_id is None:
+        assertion_id = ctypes.c_uint32()
     status = iokit.IOPMAssertionDeclareUserActivity(
-        cfstringref(assertion_name),
-        user_active_type,
-        ctypes.byref(assertion_id)
+        _cfstrings.ref(assertion_name), user_active_type, ctypes.byref(assertion_id)
     )
     if status != 0:
         raise RuntimeError(f"Failed to declare user activity: {assertion_name!r}")
@@ -106,6 +133,53 @@ def power_management_assertion(assertion_type: AssertionType, level, reason):
 
 
 def declare_local_user_activity(reason):
-    """Declare local activity to wake the screen."""
+    """Declare local activity to wake the screen.
+
+    A single user activity assertion is created on first use, and updated by each subsequent
+    declaration. It is released when the interpreter exits.
+    """
+    global _user_activity_assertion_id
     iokit = get_iokit()
-    assertion_declare_user_activity(iokit, reason, UserActiveType.Local)
+    with _user_activity_lock:
+        if _user_activity_assertion_id is not None:
+            try:
+                assertion_declare_user_activity(
+                    iokit,
+                    reason,
+                    UserActiveType.Local,
+                    _user_activity_assertion_id,
+                )
+                return
+            except RuntimeError:
+                # The assertion may have timed out or been released; create another
+                _user_activity_assertion_id = None
+        _user_activity_assertion_id = assertion_declare_user_activity(
+            iokit,
+            reason,
+            UserActiveType.Local,
+        )
+        atexit.register(release_user_activity_assertion)
+
+
+def release_user_activity_assertion():
+    """Release the assertion through which user activity is declared, if any."""
+    global _user_activity_assertion_id
+    with _user_activity_lock:
+        assertion_id, _user_activity_assertion_id = _user_activity_assertion_id, None
+    if assertion_id is not None:
+        atexit.unregister(release_user_activity_assertion)
+        assertion_release(get_iokit(), assertion_id)
+
+
+def _after_fork_in_child():
+    # Assertions belong to the process which created them, so the child must make its own
+    global _user_activity_lock, _user_activity_assertion_id
+    _user_activity_lock = threading.Lock()
+    if _user_activity_assertion_id is not None:
+        atexit.unregister(release_user_activity_assertion)
+    _user_activity_assertion_id = None
+    _cfstrings._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,15 +1,30 @@
 import contextlib
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
 
 @contextlib.contextmanager
-def wakefulness(logger, reason: str) -> Generator[None, None, None]:
+def wakefulness(logger, reason: str, wake: bool = True) -> Generator[None, None, None]:
     """A context manager which prevents the display from sleeping.
     """
-    logger.debug("Entering wakefulness state during: %r", reason)
+    logger.debug("Inhibiting display sleep during: %r", reason)
     logger.debug("Unsupported attempt to enter wakefulness state during: %r", reason)
     try:
         yield
     finally:
-        logger.debug("Exiting wakefulness state after: %r", reason)
+        logger.debug("Releasing display sleep inhibition after: %r", reason)
         logger.debug("Unsupported attempt to exit wakefulness state during : %r", reason)
+
+
+@contextlib.asynccontextmanager
+async def awakefulness(logger, reason: str, wake: bool = True) -> AsyncGenerator[None, None]:
+    """An asynchronous context manager which prevents the display from sleeping.
+
+    There is nothing to block on, so this simply wraps the synchronous context manager.
+    """
+    with wakefulness(logger, reason, wake):
+        yield
+
+
+def simulate_user_activity(logger, reason: str):
+    """Simulate user activity, to keep the display awake where inhibition is ignored."""
+    logger.debug("Unsupported attempt to simulate user activity during: %r", reason)
@@ -0,0 +1,422 @@
+"""A registry which coalesces wakefulness holders into a single OS-level inhibition.
+
+The first holder to enter, across all threads and event loops, acquires the OS-level inhibition
+through the platform driver. Subsequent holders merely increment a count, and the last holder to
+leave releases the OS-level inhibition. The reason given by each holder is tracked so that the
+reasons for which the display is being kept awake can be inspected.
+
+Holders may be synchronous, or asynchronous in which case the OS-level inhibition is acquired
+on the event loop of the first holder. Whichever kind of holder is last to leave, the inhibition
+is released the same way it was acquired: synchronously, or on the event loop which acquired it.
+
+The last holder to leave may ask for the OS-level inhibition to linger for a while, so that
+holders which arrive in quick succession reuse it rather than each acquiring and releasing it
+afresh. A lingering inhibition is released when the linger period expires, or on the event loop
+which acquired it being shut down, or by release_lingering(), whichever is first.
+"""
+
+import asyncio
+import contextlib
+import logging
+import threading
+from collections import Counter
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextlib import (
+    AbstractAsyncContextManager,
+    AbstractContextManager,
+    AsyncExitStack,
+    ExitStack,
+)
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Inhibitions abandoned by forked child processes
+_abandoned: list = []
+
+
+class InhibitionRegistry:
+    """A reference-counted registry of wakefulness holders.
+
+    Args:
+        inhibit: A callable accepting a reason and a wake flag, and returning a context manager
+            which holds the OS-level inhibition for its duration.
+
+        ainhibit: A callable accepting a reason and a wake flag, and returning an asynchronous
+            context manager which holds the OS-level inhibition for its duration.
+    """
+
+    def __init__(
+        self,
+        inhibit: Callable[[str, bool], AbstractContextManager],
+        ainhibit: Callable[[str, bool], AbstractAsyncContextManager],
+    ):
+        self._inhibit = inhibit
+        self._ainhibit = ainhibit
+        # Protects the state below. Never held while acquiring or releasing the OS-level
+        # inhibition; instead a transition is marked as in progress, and holders arriving
+        # meanwhile wait for it to end, so a holder never proceeds before the inhibition is
+        # in place.
+        self._condition = threading.Condition()
+        self._reasons = Counter()
+        self._count = 0
+        self._stack: Optional[ExitStack | AsyncExitStack] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transitioning = False
+        # The event loop on which the transition in progress is being made, if any, and whether
+        # it is acquiring rather than releasing the inhibition
+        self._transition_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transition_acquiring = False
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        # Incremented each time the inhibition starts or stops lingering, so that a scheduled
+        # expiry can tell whether it still applies
+        self._lingering = False
+        self._linger_generation = 0
+        self._expiry_task: Optional[asyncio.Task] = None
+
+    @property
+    def count(self) -> int:
+        """The number of active holders."""
+        return self._count
+
+    @property
+    def is_inhibited(self) -> bool:
+        """True if the OS-level inhibition is currently held, including while lingering."""
+        return self._stack is not None
+
+    @property
+    def is_lingering(self) -> bool:
+        """True if the OS-level inhibition is held only because it is lingering."""
+        return self._lingering
+
+    def reasons(self) -> Counter:
+        """The number of active holders for each reason."""
+        with self._condition:
+            return self._reasons.copy()
+
+    def _register(self, reason: str):
+        if self._lingering:
+            self._lingering = False
+            self._linger_generation += 1
+        self._count += 1
+        self._reasons[reason] += 1
+
+    def _unregister(self, reason: str):
+        if self._reasons[reason] == 0:
+            del self._reasons[reason]
+            raise ValueError(f"No active holder for reason {reason!r}")
+        self._reasons[reason] -= 1
+        if self._reasons[reason] == 0:
+            del self._reasons[reason]
+        self._count -= 1
+
+    def _begin_transition(self, loop: Optional[asyncio.AbstractEventLoop], acquiring: bool):
+        self._transitioning = True
+        self._transition_loop = loop
+        self._transition_acquiring = acquiring
+
+    def _end_transition(self):
+        with self._condition:
+            self._transitioning = False
+            self._transition_loop = None
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def _inhibited(self, stack, loop, reason: str):
+        with self._condition:
+            self._stack = stack
+            self._loop = loop
+            self._register(reason)
+        self._end_transition()
+
+    def _take_stack(self, reason: str, linger: float = 0.0):
+        """Unregister a holder, returning the stack to be closed if it was the last.
+
+        If the inhibition is to linger, its expiry is scheduled instead, and no stack is returned.
+        """
+        with self._condition:
+            self._unregister(reason)
+            if self._count > 0:
+                return None, None
+            if linger > 0:
+                self._lingering = True
+                self._linger_generation += 1
+                self._schedule_expiry(self._linger_generation, self._loop, linger)
+                return None, None
+            return self._take_stack_now()
+
+    def _take_stack_now(self):
+        if self._stack is None:
+            # Abandoned, so there is nothing to release
+            return None, None
+        self._begin_transition(self._loop, acquiring=False)
+        stack, self._stack = self._stack, None
+        loop, self._loop = self._loop, None
+        return stack, loop
+
+    def _take_lingering_stack(self, generation: Optional[int] = None):
+        """The stack to be closed if the inhibition is still lingering, else None."""
+        with self._condition:
+            while self._transitioning:
+                self._condition.wait()
+            if not self._lingering or generation not in (None, self._linger_generation):
+                return None, None
+            self._lingering = False
+            self._linger_generation += 1
+            return self._take_stack_now()
+
+    def _schedule_expiry(
+        self, generation: int, loop: Optional[asyncio.AbstractEventLoop], linger: float
+    ):
+        if loop is None:
+            from .timers import call_later
+
+            call_later(linger, self._expire, generation)
+        elif _running_loop() is loop:
+            # Run as a task on the loop which acquired the inhibition, so that it is released
+            # there even if the loop is shut down before the linger period expires
+            self._expiry_task = loop.create_task(self._aexpire(generation, linger))
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._aexpire(generation, linger), loop)
+        else:
+            logger.warning("Event loop which acquired the inhibition is no longer running")
+
+    def _expire(self, generation: int):
+        with self._condition:
+            if not self._lingering or generation != self._linger_generation:
+                return
+        from .background import background
+
+        # Closing may block on the platform, so is not done on the timer thread
+        background.submit(self._expire_now, generation)
+
+    def _expire_now(self, generation: int):
+        try:
+            stack, loop = self._take_lingering_stack(generation)
+            if stack is not None:
+                logger.debug("Linger period expired; releasing inhibition")
+                self._close(stack, loop)
+        except Exception as e:
+            logger.warning("Could not release the lingering inhibition: %s", e)
+
+    async def _aexpire(self, generation: int, linger: float):
+        try:
+            await asyncio.sleep(linger)
+        except asyncio.CancelledError:
+            # The loop is being shut down, so release now while it can still be done
+            pass
+        with self._condition:
+            if self._transitioning or not self._lingering or generation != self._linger_generation:
+                return
+            self._lingering = False
+            self._linger_generation += 1
+            stack, _ = self._take_stack_now()
+        logger.debug("Linger period expired; releasing inhibition")
+        await self._aclose(stack)
+
+    def release_lingering(self):
+        """Release the OS-level inhibition now if it is held only because it is lingering."""
+        stack, loop = self._take_lingering_stack()
+        if stack is not None:
+            self._close(stack, loop)
+
+    def abandon(self):
+        """Forget the OS-level inhibition, without releasing it.
+
+        For use in a forked child process, in which the inhibition, and the threads, event
+        loops and connections through which it is held, belong to the parent. Holders entered
+        before the fork may still be released, but no longer affect any inhibition.
+        """
+        self._condition = threading.Condition()
+        if self._stack is not None:
+            # Kept referenced, since finalizing the stack's context managers would release the
+            # parent's inhibition through the parent's connections
+            _abandoned.append(self._stack)
+        self._stack = None
+        self._loop = None
+        self._transitioning = False
+        self._transition_loop = None
+        self._async_waiters = []
+        self._lingering = False
+        self._linger_generation += 1
+        self._expiry_task = None
+
+    async def _aclose(self, stack: AsyncExitStack):
+        try:
+            await stack.aclose()
+        finally:
+            self._end_transition()
+
+    def _close(self, stack: ExitStack | AsyncExitStack, loop: Optional[asyncio.AbstractEventLoop]):
+        if loop is None:
+            try:
+                stack.close()
+            finally:
+                self._end_transition()
+            return
+        if not loop.is_running():
+            logger.warning("Event loop which acquired the inhibition is no longer running")
+            self._end_transition()
+            return
+        future = asyncio.run_coroutine_threadsafe(self._aclose(stack), loop)
+        if _running_loop() is not loop:
+            future.result()
+        # Otherwise we're being called synchronously from the loop itself, so can't wait
+
+    def acquire(self, reason: str, wake: bool = True):
+        """Register a holder, acquiring the OS-level inhibition if this is the first.
+
+        Args:
+            reason: The reason for keeping the display awake.
+
+            wake: Whether to simulate user activity when acquiring the OS-level inhibition.
+                Ignored if the inhibition is already held, as the display is then already awake.
+
+        If called on an event loop while that loop is itself acquiring the inhibition, the
+        holder is registered at once, since waiting would stop the loop finishing the acquisition.
+
+        Raises:
+            RuntimeError: If called on an event loop while that loop is releasing the inhibition.
+            Exception: If the OS-level inhibition could not be acquired, in which case the
+                holder is not registered.
+        """
+        loop = _running_loop()
+        with self._condition:
+            while self._transitioning:
+                if loop is not None and self._transition_loop is loop:
+                    if not self._transition_acquiring:
+                        raise RuntimeError(
+                            "Cannot hold synchronously while this event loop is releasing the"
+                            " inhibition; use an asynchronous holder instead"
+                        )
+                    logger.debug("Joining the inhibition being acquired on this event loop")
+                    self._register(reason)
+                    return
+                self._condition.wait()
+            if self._stack is not None:
+                self._register(reason)
+                return
+            self._begin_transition(None, acquiring=True)
+        try:
+            stack = ExitStack()
+            stack.enter_context(self._inhibit(reason, wake))
+        except BaseException:
+            self._end_transition()
+            raise
+        self._inhibited(stack, None, reason)
+
+    def release(self, reason: str, linger: float = 0.0):
+        """Unregister a holder, releasing the OS-level inhibition if this is the last.
+
+        If the inhibition was acquired asynchronously, it is released on the event loop which
+        acquired it.
+
+        Args:
+            reason: The reason given when the holder was acquired.
+
+            linger: If this is the last holder, the number of seconds for which to keep the
+                OS-level inhibition in place, for reuse by any holder acquired meanwhile.
+
+        Raises:
+            ValueError: If there is no active holder for reason.
+            Exception: If the OS-level inhibition could not be released.
+        """
+        stack, loop = self._take_stack(reason, linger)
+        if stack is not None:
+            self._close(stack, loop)
+
+    async def aacquire(self, reason: str, wake: bool = True):
+        """Register a holder, asynchronously acquiring the OS-level inhibition if this is the first.
+
+        Args:
+            reason: The reason for keeping the display awake.
+
+            wake: Whether to simulate user activity when acquiring the OS-level inhibition.
+                Ignored if the inhibition is already held, as the display is then already awake.
+
+        Raises:
+            Exception: If the OS-level inhibition could not be acquired, in which case the
+                holder is not registered.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if not self._transitioning:
+                    if self._stack is not None:
+                        self._register(reason)
+                        return
+                    self._begin_transition(loop, acquiring=True)
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+        try:
+            stack = AsyncExitStack()
+            await stack.enter_async_context(self._ainhibit(reason, wake))
+        except BaseException:
+            self._end_transition()
+            raise
+        self._inhibited(stack, loop, reason)
+
+    async def arelease(self, reason: str, linger: float = 0.0):
+        """Unregister a holder, asynchronously releasing the OS-level inhibition if it is the last.
+
+        If the inhibition was acquired synchronously, it is released synchronously, which
+        briefly blocks the event loop.
+
+        Args:
+            reason: The reason given when the holder was acquired.
+
+            linger: If this is the last holder, the number of seconds for which to keep the
+                OS-level inhibition in place, for reuse by any holder acquired meanwhile.
+
+        Raises:
+            ValueError: If there is no active holder for reason.
+            Exception: If the OS-level inhibition could not be released.
+        """
+        stack, loop = self._take_stack(reason, linger)
+        if stack is None:
+            return
+        if loop is asyncio.get_running_loop():
+            # Shielded so a cancelled holder still releases the inhibition
+            await asyncio.shield(self._aclose(stack))
+        elif loop is not None and loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._aclose(stack), loop))
+        else:
+            self._close(stack, loop)
+
+    @contextlib.contextmanager
+    def hold(
+        self, reason: str, wake: bool = True, linger: float = 0.0
+    ) -> Generator[None, None, None]:
+        """A context manager which registers a holder for its duration."""
+        self.acquire(reason, wake)
+        try:
+            yield
+        finally:
+            self.release(reason, linger)
+
+    @contextlib.asynccontextmanager
+    async def ahold(
+        self, reason: str, wake: bool = True, linger: float = 0.0
+    ) -> AsyncGenerator[None, None]:
+        """An asynchronous context manager which registers a holder for its duration."""
+        await self.aacquire(reason, wake)
+        try:
+            yield
+        finally:
+            await self.arelease(reason, linger)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,229 @@
+"""Sharing of the parent's OS-level inhibition with forked child processes.
+
+A forked child cannot use the threads, event loops or bus connections of its parent, so without
+help each child, such as every worker of a multiprocessing pool, would open its own connection
+and hold its own inhibition. Instead, a pair of connected sockets is made for each child as it
+is forked. The child's registry acquires and releases its OS-level inhibition by asking the
+parent over its socket, and the parent registers a holder in its own registry on the child's
+behalf. So every process in the tree shares the parent's single inhibition, the child's holders
+are counted locally with only the first and last crossing to the parent, and the parent releases
+anything still held by a child which exits or crashes without releasing it.
+
+The protocol is line based. Each request is a single line, answered by a single line of "OK" or
+"ERR <message>":
+
+    ACQUIRE <wake> <reason>
+    RELEASE
+"""
+
+import logging
+import selectors
+import socket
+import threading
+from collections.abc import Callable
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Requests longer than this are rejected, and the child disconnected
+MAX_LINE = 4096
+
+
+class ParentError(Exception):
+    """The parent process could not keep the display awake on behalf of the child."""
+
+
+class ParentChannel:
+    """A child's connection to the parent process which forked it.
+
+    Args:
+        sock: The child's end of the pair of sockets made when it was forked.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._socket = sock
+        self._lock = threading.Lock()
+        self._buffer = b""
+
+    def close(self):
+        """Close the connection, releasing anything held by the parent on the child's behalf."""
+        self._socket.close()
+
+    def _request(self, line: str):
+        with self._lock:
+            self._socket.sendall(f"{line}\n".encode("utf-8"))
+            while b"\n" not in self._buffer:
+                data = self._socket.recv(MAX_LINE)
+                if not data:
+                    raise ConnectionError("Connection closed by the parent process")
+                self._buffer += data
+            response, _, self._buffer = self._buffer.partition(b"\n")
+        status, _, message = response.decode("utf-8").partition(" ")
+        if status != "OK":
+            raise ParentError(message)
+
+    def acquire(self, reason: str, wake: bool):
+        """Ask the parent to keep the display awake.
+
+        Raises:
+            ParentError: If the parent could not keep the display awake.
+            OSError: If the parent could not be asked.
+        """
+        # Reasons are free text, but each request must be a single line
+        reason = " ".join(reason.splitlines())
+        self._request(f"ACQUIRE {int(wake)} {reason}")
+
+    def release(self):
+        """Ask the parent to stop keeping the display awake on this child's behalf."""
+        self._request("RELEASE")
+
+
+class _Child:
+    """The parent's end of the connection to a child, and what it holds on the child's behalf."""
+
+    __slots__ = ("socket", "buffer", "token")
+
+    def __init__(self, sock: socket.socket):
+        self.socket = sock
+        self.buffer = b""
+        self.token: Optional[Any] = None
+
+
+class ChildChannels:
+    """The parent's connections to the children it has forked.
+
+    The connections are served by a single daemon thread, started when the first child is
+    forked.
+
+    Args:
+        acquire: A callable accepting a reason and a wake flag, which registers a holder on
+            behalf of a child, returning a token to be passed to release.
+
+        release: A callable accepting a token returned by acquire, which unregisters the holder.
+    """
+
+    def __init__(self, acquire: Callable[[str, bool], Any], release: Callable[[Any], None]):
+        self._acquire = acquire
+        self._release = release
+        self._lock = threading.Lock()
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wakeup: Optional[tuple[socket.socket, socket.socket]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._children: list[_Child] = []
+        self._pending: list[_Child] = []
+        self._forking: Optional[tuple[socket.socket, socket.socket]] = None
+
+    @property
+    def count(self) -> int:
+        """The number of children still connected, or whose holders are still being released."""
+        return len(self._children) + len(self._pending)
+
+    def before_fork(self):
+        """Make the pair of sockets through which the next child will be connected."""
+        try:
+            self._forking = socket.socketpair()
+        except OSError as e:
+            logger.warning("Could not make a channel for a child process: %s", e)
+            self._forking = None
+
+    def after_fork_in_parent(self):
+        """Serve the parent's end of the connection to the child just forked."""
+        pair, self._forking = self._forking, None
+        if pair is None:
+            return
+        parent_end, child_end = pair
+        child_end.close()
+        with self._lock:
+            self._pending.append(_Child(parent_end))
+            if self._thread is None:
+                self._selector = selectors.DefaultSelector()
+                self._wakeup = socket.socketpair()
+                self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+                self._thread = threading.Thread(
+                    target=self._run, name="eugeroic-children", daemon=True
+                )
+                self._thread.start()
+            # The thread serves new connections once woken
+            self._wakeup[1].send(b"\0")
+
+    def after_fork_in_child(self) -> Optional[socket.socket]:
+        """Close the sockets inherited from the parent, returning the child's end of its own."""
+        pair, self._forking = self._forking, None
+        # The parent's ends of its other children's connections are not this child's to use
+        for child in self._children + self._pending:
+            child.socket.close()
+        if self._wakeup is not None:
+            for sock in self._wakeup:
+                sock.close()
+        if self._selector is not None:
+            self._selector.close()
+        if pair is None:
+            return None
+        parent_end, child_end = pair
+        parent_end.close()
+        return child_end
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    self._wakeup[0].recv(MAX_LINE)
+                    with self._lock:
+                        pending, self._pending = self._pending, []
+                    for child in pending:
+                        self._children.append(child)
+                        self._selector.register(child.socket, selectors.EVENT_READ, child)
+                else:
+                    self._serve(key.data)
+
+    def _serve(self, child: _Child):
+        try:
+            data = child.socket.recv(MAX_LINE)
+        except OSError:
+            data = b""
+        if not data:
+            self._disconnect(child)
+            return
+        child.buffer += data
+        while b"\n" in child.buffer:
+            line, _, child.buffer = child.buffer.partition(b"\n")
+            response = self._handle(child, line.decode("utf-8", errors="replace"))
+            try:
+                child.socket.sendall(f"{response}\n".encode("utf-8"))
+            except OSError:
+                self._disconnect(child)
+                return
+        if len(child.buffer) > MAX_LINE:
+            logger.warning("Disconnecting child process after an overlong request")
+            self._disconnect(child)
+
+    def _handle(self, child: _Child, line: str) -> str:
+        command, _, argument = line.partition(" ")
+        try:
+            if command == "ACQUIRE":
+                if child.token is not None:
+                    return "ERR Already held"
+                wake, _, reason = argument.partition(" ")
+                child.token = self._acquire(reason, wake == "1")
+                return "OK"
+            if command == "RELEASE":
+                if child.token is None:
+                    return "ERR Not held"
+                token, child.token = child.token, None
+                self._release(token)
+                return "OK"
+        except Exception as e:
+            return f"ERR {type(e).__name__}: {e}"
+        return f"ERR Unknown command {command!r}"
+
+    def _disconnect(self, child: _Child):
+        self._selector.unregister(child.socket)
+        child.socket.close()
+        if child.token is not None:
+            # The child exited, or crashed, while holding the inhibition
+            token, child.token = child.token, None
+            try:
+                self._release(token)
+            except Exception as e:
+                logger.warning("Could not release on behalf of a child process: %s", e)
+        self._children.remove(child)
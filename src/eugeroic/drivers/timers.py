@@ -0,0 +1,140 @@
+"""A single shared thread on which timed callbacks are run.
+
+Rather than starting a thread for each delayed or periodic action, such as releasing a lingering
+inhibition, every such action in the process is scheduled on one daemon thread, which sleeps
+until the earliest of them is due. Callbacks are run one at a time on that thread, so they should
+not block for long.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """A handle for a callback scheduled with TimerThread.call_later().
+
+    Attributes:
+        when: The time.monotonic() time at which the callback is due.
+    """
+
+    __slots__ = ("when", "_callback", "_args", "_cancelled")
+
+    def __init__(self, when: float, callback: Callable, args: tuple):
+        self.when = when
+        self._callback = callback
+        self._args = args
+        self._cancelled = False
+
+    def __repr__(self):
+        state = "cancelled" if self._cancelled else f"when={self.when!r}"
+        return f"{type(self).__name__}({self._callback!r}, {state})"
+
+    @property
+    def cancelled(self) -> bool:
+        """True if the callback has been cancelled."""
+        return self._cancelled
+
+    def cancel(self):
+        """Cancel the callback, if it has not already been run."""
+        self._cancelled = True
+
+
+class TimerThread:
+    """A daemon thread which runs callbacks at scheduled times.
+
+    The thread is started when the first callback is scheduled, and lives for the remainder of
+    the process.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap: list[tuple[float, int, Timer]] = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """Schedule a callback to be run after a delay.
+
+        Args:
+            delay: The number of seconds after which to run the callback.
+
+            callback: The callable to run, on the timer thread.
+
+            *args: Arguments with which to call the callback.
+
+        Returns:
+            A Timer through which the callback can be cancelled.
+        """
+        timer = Timer(time.monotonic() + delay, callback, args)
+        with self._condition:
+            heapq.heappush(self._heap, (timer.when, next(self._sequence), timer))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="eugeroic-timer", daemon=True
+                )
+                self._thread.start()
+            elif self._heap[0][2] is timer:
+                # The thread may be sleeping until a later callback
+                self._condition.notify()
+        return timer
+
+    def _after_fork_in_child(self):
+        # The thread did not survive the fork, and the callbacks belong to the parent
+        self._condition = threading.Condition()
+        self._heap = []
+        self._thread = None
+
+    def _next_due(self) -> Timer:
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                when, _, timer = self._heap[0]
+                delay = when - time.monotonic()
+                if delay <= 0:
+                    heapq.heappop(self._heap)
+                    return timer
+                self._condition.wait(delay)
+
+    def _run(self):
+        while True:
+            timer = self._next_due()
+            if timer.cancelled:
+                continue
+            try:
+                timer._callback(*timer._args)
+            except Exception:
+                logger.exception("Timer callback %r failed", timer._callback)
+
+
+timer_thread = TimerThread()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=timer_thread._after_fork_in_child)
+
+
+def call_later(delay: float, callback: Callable, *args) -> Timer:
+    """Schedule a callback to be run on the shared timer thread after a delay.
+
+    Args:
+        delay: The number of seconds after which to run the callback.
+
+        callback: The callable to run.
+
+        *args: Arguments with which to call the callback.
+
+    Returns:
+        A Timer through which the callback can be cancelled.
+    """
+    return timer_thread.call_later(delay, callback, *args)
@@ -1,5 +1,5 @@
+import concurrent.futures
 import ctypes
-import time
 
 
 # https://learn.microsoft.com/en-us/windows/win32/api/winbase/nf-winbase-setthreadexecutionstate
@@ -10,15 +10,28 @@ ES_DISPLAY_REQUIRED= 0x00000002
 
 MOUSEEVENTF_MOVE = 0x0001
 
+# The execution state is per-thread, and the inhibition may be released on a different thread
+# from the one on which it was acquired, so all changes are made on a single dedicated thread.
+_execution_state_thread = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="eugeroic-execution-state",
+)
+
+
+def _set_thread_execution_state(flags):
+    return _execution_state_thread.submit(
+        ctypes.windll.kernel32.SetThreadExecutionState, flags
+    ).result()
+
+
 def inhibit_screensaver():
     """Inhibit the screensaver from starting."""
-    ctypes.windll.kernel32.SetThreadExecutionState(
-        ES_CONTINUOUS| ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED
-    )
+    _set_thread_execution_state(ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED)
+
 
 def uninhibit_screensaver():
     """Uninhibit the screensaver from starting."""
-    ctypes.windll.kernel32.SetThreadExecutionState(ES_CONTINUOUS)
+    _set_thread_execution_state(ES_CONTINUOUS)
 
 
 def simulate_user_activity():
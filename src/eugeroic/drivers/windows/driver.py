@@ -1,22 +1,38 @@
 import contextlib
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
 from eugeroic.drivers.windows.display import (
-    inhibit_screensaver, uninhibit_screensaver,
-    simulate_user_activity,
+    inhibit_screensaver,
+    uninhibit_screensaver,
+    simulate_user_activity as display_simulate_user_activity,
 )
 
-
 @contextlib.contextmanager
 def wakefulness(logger, reason: str, wake: bool=True) -> Generator[None, None, None]:
     """A context manager which prevents the display from sleeping.
     """
-    logger.debug("Entering wakefulness state during: %r", reason)
+    logger.debug("Inhibiting display sleep during: %r", reason)
     inhibit_screensaver()
     try:
         if wake:
-            simulate_user_activity()
+            display_simulate_user_activity()
         yield
     finally:
-        logger.debug("Exiting wakefulness state after: %r", reason)
+        logger.debug("Releasing display sleep inhibition after: %r", reason)
         uninhibit_screensaver()
+
+
+@contextlib.asynccontextmanager
+async def awakefulness(logger, reason: str, wake: bool = True) -> AsyncGenerator[None, None]:
+    """An asynchronous context manager which prevents the display from sleeping.
+
+    The underlying calls are cheap and non-blocking, so are made directly.
+    """
+    with wakefulness(logger, reason, wake):
+        yield
+
+
+def simulate_user_activity(logger, reason: str):
+    """Simulate user activity, to keep the display awake where inhibition is ignored."""
+    logger.debug("Simulating user activity during: %r", reason)
+    display_simulate_user_activity()
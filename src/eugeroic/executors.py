@@ -0,0 +1,243 @@
+"""Keep the display awake while an executor has work to do.
+
+An AwakeExecutor wraps any concurrent.futures.Executor, such as a ThreadPoolExecutor or
+ProcessPoolExecutor, holding the display awake while at least one future submitted through it is
+pending or running, and releasing it once they have all finished. However many tasks are
+submitted, only the first of a busy period acquires anything; every other submission costs an
+increment of a count, and every completion a decrement, made in the submitting process without
+any communication with the workers.
+
+Example:
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    from eugeroic.executors import AwakeExecutor
+
+    with AwakeExecutor(ProcessPoolExecutor(), "Rendering frames", grace=5.0) as executor:
+        frames = list(executor.map(render, range(10_000)))
+    print(f"Kept awake for {executor.awake_seconds:.1f} seconds")
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Optional
+
+from eugeroic.drivers import _acquire, _get_registry, _release
+from eugeroic.drivers.timers import Timer, call_later
+
+logger = logging.getLogger(__name__)
+
+
+class AwakeExecutor(Executor):
+    """An executor which keeps the display awake while any of its futures is pending or running.
+
+    Tasks are run by the wrapped executor. The display is held awake from the submission which
+    finds no other future pending until the last pending future is done, whether it completed,
+    raised or was cancelled, and for grace seconds after that. A task submitted during the grace
+    period keeps the display held without reacquiring it.
+
+    Holding the display shares the single OS-level inhibition of wakefulness blocks.
+
+    Args:
+        executor: The executor which runs the tasks. Shutting down the AwakeExecutor shuts it down.
+
+        reason: The reason for keeping the display awake.
+
+        grace: The number of seconds for which to keep the display awake after the last pending
+            future is done. Defaults to 0, releasing it immediately.
+
+        wake: Whether to simulate user activity to awaken the display if it is already asleep,
+            each time the display is held. Defaults to True.
+
+    Raises:
+        ValueError: If grace is negative.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        reason: str = "Executing tasks",
+        *,
+        grace: float = 0.0,
+        wake: bool = True,
+    ):
+        if grace < 0:
+            raise ValueError(f"grace must not be negative, not {grace!r}")
+        self.executor = executor
+        self.reason = reason
+        self.grace = grace
+        self.wake = wake
+        # Protects the state below. The display is held and released without it, but while it is
+        # being held or released _transitioning is set, and submissions wait for that to finish,
+        # so that no task is submitted before the display is held
+        self._condition = threading.Condition()
+        self._transitioning = False
+        self._pending = 0
+        self._registry = None
+        # The time.perf_counter() time at which the display was held, while it is held
+        self._entered: Optional[float] = None
+        self._held_since = 0.0
+        self._awake_seconds = 0.0
+        self._timer: Optional[Timer] = None
+        # Incremented each time a grace period starts or ends, so that a scheduled expiry can
+        # tell whether it still applies
+        self._generation = 0
+        self._shutdown = False
+
+    @property
+    def pending(self) -> int:
+        """The number of submitted futures which are not yet done."""
+        return self._pending
+
+    @property
+    def held(self) -> bool:
+        """True while the executor is holding the display awake, including during a grace period."""
+        return self._entered is not None
+
+    @property
+    def awake_seconds(self) -> float:
+        """The total number of seconds for which the executor has held the display awake."""
+        with self._condition:
+            if self._entered is None:
+                return self._awake_seconds
+            return self._awake_seconds + time.monotonic() - self._held_since
+
+    def _hold(self):
+        """Hold the display, outside the lock while transitioning."""
+        if self._registry is None:
+            self._registry = _get_registry()
+        entered = _acquire(self._registry, self.reason, self.wake)
+        with self._condition:
+            self._entered = entered
+            self._held_since = time.monotonic()
+
+    def _take_hold(self) -> Optional[float]:
+        """Start releasing the display, under the lock, returning what is to be released."""
+        self._transitioning = True
+        return self._entered
+
+    def _unhold(self, entered: Optional[float]):
+        """Release the display, outside the lock while transitioning."""
+        try:
+            _release(self._registry, self.reason, 0.0, entered)
+        finally:
+            with self._condition:
+                self._entered = None
+                self._awake_seconds += time.monotonic() - self._held_since
+            self._end_transition()
+
+    def _unhold_in_background(self, entered: Optional[float]):
+        """Release the display on the background thread, for threads which must not block."""
+        from eugeroic.drivers.background import background
+
+        background.submit(self._unhold_logging_failure, entered)
+
+    def _unhold_logging_failure(self, entered: Optional[float]):
+        try:
+            self._unhold(entered)
+        except Exception as e:
+            logger.warning("Could not release the display: %s", e)
+
+    def _end_transition(self):
+        with self._condition:
+            self._transitioning = False
+            self._condition.notify_all()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        """Submit a task to the wrapped executor, holding the display awake if it is not already.
+
+        Raises:
+            RuntimeError: If the executor has been shut down.
+            Exception: If the display could not be held, in which case the task is not submitted.
+        """
+        hold = False
+        with self._condition:
+            while self._transitioning:
+                self._condition.wait()
+            self._pending += 1
+            if self._pending == 1:
+                if self._timer is not None:
+                    # Within the grace period, so the display is still held
+                    self._generation += 1
+                    self._timer.cancel()
+                    self._timer = None
+                elif self._entered is None:
+                    hold = self._transitioning = True
+        if hold:
+            try:
+                self._hold()
+            except BaseException:
+                with self._condition:
+                    self._pending -= 1
+                raise
+            finally:
+                self._end_transition()
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        # Called at once if the future is already done
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Optional[Future]):
+        with self._condition:
+            self._pending -= 1
+            if self._pending or self._entered is None:
+                return
+            if self.grace > 0 and not self._shutdown:
+                self._generation += 1
+                self._timer = call_later(self.grace, self._expire, self._generation)
+                return
+            entered = self._take_hold()
+        if future is None:
+            # A rejected submission, on the submitting thread, which may as well wait
+            self._unhold(entered)
+        else:
+            # On a worker, or whichever thread cancelled the future
+            self._unhold_in_background(entered)
+
+    def _expire(self, generation: int):
+        with self._condition:
+            if (
+                generation != self._generation
+                or self._transitioning
+                or self._pending
+                or self._entered is None
+            ):
+                return
+            self._timer = None
+            logger.debug("Grace period expired; releasing during: %r", self.reason)
+            entered = self._take_hold()
+        # Rather than on the timer thread, which must not block
+        self._unhold_in_background(entered)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        """Shut down the wrapped executor.
+
+        The display is released as soon as no future is pending, without waiting for any grace
+        period.
+
+        Args:
+            wait: Whether to wait for pending futures to finish.
+
+            cancel_futures: Whether to cancel pending futures which have not started running.
+        """
+        with self._condition:
+            self._shutdown = True
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        with self._condition:
+            # Including any release in progress on the background thread
+            while self._transitioning:
+                self._condition.wait()
+            if self._pending or self._entered is None:
+                return
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            entered = self._take_hold()
+        self._unhold(entered)
@@ -0,0 +1,252 @@
+"""Keep the display awake while items keep flowing through an iterator.
+
+awake_iter() and aawake_iter() pass through the items of an iterable, or an asynchronous
+iterable, unchanged, holding the display awake for as long as items keep arriving. Should none
+arrive for stall_timeout seconds, as when a pipeline is stalled on a dead upstream, the display
+is released, and it is held again as soon as items resume.
+
+Stalls are detected on the shared timer thread, which looks a few times per stall_timeout at
+whether an item has been seen since it last looked. So each item costs no more than setting one
+flag and checking another, without even reading the clock. After a stall the display is released
+on the background thread of non-blocking wakefulness blocks, so that a slow platform does not
+delay other timers.
+
+Example:
+
+    from eugeroic import awake_iter
+
+    for record in awake_iter(read_upstream(), "Ingesting records", stall_timeout=300):
+        store(record)
+"""
+
+import logging
+import threading
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+from typing import Optional, TypeVar
+
+from eugeroic.drivers import _aacquire, _acquire, _arelease, _get_registry, _release
+from eugeroic.drivers.timers import Timer, call_later
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# The number of times per stall_timeout that the timer looks for items, so that a stall is
+# detected between one and 1.25 times stall_timeout after the last item
+_TICKS = 4
+
+
+class _StallWatch:
+    """A wakefulness holder, held while items arrive and released after a stall.
+
+    The iterating thread sets seen for each item, and calls resume() if the holder is not held.
+    A timer on the shared timer thread clears seen every stall_timeout / _TICKS seconds, and
+    has the holder released on the background thread once it has found seen clear _TICKS times
+    in a row.
+    """
+
+    __slots__ = (
+        "reason",
+        "stall_timeout",
+        "wake",
+        "linger",
+        "seen",
+        "held",
+        "_lock",
+        "_registry",
+        "_entered",
+        "_timer",
+        "_quiet_ticks",
+    )
+
+    def __init__(self, reason: str, stall_timeout: float, wake: bool, linger: float):
+        self.reason = reason
+        self.stall_timeout = stall_timeout
+        self.wake = wake
+        self.linger = linger
+        self.seen = False
+        self.held = False
+        # Protects the holder from being released twice, by a stall and by closing
+        self._lock = threading.Lock()
+        self._registry = _get_registry()
+        self._entered = 0.0
+        self._timer: Optional[Timer] = None
+        self._quiet_ticks = 0
+
+    def _hold(self, entered: float):
+        with self._lock:
+            self._entered = entered
+            self.held = True
+            self._quiet_ticks = 0
+            self._timer = call_later(self.stall_timeout / _TICKS, self._tick)
+
+    def resume(self):
+        """Hold the display awake, from the start of iteration or after a stall."""
+        self._hold(_acquire(self._registry, self.reason, self.wake))
+
+    async def aresume(self):
+        """Hold the display awake asynchronously, from the start of iteration or after a stall."""
+        self._hold(await _aacquire(self._registry, self.reason, self.wake))
+
+    def _take(self) -> Optional[float]:
+        """Stop holding, returning the time the holder was entered, or None if it was not held."""
+        with self._lock:
+            if not self.held:
+                return None
+            self.held = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            return self._entered
+
+    def _tick(self):
+        with self._lock:
+            if not self.held:
+                return
+            if self.seen:
+                # An item which sets seen just as it is cleared arrived at this tick, so the
+                # stall is still measured from about the right time
+                self.seen = False
+                self._quiet_ticks = 0
+            else:
+                self._quiet_ticks += 1
+            if self._quiet_ticks < _TICKS:
+                self._timer = call_later(self.stall_timeout / _TICKS, self._tick)
+                return
+            self.held = False
+            self._timer = None
+            entered = self._entered
+        logger.debug(
+            "No item for %s seconds; releasing during: %r", self.stall_timeout, self.reason
+        )
+        from eugeroic.drivers.background import background
+
+        # Releasing may block on the platform, so is not done on the timer thread
+        background.submit(self._release_after_stall, entered)
+
+    def _release_after_stall(self, entered: float):
+        try:
+            _release(self._registry, self.reason, self.linger, entered)
+        except Exception as e:
+            logger.warning("Could not release the display after a stall: %s", e)
+
+    def close(self):
+        """Release the display, if it is being held."""
+        entered = self._take()
+        if entered is not None:
+            _release(self._registry, self.reason, self.linger, entered)
+
+    async def aclose(self):
+        """Release the display asynchronously, if it is being held."""
+        entered = self._take()
+        if entered is not None:
+            await _arelease(self._registry, self.reason, self.linger, entered)
+
+
+def _validate(stall_timeout: float):
+    if stall_timeout <= 0:
+        raise ValueError(f"stall_timeout must be positive, not {stall_timeout!r}")
+
+
+def _awake_iter(iterable: Iterable[T], watch: _StallWatch) -> Iterator[T]:
+    watch.resume()
+    try:
+        for item in iterable:
+            watch.seen = True
+            if not watch.held:
+                watch.resume()
+            yield item
+    finally:
+        watch.close()
+
+
+def awake_iter(
+    iterable: Iterable[T],
+    reason: str,
+    stall_timeout: float = 60.0,
+    *,
+    wake: bool = True,
+    linger: float = 0.0,
+) -> Iterator[T]:
+    """Keep the display awake while items keep arriving from an iterable.
+
+    The display is held awake from the start of iteration until the iterable is exhausted, or
+    the iterator is closed or garbage collected. Should no item arrive for stall_timeout seconds,
+    including while the consumer is itself busy with an item, the display is released, within a
+    quarter of stall_timeout more, to be held again before the next item is passed on.
+
+    Holding the display shares the single OS-level inhibition of wakefulness blocks, so nested
+    iterators and blocks cost no more than incrementing a count.
+
+    Args:
+        iterable: The items to pass through.
+
+        reason: The reason for keeping the display awake.
+
+        stall_timeout: The number of seconds without a new item after which the display is
+            released. Defaults to 60.
+
+        wake: Whether to simulate user activity to awaken the display if it is already asleep,
+            each time the display is held. Defaults to True.
+
+        linger: The number of seconds for which to keep the display awake after a stall, or
+            after iteration ends, if nothing else is keeping it awake. Defaults to 0.
+
+    Returns:
+        An iterator over the items of iterable.
+
+    Raises:
+        ValueError: If stall_timeout is not positive.
+    """
+    _validate(stall_timeout)
+    return _awake_iter(iterable, _StallWatch(reason, stall_timeout, wake, linger))
+
+
+async def _aawake_iter(iterable: AsyncIterable[T], watch: _StallWatch) -> AsyncIterator[T]:
+    await watch.aresume()
+    try:
+        async for item in iterable:
+            watch.seen = True
+            if not watch.held:
+                await watch.aresume()
+            yield item
+    finally:
+        await watch.aclose()
+
+
+def aawake_iter(
+    iterable: AsyncIterable[T],
+    reason: str,
+    stall_timeout: float = 60.0,
+    *,
+    wake: bool = True,
+    linger: float = 0.0,
+) -> AsyncIterator[T]:
+    """Keep the display awake while items keep arriving from an asynchronous iterable.
+
+    As awake_iter(), except that the display is held and released on the running event loop,
+    without blocking it, as by awakefulness(). A stall is still detected on the shared timer
+    thread, and the display released on the event loop which held it.
+
+    Args:
+        iterable: The items to pass through.
+
+        reason: The reason for keeping the display awake.
+
+        stall_timeout: The number of seconds without a new item after which the display is
+            released. Defaults to 60.
+
+        wake: Whether to simulate user activity to awaken the display if it is already asleep,
+            each time the display is held. Defaults to True.
+
+        linger: The number of seconds for which to keep the display awake after a stall, or
+            after iteration ends, if nothing else is keeping it awake. Defaults to 0.
+
+    Returns:
+        An asynchronous iterator over the items of iterable.
+
+    Raises:
+        ValueError: If stall_timeout is not positive.
+    """
+    _validate(stall_timeout)
+    return _aawake_iter(iterable, _StallWatch(reason, stall_timeout, wake, linger))
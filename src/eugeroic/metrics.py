@@ -0,0 +1,367 @@
+"""Runtime metrics for wakefulness, and hooks through which to export them.
+
+Metrics are always collected, at the cost of a lock and a little arithmetic for each wakefulness
+block, and can be read at any time with stats(). Hooks registered with add_hook() are called
+synchronously, in the thread (or on the event loop) in which the event occurred, so should be
+quick; any exception raised by a hook is logged and otherwise ignored. When no hook is registered
+for an event, the cost of checking is a single truth test.
+
+Example:
+
+    from eugeroic import metrics
+
+    def on_release(reason, held_seconds):
+        histogram.labels(reason=reason).observe(held_seconds)
+
+    metrics.add_hook("release", on_release)
+"""
+
+import bisect
+import logging
+import os
+import threading
+from collections import Counter
+from collections.abc import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the buckets into which latencies are counted. Observations
+# greater than the last bound are counted in a final, unbounded, bucket.
+LATENCY_BOUNDS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+# The events for which hooks can be registered, and the arguments with which they are called
+EVENTS = {
+    # reason, and the seconds taken to enter the wakefulness block
+    "acquire": ("reason", "seconds"),
+    # reason, and the seconds for which the wakefulness block was held
+    "release": ("reason", "held_seconds"),
+    # reason (or None if not known), and the exception
+    "error": ("reason", "error"),
+}
+
+
+class Histogram:
+    """A snapshot of the distribution of a duration.
+
+    Attributes:
+        bounds: The upper bounds of the buckets, in seconds.
+
+        counts: The number of observations in each bucket, with one more bucket than bounds
+            for observations exceeding the last bound.
+
+        count: The total number of observations.
+
+        total: The sum of all observations, in seconds.
+    """
+
+    def __init__(self, bounds: tuple[float, ...], counts: tuple[int, ...], total: float):
+        self.bounds = bounds
+        self.counts = counts
+        self.count = sum(counts)
+        self.total = total
+
+    def __repr__(self):
+        return f"{type(self).__name__}(count={self.count}, mean={self.mean!r})"
+
+    @property
+    def mean(self) -> Optional[float]:
+        """The mean observation in seconds, or None if there are no observations."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The upper bound of the bucket containing the q-th quantile.
+
+        Args:
+            q: The quantile, between 0 and 1.
+
+        Returns:
+            The upper bound in seconds, infinity if the quantile lies beyond the last bound, or
+            None if there are no observations.
+
+        Raises:
+            ValueError: If q is not between 0 and 1.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile {q!r} is not between 0 and 1")
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank and cumulative > 0:
+                return bound
+        return float("inf")
+
+
+class Stats:
+    """A snapshot of the metrics collected since the process started, or since reset().
+
+    Attributes:
+        active: The number of wakefulness blocks currently held.
+
+        total: The number of wakefulness blocks entered.
+
+        inhibitions: The number of OS-level inhibitions acquired through the platform driver,
+            not counting attempts which failed or were skipped by the circuit breaker. Nested
+            and concurrent wakefulness blocks share a single inhibition.
+
+        errors: The number of wakefulness blocks which failed to enter or exit.
+
+        enter_latency: The distribution of the time taken to enter wakefulness blocks.
+
+        exit_latency: The distribution of the time taken to exit wakefulness blocks.
+
+        dbus_calls: The number of D-Bus method calls made, including introspection and
+            discovery of the services present.
+
+        backend_failures: The number of failed D-Bus calls, by backend name.
+
+        fallbacks: The number of times no D-Bus was available, so that a fake implementation
+            was used instead.
+
+        held_seconds: The cumulative time for which wakefulness blocks which have exited were
+            held, by reason.
+    """
+
+    def __init__(
+        self,
+        *,
+        active: int,
+        total: int,
+        inhibitions: int,
+        errors: int,
+        enter_latency: Histogram,
+        exit_latency: Histogram,
+        dbus_calls: int,
+        backend_failures: Counter,
+        fallbacks: int,
+        held_seconds: Counter,
+    ):
+        self.active = active
+        self.total = total
+        self.inhibitions = inhibitions
+        self.errors = errors
+        self.enter_latency = enter_latency
+        self.exit_latency = exit_latency
+        self.dbus_calls = dbus_calls
+        self.backend_failures = backend_failures
+        self.fallbacks = fallbacks
+        self.held_seconds = held_seconds
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(active={self.active}, total={self.total}, "
+            f"inhibitions={self.inhibitions}, errors={self.errors}, dbus_calls={self.dbus_calls})"
+        )
+
+    @property
+    def dbus_calls_per_inhibition(self) -> Optional[float]:
+        """The mean number of D-Bus calls per OS-level inhibition, or None if there were none."""
+        return self.dbus_calls / self.inhibitions if self.inhibitions else None
+
+
+class _Collector:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.active = 0
+        self.total = 0
+        self.inhibitions = 0
+        self.errors = 0
+        self.enter_counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.enter_total = 0.0
+        self.exit_counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.exit_total = 0.0
+        self.dbus_calls = 0
+        self.backend_failures = Counter()
+        self.fallbacks = 0
+        self.held_seconds = Counter()
+
+    def reset(self):
+        with self._lock:
+            active = self.active
+            self._reset()
+            # Blocks which are still held remain active
+            self.active = active
+
+    def after_fork_in_child(self):
+        # The lock may have been held by a thread which did not survive the fork. A child
+        # process counts its own activity, other than blocks entered before it was forked.
+        self._lock = threading.Lock()
+        self.reset()
+
+    def snapshot(self) -> Stats:
+        with self._lock:
+            return Stats(
+                active=self.active,
+                total=self.total,
+                inhibitions=self.inhibitions,
+                errors=self.errors,
+                enter_latency=Histogram(LATENCY_BOUNDS, tuple(self.enter_counts), self.enter_total),
+                exit_latency=Histogram(LATENCY_BOUNDS, tuple(self.exit_counts), self.exit_total),
+                dbus_calls=self.dbus_calls,
+                backend_failures=self.backend_failures.copy(),
+                fallbacks=self.fallbacks,
+                held_seconds=self.held_seconds.copy(),
+            )
+
+
+_collector = _Collector()
+
+_hooks: dict[str, tuple[Callable, ...]] = {event: () for event in EVENTS}
+_hooks_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    global _hooks_lock
+    _hooks_lock = threading.Lock()
+    _collector.after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def stats() -> Stats:
+    """A snapshot of the metrics collected since the process started, or since reset()."""
+    return _collector.snapshot()
+
+
+def reset():
+    """Reset all metrics to zero, except the number of wakefulness blocks currently held."""
+    _collector.reset()
+
+
+def add_hook(event: str, callback: Callable):
+    """Register a callback to be called when an event occurs.
+
+    Args:
+        event: One of "acquire", "release" or "error".
+
+        callback: Called with the reason and the seconds taken to enter a wakefulness block for
+            "acquire"; the reason and the seconds for which it was held for "release"; or the
+            reason (or None if not known) and the exception for "error".
+
+    Raises:
+        ValueError: If event is not known.
+    """
+    if event not in EVENTS:
+        raise ValueError(f"Unknown event {event!r}")
+    with _hooks_lock:
+        _hooks[event] = (*_hooks[event], callback)
+
+
+def remove_hook(event: str, callback: Callable):
+    """Unregister a callback previously registered with add_hook().
+
+    Raises:
+        ValueError: If the callback is not registered for the event.
+    """
+    if event not in EVENTS:
+        raise ValueError(f"Unknown event {event!r}")
+    with _hooks_lock:
+        hooks = list(_hooks[event])
+        hooks.remove(callback)
+        _hooks[event] = tuple(hooks)
+
+
+def _call_hooks(hooks: tuple[Callable, ...], *args):
+    for hook in hooks:
+        try:
+            hook(*args)
+        except Exception:
+            logger.exception("Metrics hook %r failed", hook)
+
+
+# The functions below are called by eugeroic itself to record events
+
+
+def record_acquire(reason: str, seconds: float):
+    """Record that a wakefulness block was entered, taking seconds to do so."""
+    c = _collector
+    with c._lock:
+        c.active += 1
+        c.total += 1
+        c.enter_counts[bisect.bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        c.enter_total += seconds
+    if _hooks["acquire"]:
+        _call_hooks(_hooks["acquire"], reason, seconds)
+
+
+def record_release(reason: str, seconds: float, held_seconds: float):
+    """Record that a block, held for held_seconds, was exited, taking seconds to do so."""
+    c = _collector
+    with c._lock:
+        c.active -= 1
+        c.exit_counts[bisect.bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        c.exit_total += seconds
+        c.held_seconds[reason] += held_seconds
+    if _hooks["release"]:
+        _call_hooks(_hooks["release"], reason, held_seconds)
+
+
+def record_error(reason: Optional[str], error: BaseException):
+    """Record that a wakefulness block failed to enter or exit."""
+    with _collector._lock:
+        _collector.errors += 1
+    if _hooks["error"]:
+        _call_hooks(_hooks["error"], reason, error)
+
+
+def record_inhibition():
+    """Record that an OS-level inhibition was acquired."""
+    with _collector._lock:
+        _collector.inhibitions += 1
+
+
+def record_dbus_calls(count: int = 1):
+    """Record that D-Bus method calls were made."""
+    with _collector._lock:
+        _collector.dbus_calls += count
+
+
+def record_backend_failure(backend: str, error: BaseException, reason: Optional[str] = None):
+    """Record that a D-Bus call to a backend failed."""
+    with _collector._lock:
+        _collector.backend_failures[backend] += 1
+    if _hooks["error"]:
+        _call_hooks(_hooks["error"], reason, error)
+
+
+def record_fallback():
+    """Record that no D-Bus was available, so a fake implementation was used."""
+    with _collector._lock:
+        _collector.fallbacks += 1
+
+
+__all__ = [
+    "EVENTS",
+    "Histogram",
+    "LATENCY_BOUNDS",
+    "Stats",
+    "add_hook",
+    "remove_hook",
+    "reset",
+    "stats",
+]
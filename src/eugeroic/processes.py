@@ -0,0 +1,222 @@
+"""Keep the display awake exactly while processes run.
+
+Process exit is detected by the OS rather than by polling: a child command is waited for with
+waitpid(), and other processes through a pidfd for each on Linux, or a kqueue on macOS and the
+BSDs. Any number of watched processes therefore cost no CPU while they run, and the display is
+released as soon as the last of them exits.
+
+Example:
+    $ python -m eugeroic run --reason "Nightly backup" -- rsync -a src/ dest/
+    $ python -m eugeroic run --while-pid 1234 --while-pid 5678
+"""
+
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from typing import Optional
+
+from eugeroic.drivers import wakefulness
+
+logger = logging.getLogger(__name__)
+
+# Signals received while running a command which are passed on to it, rather than acted upon
+FORWARDED_SIGNALS = tuple(
+    getattr(signal, name)
+    for name in ("SIGTERM", "SIGHUP", "SIGUSR1", "SIGUSR2")
+    if hasattr(signal, name)
+)
+
+# Signals which a terminal sends to its whole foreground process group, and so to a command run
+# in this process's group as well. Received while running a command, they are not acted upon,
+# but neither are they passed on, since the command would then receive them twice.
+TERMINAL_SIGNALS = tuple(
+    getattr(signal, name) for name in ("SIGINT", "SIGQUIT") if hasattr(signal, name)
+)
+
+# The interval at which processes are checked on platforms with neither pidfds nor kqueue
+POLL_INTERVAL = 1.0
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists, but belongs to another user
+        return True
+    return True
+
+
+def _wait_with_pidfds(pids: set[int], timeout: Optional[float]) -> set[int]:
+    poller = select.poll()
+    fds = {}
+    try:
+        for pid in pids:
+            try:
+                fd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                continue
+            fds[fd] = pid
+            poller.register(fd, select.POLLIN)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while fds:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = poller.poll(None if remaining is None else remaining * 1000)
+            if not events and remaining is not None:
+                break
+            for fd, _ in events:
+                poller.unregister(fd)
+                os.close(fd)
+                logger.debug("Process %d exited", fds.pop(fd))
+        return set(fds.values())
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _wait_with_kqueue(pids: set[int], timeout: Optional[float]) -> set[int]:
+    kq = select.kqueue()
+    running = set()
+    try:
+        for pid in pids:
+            event = select.kevent(
+                pid,
+                filter=select.KQ_FILTER_PROC,
+                flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                fflags=select.KQ_NOTE_EXIT,
+            )
+            try:
+                kq.control([event], 0)
+            except ProcessLookupError:
+                continue
+            running.add(pid)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while running:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = kq.control(None, len(running), remaining)
+            if not events and remaining is not None:
+                break
+            for event in events:
+                running.discard(event.ident)
+                logger.debug("Process %d exited", event.ident)
+        return running
+    finally:
+        kq.close()
+
+
+def _wait_with_polling(pids: set[int], timeout: Optional[float]) -> set[int]:
+    deadline = None if timeout is None else time.monotonic() + timeout
+    running = {pid for pid in pids if _is_running(pid)}
+    while running:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            break
+        time.sleep(POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining))
+        running = {pid for pid in running if _is_running(pid)}
+    return running
+
+
+def wait_for_exit(pids: Iterable[int], timeout: Optional[float] = None) -> set[int]:
+    """Wait for every one of a number of processes to exit.
+
+    The processes need not be children of this one. Processes which have already exited, or
+    which never existed, are treated as having exited.
+
+    Args:
+        pids: The IDs of the processes to wait for.
+
+        timeout: The maximum number of seconds to wait, or None to wait indefinitely.
+
+    Returns:
+        The IDs of the processes still running when the timeout expired, which is empty if
+        they all exited.
+    """
+    pids = set(pids)
+    if not pids:
+        return set()
+    if hasattr(os, "pidfd_open"):
+        try:
+            return _wait_with_pidfds(pids, timeout)
+        except OSError as e:
+            # For example, a kernel older than 5.3, or a seccomp policy forbidding pidfd_open
+            logger.debug("Could not use pidfds to wait for processes: %s", e)
+    if hasattr(select, "kqueue"):
+        return _wait_with_kqueue(pids, timeout)
+    if os.name != "posix":
+        raise NotImplementedError(
+            "Waiting for unrelated processes is not supported on this platform"
+        )
+    return _wait_with_polling(pids, timeout)
+
+
+def while_pids(pids: Iterable[int], reason: str, wake: bool = True):
+    """Keep the display awake until every one of a number of processes has exited.
+
+    Args:
+        pids: The IDs of the processes to wait for.
+
+        reason: The reason for keeping the display awake.
+
+        wake: If True, wake the display if it is asleep.
+    """
+    with wakefulness(reason, wake=wake):
+        wait_for_exit(pids)
+
+
+def run(args: Sequence[str], reason: str, wake: bool = True, pids: Iterable[int] = ()) -> int:
+    """Run a command, keeping the display awake while it runs.
+
+    When called from the main thread, the signals in FORWARDED_SIGNALS are passed on to the
+    command while it runs, so that terminating this process terminates the command, which then
+    decides how to respond. The command shares this process's process group, so receives
+    the signals in TERMINAL_SIGNALS, such as SIGINT on Ctrl-C, from the terminal itself; this
+    process ignores them while the command runs.
+
+    Args:
+        args: The command and its arguments.
+
+        reason: The reason for keeping the display awake.
+
+        wake: If True, wake the display if it is asleep.
+
+        pids: The IDs of other processes to wait for, after the command exits, before
+            the display is released.
+
+    Returns:
+        The command's exit status, which is negative if it was terminated by a signal, as for
+        subprocess.Popen.returncode.
+
+    Raises:
+        OSError: If the command could not be started.
+    """
+    forward = threading.current_thread() is threading.main_thread()
+    with wakefulness(reason, wake=wake):
+        process = subprocess.Popen(args)
+        previous = {}
+        if forward:
+
+            def _forward(signum, frame):
+                logger.debug("Forwarding signal %d to process %d", signum, process.pid)
+                process.send_signal(signum)
+
+            def _leave(signum, frame):
+                logger.debug("Leaving signal %d to process %d's process group", signum, process.pid)
+
+            for signum in FORWARDED_SIGNALS:
+                previous[signum] = signal.signal(signum, _forward)
+            for signum in TERMINAL_SIGNALS:
+                previous[signum] = signal.signal(signum, _leave)
+        try:
+            returncode = process.wait()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        logger.debug("Process %d exited with status %d", process.pid, returncode)
+        wait_for_exit(pids)
+    return returncode
@@ -0,0 +1,220 @@
+"""A long-lived daemon which keeps the display awake on behalf of clients.
+
+Short-lived processes, such as cron and shell jobs, would otherwise each pay for interpreter
+startup, importing the platform driver and connecting to the bus. Instead, the daemon holds the
+platform driver and its connections for its whole life, and clients acquire and release named
+leases over a local Unix socket. The display is kept awake while any lease is held. Leases belong
+to the connection through which they were acquired, and are released when it closes, so a client
+which crashes cannot leak them.
+
+The protocol is line based. Each request is a single line, answered by a single line beginning
+with "OK" or "ERR":
+
+    PING                -> OK eugeroic <version>
+    ACQUIRE <reason>    -> OK <lease-id>
+    RELEASE <lease-id>  -> OK
+    LIST                -> OK <count>, followed by <count> lines of "<lease-id> <reason>"
+
+Example:
+    $ python -m eugeroic serve
+"""
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import os
+import signal
+import socket
+from typing import Optional
+
+from eugeroic.client import _default_socket_directory, check_socket_directory, default_socket_path
+from eugeroic.drivers import awakefulness
+from eugeroic.version import __version__
+
+logger = logging.getLogger(__name__)
+
+# Requests longer than this are rejected, and the connection closed
+MAX_LINE = 4096
+
+
+class ProtocolError(Exception):
+    """A malformed or unknown request."""
+
+
+class Server:
+    """A daemon which holds wakefulness leases on behalf of clients connected through a Unix socket.
+
+    Args:
+        path: The path of the socket on which to listen. Defaults to default_socket_path().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_socket_path()
+        self._lease_ids = itertools.count(1)
+        # Lease ID to (reason, exit stack holding its wakefulness), across all connections
+        self._leases: dict[str, tuple[str, contextlib.AsyncExitStack]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        # The task serving each connected client, and the stream through which it writes
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._closed: Optional[asyncio.Event] = None
+
+    @property
+    def leases(self) -> dict[str, str]:
+        """The reason for each lease currently held, by lease ID."""
+        return {lease_id: reason for lease_id, (reason, _) in self._leases.items()}
+
+    async def start(self):
+        """Start listening on the socket.
+
+        Raises:
+            OSError: If another daemon is already listening on the socket, or the socket is in a
+                default directory which is not private to the current user.
+        """
+        if os.path.dirname(self.path) == _default_socket_directory():
+            with contextlib.suppress(FileExistsError):
+                os.mkdir(os.path.dirname(self.path), 0o700)
+        check_socket_directory(self.path)
+        _remove_stale_socket(self.path)
+        self._closed = asyncio.Event()
+        # Created accessible only to the current user, rather than changed to be after it is
+        # already listening
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._serve_client, path=self.path, limit=MAX_LINE
+            )
+        finally:
+            os.umask(umask)
+        logger.info("Serving wakefulness leases on %s", self.path)
+
+    async def serve_forever(self):
+        """Start listening if necessary, and serve clients until close() is called."""
+        if self._server is None:
+            await self.start()
+        await self._closed.wait()
+
+    async def close(self):
+        """Stop listening, disconnect every client, and release every lease."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+        # Each connection releases its own leases as it closes, which must finish before the
+        # event loop does
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        for lease_id in list(self._leases):
+            await self._release(lease_id)
+        if self._closed is not None:
+            self._closed.set()
+
+    async def _acquire(self, reason: str) -> str:
+        lease_id = str(next(self._lease_ids))
+        stack = contextlib.AsyncExitStack()
+        await stack.enter_async_context(awakefulness(reason))
+        self._leases[lease_id] = (reason, stack)
+        logger.debug("Lease %s acquired during: %r", lease_id, reason)
+        return lease_id
+
+    async def _release(self, lease_id: str):
+        reason, stack = self._leases.pop(lease_id)
+        logger.debug("Lease %s released after: %r", lease_id, reason)
+        await stack.aclose()
+
+    async def _handle(self, line: str, owned: set[str]) -> list[str]:
+        command, _, argument = line.partition(" ")
+        if command == "PING":
+            return [f"OK eugeroic {__version__}"]
+        if command == "ACQUIRE":
+            if not argument:
+                raise ProtocolError("ACQUIRE requires a reason")
+            lease_id = await self._acquire(argument)
+            owned.add(lease_id)
+            return [f"OK {lease_id}"]
+        if command == "RELEASE":
+            if argument not in owned:
+                raise ProtocolError(f"No lease {argument!r} held by this connection")
+            owned.discard(argument)
+            await self._release(argument)
+            return ["OK"]
+        if command == "LIST":
+            leases = self.leases
+            return [
+                f"OK {len(leases)}",
+                *(f"{lease_id} {reason}" for lease_id, reason in leases.items()),
+            ]
+        raise ProtocolError(f"Unknown command {command!r}")
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        owned: set[str] = set()
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    data = await reader.readline()
+                except ValueError:
+                    writer.write(b"ERR Request too long\n")
+                    break
+                if not data:
+                    break
+                line = data.decode("utf-8", errors="replace").rstrip("\r\n")
+                try:
+                    response = await self._handle(line, owned)
+                except ProtocolError as e:
+                    response = [f"ERR {e}"]
+                except Exception as e:
+                    logger.warning("Could not handle %r: %s", line, e)
+                    response = [f"ERR {type(e).__name__}: {e}"]
+                writer.write("".join(f"{r}\n" for r in response).encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            try:
+                # The client has gone, so its leases go with it
+                for lease_id in owned:
+                    if lease_id in self._leases:
+                        await self._release(lease_id)
+                writer.close()
+                with contextlib.suppress(ConnectionError):
+                    await writer.wait_closed()
+            finally:
+                del self._connections[task]
+
+
+def _remove_stale_socket(path: str):
+    """Remove a socket left behind by a daemon which is no longer running."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+    else:
+        raise OSError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+async def _serve(path: Optional[str]):
+    server = Server(path)
+    await server.start()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, lambda: asyncio.ensure_future(server.close()))
+    await server.serve_forever()
+
+
+def serve(path: Optional[str] = None):
+    """Run the daemon until interrupted or terminated.
+
+    Args:
+        path: The path of the socket on which to listen. Defaults to default_socket_path().
+    """
+    asyncio.run(_serve(path))
@@ -0,0 +1,5 @@
+"""Tools for testing code which uses eugeroic against real D-Bus services.
+
+These require the dbus_next package and a dbus-daemon executable, and so are only available on
+Linux.
+"""
@@ -0,0 +1,72 @@
+"""A private D-Bus daemon for testing."""
+
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir={directory}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+
+def dbus_daemon_available(executable: str = "dbus-daemon") -> bool:
+    """True if the dbus-daemon executable can be found."""
+    return shutil.which(executable) is not None
+
+
+class PrivateBus:
+    """A private D-Bus daemon run as a subprocess for the duration of a with-block.
+
+    Examples:
+
+        with PrivateBus() as bus:
+            os.environ["DBUS_SESSION_BUS_ADDRESS"] = bus.address
+            ...
+
+    Args:
+        executable: The name or path of the dbus-daemon executable.
+    """
+
+    def __init__(self, executable: str = "dbus-daemon"):
+        self._executable = executable
+        self._directory: Optional[tempfile.TemporaryDirectory] = None
+        self._process: Optional[subprocess.Popen] = None
+        self.address: Optional[str] = None
+
+    def __enter__(self):
+        self._directory = tempfile.TemporaryDirectory(prefix="eugeroic-dbus-")
+        config = Path(self._directory.name) / "session.conf"
+        config.write_text(_CONFIG.format(directory=self._directory.name))
+        self._process = subprocess.Popen(
+            [self._executable, "--config-file", str(config), "--nofork", "--print-address"],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.address = self._process.stdout.readline().strip()
+        if not self.address:
+            self.__exit__(None, None, None)
+            raise RuntimeError("dbus-daemon did not report an address")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+        if self._directory is not None:
+            self._directory.cleanup()
+            self._directory = None
+        return False
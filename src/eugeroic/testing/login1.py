@@ -0,0 +1,202 @@
+"""A stand-in org.freedesktop.login1 service, which hands out inhibitor locks as file descriptors.
+
+As logind does, the service returns the write end of a pipe from each call to Inhibit, and keeps
+the read end, so that it sees the lock released as soon as every copy of the file descriptor given
+to the client has been closed, whether or not the client is still connected to the bus.
+
+Example:
+    $ python -m eugeroic.testing.login1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import select
+import sys
+import threading
+import types
+from dataclasses import dataclass
+from typing import Optional
+
+from dbus_next import Message, MessageType
+from dbus_next.aio import MessageBus
+
+logger = logging.getLogger(__name__)
+
+BUS_NAME = "org.freedesktop.login1"
+PATH = "/org/freedesktop/login1"
+INTERFACE = "org.freedesktop.login1.Manager"
+
+# The targets and modes which logind accepts
+TARGETS = (
+    "shutdown",
+    "sleep",
+    "idle",
+    "handle-power-key",
+    "handle-suspend-key",
+    "handle-hibernate-key",
+    "handle-lid-switch",
+)
+MODES = ("block", "delay")
+
+
+@dataclass(frozen=True)
+class Inhibitor:
+    """An inhibitor lock, as described by logind's ListInhibitors."""
+
+    what: str
+    who: str
+    why: str
+    mode: str
+
+
+class Login1Service:
+    """A stand-in org.freedesktop.login1 service on a real bus.
+
+    The service runs on its own event loop in a daemon thread, so it can be driven from
+    synchronous test code.
+
+    Args:
+        bus_address: The address of the bus on which to provide the service, standing in for
+            the system bus.
+
+    Attributes:
+        refuse: The name of a D-Bus error with which to refuse calls to Inhibit, or None (the
+            default) to grant them.
+    """
+
+    def __init__(self, bus_address: str):
+        self.bus_address = bus_address
+        self.refuse: Optional[str] = None
+        self._lock = threading.Lock()
+        # The read end of the pipe held by each lock
+        self._inhibitors: dict[int, Inhibitor] = {}
+        self._bus: Optional[MessageBus] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="eugeroic-login1-service",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @property
+    def inhibitors(self) -> list[Inhibitor]:
+        """The locks currently held, forgetting any whose file descriptors have been closed."""
+        # The service's own copy of the file descriptor in each reply is closed once the reply
+        # has been sent, by a callback which must be allowed to run first
+        self._run(asyncio.sleep(0))
+        with self._lock:
+            if self._inhibitors:
+                readable, _, _ = select.select(list(self._inhibitors), [], [], 0)
+                for fd in readable:
+                    if not os.read(fd, 1):
+                        os.close(fd)
+                        logger.debug("Stand-in login1 released %r", self._inhibitors.pop(fd))
+            return list(self._inhibitors.values())
+
+    def start(self):
+        """Connect to the bus and acquire the service name."""
+        self._run(self._start())
+
+    def stop(self):
+        """Release the service name and disconnect, forgetting all locks."""
+        self._run(self._stop())
+
+    def close(self):
+        """Stop the service and its event loop."""
+        self.stop()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    async def _start(self):
+        bus = await MessageBus(bus_address=self.bus_address, negotiate_unix_fd=True).connect()
+        bus.add_message_handler(self._handle)
+        await bus.request_name(BUS_NAME)
+        self._bus = bus
+        logger.debug("Stand-in login1 service started on %s", self.bus_address)
+
+    async def _stop(self):
+        bus, self._bus = self._bus, None
+        with self._lock:
+            for fd in self._inhibitors:
+                os.close(fd)
+            self._inhibitors.clear()
+        if bus is not None and bus.connected:
+            bus.disconnect()
+            await bus.wait_for_disconnect()
+        logger.debug("Stand-in login1 service stopped")
+
+    def _handle(self, msg: Message):
+        if msg.message_type != MessageType.METHOD_CALL or msg.path != PATH:
+            return False
+        if msg.interface not in (INTERFACE, None):
+            return False
+        if msg.member == "Inhibit" and msg.signature == "ssss":
+            what, who, why, mode = msg.body
+            if self.refuse is not None:
+                return Message.new_error(msg, self.refuse, "Refused by the stand-in login1 service")
+            if (
+                not what
+                or any(target not in TARGETS for target in what.split(":"))
+                or mode not in MODES
+            ):
+                return Message.new_error(
+                    msg, "org.freedesktop.DBus.Error.InvalidArgs", f"Invalid {what!r} or {mode!r}"
+                )
+            read_end, write_end = os.pipe()
+            with self._lock:
+                self._inhibitors[read_end] = Inhibitor(what, who, why, mode)
+            # The service's copy of the client's end can only be closed once it has been sent
+            sent = self._bus.send(Message.new_method_return(msg, "h", [0], unix_fds=[write_end]))
+            sent.add_done_callback(lambda _: os.close(write_end))
+            return True
+        if msg.member == "ListInhibitors" and msg.signature == "":
+            locks = [
+                (lock.what, lock.who, lock.why, lock.mode, 0, os.getpid())
+                for lock in self.inhibitors
+            ]
+            return Message.new_method_return(msg, "a(ssssuu)", [[list(lock) for lock in locks]])
+        return Message.new_error(
+            msg, "org.freedesktop.DBus.Error.UnknownMethod", f"No method {msg.member}"
+        )
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--address", help="bus address (default: start a private dbus-daemon)")
+    args = parser.parse_args(argv)
+
+    from eugeroic.testing.dbus import PrivateBus
+
+    given = contextlib.nullcontext(types.SimpleNamespace(address=args.address))
+    with PrivateBus() if args.address is None else given as bus:
+        with Login1Service(bus.address):
+            print(f"DBUS_SYSTEM_BUS_ADDRESS={bus.address}", flush=True)
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
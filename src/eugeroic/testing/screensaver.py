@@ -0,0 +1,303 @@
+"""A stand-in org.freedesktop.ScreenSaver service with injectable faults.
+
+The service runs on a real bus, so clients talk to it through a socket exactly as they would to a
+desktop environment's screensaver. Each method can be configured to reply late, to reply with an
+error, or never to reply at all, and the service can be restarted in the middle of a session,
+forgetting every inhibition, as happens when a desktop shell crashes.
+
+Example:
+    $ python -m eugeroic.testing.screensaver --latency Inhibit=0.25 --drop UnInhibit
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import logging
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from dbus_next import Message, MessageType
+from dbus_next.aio import MessageBus
+from dbus_next.errors import DBusError
+
+from eugeroic.drivers.linux.introspection import SCREENSAVER_XML
+
+logger = logging.getLogger(__name__)
+
+BUS_NAME = "org.freedesktop.ScreenSaver"
+INTERFACE = "org.freedesktop.ScreenSaver"
+PATHS = ("/org/freedesktop/ScreenSaver", "/ScreenSaver")
+
+INTROSPECTABLE_INTERFACE = "org.freedesktop.DBus.Introspectable"
+
+
+@dataclass
+class Fault:
+    """A fault to inject into replies to one method.
+
+    Attributes:
+        latency: Seconds to wait before replying.
+
+        error: The name of a D-Bus error with which to reply, or None to reply normally.
+
+        drop: If True, never reply at all.
+    """
+
+    latency: float = 0.0
+    error: Optional[str] = None
+    drop: bool = False
+
+
+class ScreenSaverService:
+    """A stand-in org.freedesktop.ScreenSaver service on a real bus.
+
+    The service runs on its own event loop in a daemon thread, so it can be driven from
+    synchronous test code. Inhibitions are released when the client which made them
+    disconnects, as real implementations do.
+
+    Args:
+        bus_address: The address of the bus on which to provide the service.
+    """
+
+    def __init__(self, bus_address: str):
+        self.bus_address = bus_address
+        self.faults: dict[str, Fault] = {}
+        self.calls = Counter()
+        self.cookies: dict[int, tuple[str, str, str]] = {}
+        self.active = False
+        self._next_cookie = itertools.count(1)
+        self._started = time.monotonic()
+        self._bus: Optional[MessageBus] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="eugeroic-screensaver-service",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def inject(
+        self, member: str, *, latency: float = 0.0, error: Optional[str] = None, drop: bool = False
+    ):
+        """Inject a fault into replies to a method, replacing any existing fault.
+
+        Args:
+            member: The method name, such as "Inhibit".
+
+            latency: Seconds to wait before replying.
+
+            error: The name of a D-Bus error with which to reply.
+
+            drop: If True, never reply at all.
+        """
+        self.faults[member] = Fault(latency=latency, error=error, drop=drop)
+
+    def clear_faults(self):
+        """Remove all injected faults."""
+        self.faults.clear()
+
+    def start(self):
+        """Connect to the bus and acquire the service name."""
+        self._run(self._start())
+
+    def stop(self):
+        """Release the service name and disconnect, forgetting all inhibitions."""
+        self._run(self._stop())
+
+    def restart(self):
+        """Stop and then start the service, as if it had crashed and been restarted."""
+        self.stop()
+        self.start()
+
+    def set_active(self, active: bool):
+        """Activate or deactivate the screensaver, emitting ActiveChanged if it changes."""
+        self._run(self._set_active(active))
+
+    def close(self):
+        """Stop the service and its event loop."""
+        self.stop()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    async def _start(self):
+        bus = await MessageBus(bus_address=self.bus_address).connect()
+        bus.add_message_handler(self._handle)
+        await bus.call(
+            Message(
+                destination="org.freedesktop.DBus",
+                path="/org/freedesktop/DBus",
+                interface="org.freedesktop.DBus",
+                member="AddMatch",
+                signature="s",
+                body=["type='signal',sender='org.freedesktop.DBus',member='NameOwnerChanged'"],
+            )
+        )
+        await bus.request_name(BUS_NAME)
+        self._bus = bus
+        self._started = time.monotonic()
+        logger.debug("Stand-in ScreenSaver service started on %s", self.bus_address)
+
+    async def _stop(self):
+        bus, self._bus = self._bus, None
+        self.cookies.clear()
+        if bus is not None and bus.connected:
+            bus.disconnect()
+            await bus.wait_for_disconnect()
+        logger.debug("Stand-in ScreenSaver service stopped")
+
+    async def _set_active(self, active: bool):
+        if active == self.active:
+            return
+        self.active = active
+        if self._bus is not None:
+            for path in PATHS:
+                self._bus.send(Message.new_signal(path, INTERFACE, "ActiveChanged", "b", [active]))
+
+    def _handle(self, msg: Message):
+        if msg.message_type == MessageType.SIGNAL and msg.member == "NameOwnerChanged":
+            name, old_owner, new_owner = msg.body
+            if old_owner and not new_owner:
+                self._forget_client(old_owner)
+            return False
+        if msg.message_type != MessageType.METHOD_CALL or msg.path not in PATHS:
+            return False
+        if msg.interface == INTROSPECTABLE_INTERFACE and msg.member == "Introspect":
+            return Message.new_method_return(msg, "s", [SCREENSAVER_XML])
+        if msg.interface not in (INTERFACE, None):
+            return False
+        self.calls[msg.member] += 1
+        fault = self.faults.get(msg.member, Fault())
+        if fault.drop:
+            logger.debug("Stand-in ScreenSaver dropping reply to %s", msg.member)
+            return True
+        if fault.latency > 0:
+            bus = self._bus
+            self._loop.call_later(fault.latency, self._reply_later, bus, msg, fault)
+            return True
+        return self._reply(msg, fault)
+
+    def _reply_later(self, bus: Optional[MessageBus], msg: Message, fault: Fault):
+        if bus is None or bus is not self._bus or not bus.connected:
+            # The service was restarted in the meantime, so the reply is lost
+            return
+        bus.send(self._reply(msg, fault))
+
+    def _reply(self, msg: Message, fault: Fault) -> Message:
+        if fault.error is not None:
+            return Message.new_error(msg, fault.error, f"Injected fault in {msg.member}")
+        try:
+            signature, body = self._call(msg)
+        except DBusError as e:
+            return Message.new_error(msg, e.type, e.text)
+        return Message.new_method_return(msg, signature, body)
+
+    def _call(self, msg: Message) -> tuple[str, list]:
+        member = msg.member
+        if member == "Inhibit" and msg.signature == "ss":
+            application_name, reason = msg.body
+            cookie = next(self._next_cookie)
+            self.cookies[cookie] = (msg.sender, application_name, reason)
+            return "u", [cookie]
+        if member == "UnInhibit" and msg.signature == "u":
+            [cookie] = msg.body
+            if self.cookies.pop(cookie, None) is None:
+                raise DBusError(
+                    "org.freedesktop.DBus.Error.InvalidArgs", f"Unknown cookie {cookie}"
+                )
+            return "", []
+        if member == "SimulateUserActivity" and msg.signature == "":
+            self._started = time.monotonic()
+            return "", []
+        if member == "GetActive" and msg.signature == "":
+            return "b", [self.active]
+        if member == "GetActiveTime" and msg.signature == "":
+            return "u", [0]
+        if member == "GetSessionIdleTime" and msg.signature == "":
+            return "u", [int(time.monotonic() - self._started)]
+        raise DBusError("org.freedesktop.DBus.Error.UnknownMethod", f"No method {member}")
+
+    def _forget_client(self, unique_name: str):
+        for cookie, (sender, _, _) in list(self.cookies.items()):
+            if sender == unique_name:
+                del self.cookies[cookie]
+                logger.debug("Stand-in ScreenSaver released cookie %r of %s", cookie, unique_name)
+
+
+def _method_value(text: str) -> tuple[str, str]:
+    member, _, value = text.partition("=")
+    return member, value
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--address", help="bus address (default: start a private dbus-daemon)")
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        type=_method_value,
+        metavar="METHOD=SECONDS",
+        help="delay replies to a method",
+    )
+    parser.add_argument(
+        "--error",
+        action="append",
+        default=[],
+        type=_method_value,
+        metavar="METHOD[=ERROR]",
+        help="reply to a method with an error",
+    )
+    parser.add_argument(
+        "--drop",
+        action="append",
+        default=[],
+        metavar="METHOD",
+        help="never reply to a method",
+    )
+    args = parser.parse_args(argv)
+
+    from eugeroic.testing.dbus import PrivateBus
+
+    given = contextlib.nullcontext(types.SimpleNamespace(address=args.address))
+    with PrivateBus() if args.address is None else given as bus:
+        with ScreenSaverService(bus.address) as service:
+            for member, seconds in args.latency:
+                service.faults.setdefault(member, Fault()).latency = float(seconds)
+            for member, error in args.error:
+                service.faults.setdefault(member, Fault()).error = (
+                    error or "org.freedesktop.DBus.Error.Failed"
+                )
+            for member in args.drop:
+                service.faults.setdefault(member, Fault()).drop = True
+            print(f"DBUS_SESSION_BUS_ADDRESS={bus.address}", flush=True)
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
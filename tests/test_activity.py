@@ -0,0 +1,147 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from eugeroic import awakefulness, wakefulness
+from eugeroic.activity import ActivityMonitor, ProcSampler
+from eugeroic.drivers import active_reasons
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/stat"), reason="requires /proc")
+
+
+def _spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_first_sample_has_no_rates():
+    with ProcSampler() as sampler:
+        assert sampler.sample() is None
+
+
+def test_process_cpu():
+    with ProcSampler([os.getpid()], tree=False) as sampler:
+        sampler.sample()
+        _spin(0.2)
+        rates = sampler.sample()
+    assert rates.process_cpu > 0.1
+    assert 0.0 <= rates.cpu <= 1.0
+
+
+def test_descendants_are_watched():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        with ProcSampler([os.getpid()], rescan=0.0) as sampler:
+            sampler.sample()
+            assert child.pid in sampler.pids
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_exited_processes_are_dropped():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    with ProcSampler([child.pid], tree=False) as sampler:
+        sampler.sample()
+        child.kill()
+        child.wait()
+        assert sampler.sample().process_cpu == 0.0
+        assert sampler.pids == set()
+
+
+def test_file_growth(tmp_path):
+    path = tmp_path / "output.log"
+    with ProcSampler(paths=[str(path)]) as sampler:
+        sampler.sample()
+        path.write_bytes(b"x" * 100_000)
+        assert sampler.sample().growth > 0
+        assert sampler.sample().growth == 0
+
+
+def test_monitor_requires_a_threshold():
+    with pytest.raises(ValueError):
+        ActivityMonitor()
+    with pytest.raises(ValueError):
+        ActivityMonitor(process_cpu=0.5)
+    with pytest.raises(ValueError):
+        ActivityMonitor(growth=1000)
+
+
+def test_while_active_cannot_be_non_blocking():
+    with pytest.raises(ValueError):
+        with wakefulness("Monitored", blocking=False, while_active=ActivityMonitor(cpu=0.5)):
+            pass
+
+
+def test_held_only_while_active(tmp_path):
+    path = tmp_path / "output.log"
+    monitor = ActivityMonitor(paths=[str(path)], growth=0, interval=0.05, quiet=0.2)
+    with wakefulness("Monitored output", while_active=monitor):
+        assert active_reasons()["Monitored output"] == 0
+        with path.open("ab") as f:
+            f.write(b"progress\n")
+        assert _wait_for(lambda: monitor.held)
+        assert active_reasons()["Monitored output"] == 1
+        assert _wait_for(lambda: not monitor.held)
+        assert active_reasons()["Monitored output"] == 0
+        with path.open("ab") as f:
+            f.write(b"more progress\n")
+        assert _wait_for(lambda: monitor.held)
+    assert not monitor.held
+    assert active_reasons()["Monitored output"] == 0
+
+
+def test_slow_acquire_blocks_neither_timers_nor_stop(tmp_path):
+    from eugeroic.drivers.timers import call_later
+
+    path = tmp_path / "output.log"
+    unblock = threading.Event()
+    fired = threading.Event()
+    calls = []
+
+    def acquire():
+        calls.append("acquire")
+        unblock.wait(5.0)
+
+    monitor = ActivityMonitor(paths=[str(path)], growth=0, interval=0.02, quiet=10.0)
+    monitor.start(acquire, lambda: calls.append("release"))
+    try:
+        path.write_bytes(b"progress\n")
+        assert _wait_for(lambda: calls)
+        call_later(0.02, fired.set)
+        assert fired.wait(1.0)
+        assert not monitor.held
+    finally:
+        unblock.set()
+        monitor.stop()
+    assert calls == ["acquire", "release"]
+    assert not monitor.held
+
+
+def test_held_only_while_active_async(tmp_path):
+    path = tmp_path / "output.log"
+    monitor = ActivityMonitor(paths=[str(path)], growth=0, interval=0.05, quiet=10.0)
+
+    async def main():
+        async with awakefulness("Monitored async", while_active=monitor):
+            path.write_bytes(b"progress\n")
+            deadline = time.monotonic() + 5.0
+            while not monitor.held and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            assert active_reasons()["Monitored async"] == 1
+
+    asyncio.run(main())
+    assert active_reasons()["Monitored async"] == 0
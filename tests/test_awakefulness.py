@@ -0,0 +1,144 @@
+import asyncio
+import threading
+
+from eugeroic import awakefulness, stay_awake, wakefulness
+from eugeroic.drivers import active_reasons
+
+
+def test_awakefulness_logging(caplog):
+    caplog.set_level("DEBUG")
+
+    async def main():
+        async with awakefulness("An async test message"):
+            assert "Entering wakefulness state during: 'An async test message'" in caplog.text
+            assert "Exiting wakefulness state after: 'An async test message'" not in caplog.text
+        assert "Exiting wakefulness state after: 'An async test message'" in caplog.text
+
+    asyncio.run(main())
+
+
+def test_awakefulness_starts_no_threads():
+
+    async def main():
+        threads_before = threading.active_count()
+        async with awakefulness("No threads please"):
+            assert threading.active_count() == threads_before
+
+    asyncio.run(main())
+
+
+def test_awakefulness_does_not_block_event_loop():
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        async with awakefulness("Concurrent ticking"):
+            await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(main())
+    assert len(ticks) > 5
+
+
+def test_concurrent_awakefulness_tasks_share_holders():
+
+    async def hold(reason, started):
+        async with awakefulness(reason):
+            started.set()
+            await asyncio.sleep(0.05)
+
+    async def main():
+        started = [asyncio.Event() for _ in range(3)]
+        tasks = [asyncio.create_task(hold(f"Task {i}", s)) for i, s in enumerate(started)]
+        for s in started:
+            await s.wait()
+        assert set(active_reasons()) == {"Task 0", "Task 1", "Task 2"}
+        await asyncio.gather(*tasks)
+        assert active_reasons() == {}
+
+    asyncio.run(main())
+
+
+def test_wakefulness_nested_in_awakefulness():
+
+    async def main():
+        async with awakefulness("Outer async"):
+            with wakefulness("Inner sync"):
+                assert active_reasons() == {"Outer async": 1, "Inner sync": 1}
+        assert active_reasons() == {}
+
+    asyncio.run(main())
+
+
+def test_awakefulness_survives_successive_event_loops():
+
+    async def main():
+        async with awakefulness("Loop after loop"):
+            pass
+
+    for _ in range(3):
+        asyncio.run(main())
+    assert active_reasons() == {}
+
+
+def test_stay_awake_holds_for_coroutine_execution():
+
+    @stay_awake("Coroutine reason")
+    async def decorated_coroutine():
+        await asyncio.sleep(0)
+        return dict(active_reasons())
+
+    assert asyncio.run(decorated_coroutine()) == {"Coroutine reason": 1}
+    assert active_reasons() == {}
+
+
+def test_stay_awake_holds_for_async_generator_lifetime():
+
+    @stay_awake("Async generator reason")
+    async def decorated_async_generator():
+        for i in range(3):
+            yield dict(active_reasons())
+
+    async def main():
+        return [item async for item in decorated_async_generator()]
+
+    assert asyncio.run(main()) == [{"Async generator reason": 1}] * 3
+    assert active_reasons() == {}
+
+
+def test_stay_awake_async_generator_forwards_sent_values():
+
+    @stay_awake("Echo")
+    async def echo():
+        received = None
+        while True:
+            received = yield received
+
+    async def main():
+        agen = echo()
+        await agen.asend(None)
+        result = await agen.asend("Hello")
+        await agen.aclose()
+        return result
+
+    assert asyncio.run(main()) == "Hello"
+    assert active_reasons() == {}
+
+
+def test_stay_awake_holds_for_generator_lifetime():
+
+    @stay_awake("Generator reason")
+    def decorated_generator():
+        for i in range(3):
+            yield dict(active_reasons())
+        return "Done"
+
+    gen = decorated_generator()
+    assert active_reasons() == {}
+    assert list(gen) == [{"Generator reason": 1}] * 3
+    assert active_reasons() == {}
@@ -0,0 +1,39 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+BENCHMARK = pathlib.Path(__file__).parent.parent / "benchmarks" / "bench_wakefulness.py"
+
+
+def test_benchmark_emits_json_results(tmp_path):
+    output = tmp_path / "bench.json"
+    subprocess.run(
+        [
+            sys.executable,
+            str(BENCHMARK),
+            "--bus",
+            "fake",
+            "--iterations",
+            "20",
+            "--held-seconds",
+            "0.1",
+            "--threads",
+            "4",
+            "--sampled-processes",
+            "5",
+            "--output",
+            str(output),
+        ],
+        check=True,
+    )
+    results = json.loads(output.read_text())
+    assert results["bus"] == "fake"
+    assert results["enter_exit_latency"]["enter"]["p99_us"] > 0
+    assert results["throughput"]["blocks"] == 20
+    assert results["concurrent_resources"]["holders"] == 4
+    assert "overhead_us" in results["decorator_overhead"]
+    assert results["iterator_overhead"]["items"] == 20_000
+    assert results["executor_overhead"]["tasks"] == 200
+    if sys.platform.startswith("linux"):
+        assert results["activity_sampling"]["processes"] == 5
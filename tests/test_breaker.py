@@ -0,0 +1,123 @@
+import contextlib
+
+from pytest import fixture, raises
+
+from eugeroic import drivers, wakefulness
+from eugeroic.drivers import circuit_breaker_state, set_circuit_breaker
+from eugeroic.drivers.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingDriver:
+
+    def __init__(self):
+        self.attempts = 0
+
+    @contextlib.contextmanager
+    def wakefulness(self, logger, reason, wake=True):
+        self.attempts += 1
+        raise ConnectionRefusedError("No D-Bus here")
+        yield
+
+
+@fixture
+def clock():
+    return FakeClock()
+
+
+@fixture
+def breaker(clock):
+    return CircuitBreaker(threshold=2, cooldown=30.0, clock=clock)
+
+
+@fixture
+def failing_driver(monkeypatch, clock):
+    failing = FailingDriver()
+    null = drivers._driver("null")
+    monkeypatch.setattr(drivers, "_driver", lambda name=None: null if name == "null" else failing)
+    monkeypatch.setattr(drivers, "_registry", None)
+    monkeypatch.setattr(
+        drivers, "_breaker", CircuitBreaker(threshold=2, cooldown=30.0, clock=clock)
+    )
+    return failing
+
+
+def test_breaker_opens_after_threshold(breaker):
+    breaker.record_failure(OSError())
+    assert breaker.allow()
+    breaker.record_failure(OSError())
+    assert not breaker.allow()
+    state = breaker.state()
+    assert (state.state, state.failures, state.trips, state.retry_in) == (OPEN, 2, 1, 30.0)
+
+
+def test_breaker_half_opens_after_cooldown(breaker, clock):
+    breaker.record_failure(OSError())
+    breaker.record_failure(OSError())
+    clock.now += 30.0
+    assert breaker.allow()
+    assert breaker.state().state == HALF_OPEN
+
+
+def test_failure_when_half_open_reopens_breaker(breaker, clock):
+    breaker.record_failure(OSError())
+    breaker.record_failure(OSError())
+    clock.now += 30.0
+    breaker.record_failure(OSError())
+    assert not breaker.allow()
+    assert breaker.state().trips == 2
+
+
+def test_success_closes_breaker(breaker, clock):
+    breaker.record_failure(OSError())
+    breaker.record_failure(OSError())
+    clock.now += 30.0
+    breaker.record_success()
+    assert breaker.state().state == CLOSED
+    assert breaker.state().failures == 0
+
+
+def test_failing_platform_driver_is_bypassed_while_breaker_open(failing_driver, clock):
+    for _ in range(2):
+        with raises(ConnectionRefusedError):
+            with wakefulness("Failing"):
+                pass
+    for _ in range(5):
+        with wakefulness("Bypassed"):
+            pass
+    assert failing_driver.attempts == 2
+    assert circuit_breaker_state().state == OPEN
+    clock.now += 30.0
+    with raises(ConnectionRefusedError):
+        with wakefulness("Retried"):
+            pass
+    assert failing_driver.attempts == 3
+
+
+def test_failed_and_bypassed_inhibitions_are_not_counted(failing_driver):
+    from eugeroic import metrics
+
+    metrics.reset()
+    for _ in range(2):
+        with raises(ConnectionRefusedError):
+            with wakefulness("Failing"):
+                pass
+    with wakefulness("Bypassed"):
+        pass
+    s = metrics.stats()
+    assert (s.total, s.errors, s.inhibitions) == (1, 2, 0)
+
+
+def test_invalid_breaker_configuration_raises_value_error():
+    with raises(ValueError):
+        set_circuit_breaker(threshold=0)
+    with raises(ValueError):
+        set_circuit_breaker(cooldown=-1.0)
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+from eugeroic.cli import main
+
+
+def test_seconds_without_command(caplog):
+    caplog.set_level("DEBUG")
+    main(["0", "--reason", "Legacy"])
+    assert "Entering wakefulness state during: 'Legacy'" in caplog.text
+
+
+def test_options_before_seconds(caplog):
+    caplog.set_level("DEBUG")
+    main(["--reason", "Legacy options", "0"])
+    assert "Entering wakefulness state during: 'Legacy options'" in caplog.text
+
+
+def test_sleep_command(caplog):
+    caplog.set_level("DEBUG")
+    main(["sleep", "0", "--reason", "Explicit"])
+    assert "Entering wakefulness state during: 'Explicit'" in caplog.text
+
+
+def test_run_command_exit_status(caplog):
+    caplog.set_level("DEBUG")
+    assert (
+        main(["run", "--reason", "Wrapped", "--", sys.executable, "-c", "raise SystemExit(4)"]) == 4
+    )
+    assert "Entering wakefulness state during: 'Wrapped'" in caplog.text
+
+
+def test_run_while_pid(caplog):
+    caplog.set_level("DEBUG")
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.2)"])
+    try:
+        assert main(["run", "--reason", "Watching", "--while-pid", str(process.pid)]) == 0
+        assert process.poll() is not None
+    finally:
+        process.wait()
+    assert "Entering wakefulness state during: 'Watching'" in caplog.text
+
+
+def test_active_until_process_exits(caplog):
+    caplog.set_level("DEBUG")
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.3)"])
+    try:
+        assert (
+            main(["active", "--reason", "Busy", "--pid", str(process.pid), "--process-cpu", "0.5"])
+            == 0
+        )
+    finally:
+        process.wait()
+    assert "Entering wakefulness state during: 'Busy'" in caplog.text
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from eugeroic import metrics
+from eugeroic.drivers import active_reasons
+from eugeroic.executors import AwakeExecutor
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_held_while_tasks_are_pending_and_released_when_drained():
+    gate = threading.Event()
+    with AwakeExecutor(ThreadPoolExecutor(2), "Pending") as executor:
+        futures = [executor.submit(gate.wait) for _ in range(5)]
+        assert executor.pending == 5
+        assert executor.held
+        assert active_reasons()["Pending"] == 1
+        gate.set()
+        for future in futures:
+            future.result()
+        assert _wait_for(lambda: not executor.held)
+        assert executor.pending == 0
+        assert active_reasons()["Pending"] == 0
+    assert executor.awake_seconds > 0
+
+
+def test_many_tasks_share_one_holder():
+    metrics.reset()
+    with AwakeExecutor(ThreadPoolExecutor(4), "Many") as executor:
+        gate = threading.Event()
+        first = executor.submit(gate.wait)
+        results = list(executor.map(lambda x: x * 2, range(100)))
+        gate.set()
+        first.result()
+    assert results == [x * 2 for x in range(100)]
+    assert metrics.stats().total == 1
+    assert active_reasons()["Many"] == 0
+
+
+def test_grace_period_keeps_holder_across_resubmission():
+    metrics.reset()
+    executor = AwakeExecutor(ThreadPoolExecutor(1), "Grace", grace=0.5)
+    executor.submit(int).result()
+    assert _wait_for(lambda: executor.pending == 0)
+    assert executor.held
+    executor.submit(int).result()
+    assert _wait_for(lambda: not executor.held)
+    assert metrics.stats().total == 1
+    assert active_reasons()["Grace"] == 0
+    executor.shutdown()
+
+
+def test_shutdown_releases_without_waiting_for_grace():
+    executor = AwakeExecutor(ThreadPoolExecutor(1), "Shutdown", grace=60.0)
+    executor.submit(int).result()
+    assert _wait_for(lambda: executor.pending == 0)
+    assert executor.held
+    executor.shutdown()
+    assert not executor.held
+    assert active_reasons()["Shutdown"] == 0
+
+
+def test_failing_and_rejected_tasks_are_not_pending():
+    executor = AwakeExecutor(ThreadPoolExecutor(1), "Failing")
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(lambda: 1 / 0).result()
+    assert _wait_for(lambda: not executor.held)
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(int)
+    assert executor.pending == 0
+    assert not executor.held
+
+
+def test_slow_acquire_is_made_without_the_lock(monkeypatch):
+    from eugeroic import executors
+
+    acquiring = threading.Event()
+    proceed = threading.Event()
+    acquire = executors._acquire
+
+    def slow_acquire(registry, reason, wake):
+        acquiring.set()
+        proceed.wait()
+        return acquire(registry, reason, wake)
+
+    monkeypatch.setattr(executors, "_acquire", slow_acquire)
+    executor = AwakeExecutor(ThreadPoolExecutor(2), "Slow acquire")
+    first = threading.Thread(target=lambda: executor.submit(int).result())
+    first.start()
+    assert acquiring.wait(5.0)
+    second = threading.Thread(target=lambda: executor.submit(int).result())
+    second.start()
+    try:
+        # Reading the state needs the lock, which is not held while the display is being held
+        reader = threading.Thread(target=lambda: executor.awake_seconds)
+        reader.start()
+        reader.join(1.0)
+        assert not reader.is_alive()
+        # Nor is a second task submitted before the display is held
+        time.sleep(0.05)
+        assert executor.pending == 1
+    finally:
+        proceed.set()
+    first.join()
+    second.join()
+    assert _wait_for(lambda: not executor.held)
+    executor.shutdown()
+    assert active_reasons()["Slow acquire"] == 0
+
+
+@pytest.mark.parametrize("grace", [0.0, 0.05])
+def test_slow_release_stalls_neither_timers_nor_other_futures(monkeypatch, grace):
+    from eugeroic import executors
+    from eugeroic.drivers.timers import call_later
+
+    releasing = threading.Event()
+    unblock = threading.Event()
+    release = executors._release
+
+    def slow_release(*args):
+        releasing.set()
+        unblock.wait(5.0)
+        release(*args)
+
+    monkeypatch.setattr(executors, "_release", slow_release)
+    pool = ThreadPoolExecutor(1)
+    executor = AwakeExecutor(pool, "Slow release", grace=grace)
+    try:
+        # Done on the worker, after submit has returned
+        gate = threading.Event()
+        future = executor.submit(gate.wait)
+        gate.set()
+        future.result()
+        assert releasing.wait(5.0)
+        fired = threading.Event()
+        call_later(0.01, fired.set)
+        assert fired.wait(1.0)
+        # The worker which ran the task is not stuck releasing the display either
+        assert pool.submit(int).result(timeout=1.0) == 0
+    finally:
+        unblock.set()
+    executor.shutdown()
+    assert not executor.held
+    assert active_reasons()["Slow release"] == 0
+
+
+def test_grace_must_not_be_negative():
+    with pytest.raises(ValueError):
+        AwakeExecutor(ThreadPoolExecutor(1), grace=-1)
+
+
+def test_process_pool():
+    with AwakeExecutor(ProcessPoolExecutor(2), "Processes") as executor:
+        assert list(executor.map(abs, [-1, -2, -3])) == [1, 2, 3]
+    assert active_reasons()["Processes"] == 0
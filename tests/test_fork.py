@@ -0,0 +1,195 @@
+import os
+import time
+
+import pytest
+
+from eugeroic import wakefulness
+from eugeroic import drivers
+from eugeroic.drivers import _get_registry, active_reasons, set_fork_sharing
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork()")
+
+
+@pytest.fixture(autouse=True)
+def fork_sharing():
+    # Children are only connected once the registry exists
+    _get_registry()
+    set_fork_sharing(True)
+    yield
+    set_fork_sharing(True)
+
+
+def _children_disconnected():
+    # Forking while another thread is logging can deadlock the child, so later tests must not
+    # fork until the parent has finished cleaning up after earlier children
+    return drivers._children is None or drivers._children.count == 0
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def _fork(child):
+    """Run child in a forked process, returning its PID and the read end of a pipe it writes to."""
+    assert _wait_for(_children_disconnected)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            child(write_fd)
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    return pid, read_fd
+
+
+def _exit_status(pid):
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def test_child_shares_parents_inhibition():
+    go_fd, proceed_fd = os.pipe()
+
+    def child(write_fd):
+        os.close(proceed_fd)
+        with wakefulness("Forked child"):
+            os.write(write_fd, b"entered")
+            os.read(go_fd, 1)
+
+    pid, read_fd = _fork(child)
+    os.close(go_fd)
+    try:
+        assert os.read(read_fd, 16) == b"entered"
+        assert active_reasons()["Forked child"] == 1
+        os.write(proceed_fd, b"x")
+        assert _exit_status(pid) == 0
+        assert _wait_for(_children_disconnected)
+        assert active_reasons()["Forked child"] == 0
+    finally:
+        os.close(read_fd)
+        os.close(proceed_fd)
+
+
+def test_crashed_childs_holder_is_released():
+    def child(write_fd):
+        with wakefulness("Crashed child"):
+            os.write(write_fd, b"entered")
+            os._exit(3)
+
+    pid, read_fd = _fork(child)
+    try:
+        assert os.read(read_fd, 16) == b"entered"
+        assert _exit_status(pid) == 3
+        assert _wait_for(_children_disconnected)
+        assert active_reasons()["Crashed child"] == 0
+    finally:
+        os.close(read_fd)
+
+
+def test_child_without_sharing_inhibits_itself():
+    set_fork_sharing(False)
+
+    def child(write_fd):
+        with wakefulness("Independent child"):
+            os.write(write_fd, str(active_reasons()["Independent child"]).encode())
+
+    pid, read_fd = _fork(child)
+    try:
+        assert os.read(read_fd, 16) == b"1"
+        assert active_reasons()["Independent child"] == 0
+        assert _exit_status(pid) == 0
+    finally:
+        os.close(read_fd)
+
+
+def test_fork_before_first_use_makes_no_channel(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(drivers, "_registry", None)
+    monkeypatch.setattr(drivers, "_children", None)
+    threads = threading.active_count()
+
+    def child(write_fd):
+        os.write(write_fd, str(drivers._parent is not None).encode())
+
+    pid, read_fd = _fork(child)
+    try:
+        assert os.read(read_fd, 16) == b"False"
+        assert _exit_status(pid) == 0
+        assert drivers._children is None
+        assert threading.active_count() == threads
+    finally:
+        os.close(read_fd)
+
+
+def test_child_forked_inside_block_leaves_parents_inhibition_alone():
+    with wakefulness("Parent block"):
+        registry = _get_registry()
+
+        def child(write_fd):
+            # Leaving the inherited block must not release the parent's inhibition
+            pass
+
+        pid, read_fd = _fork(child)
+        os.close(read_fd)
+        assert _exit_status(pid) == 0
+        assert registry.is_inhibited
+        assert active_reasons()["Parent block"] == 1
+    assert not registry.is_inhibited
+
+
+def test_child_can_linger_after_parent_timer_thread_started():
+    with wakefulness("Parent lingering", linger=30.0):
+        pass
+
+    def child(write_fd):
+        with wakefulness("Child lingering", linger=0.05):
+            pass
+        time.sleep(0.2)
+        os.write(write_fd, b"done")
+
+    pid, read_fd = _fork(child)
+    try:
+        assert os.read(read_fd, 16) == b"done"
+        assert _exit_status(pid) == 0
+    finally:
+        os.close(read_fd)
+        _get_registry().release_lingering()
+
+
+def _pool_task(i):
+    from eugeroic import drivers, stay_awake
+
+    @stay_awake("Pool task")
+    def task():
+        return drivers._parent is not None
+
+    return task()
+
+
+def test_pool_workers_share_parents_inhibition():
+    import multiprocessing
+
+    assert _wait_for(_children_disconnected)
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        assert all(pool.map(_pool_task, range(8)))
+    assert active_reasons()["Pool task"] == 0
+
+
+def test_pool_forked_while_nothing_is_held_shares_parents_inhibition():
+    import multiprocessing
+
+    with wakefulness("Warm up"):
+        pass
+    assert not _get_registry().is_inhibited
+    assert _wait_for(_children_disconnected)
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        assert all(pool.map(_pool_task, range(8)))
+    assert active_reasons()["Pool task"] == 0
@@ -0,0 +1,104 @@
+import contextlib
+import threading
+import time
+
+from pytest import fixture, raises
+
+from eugeroic import drivers, wakefulness
+from eugeroic.drivers import set_heartbeat
+from eugeroic.drivers.heartbeat import Heartbeat
+
+INTERVAL = 0.02
+
+
+class CountingDriver:
+
+    def __init__(self):
+        self.beats = []
+
+    @contextlib.contextmanager
+    def wakefulness(self, logger, reason, wake=True):
+        yield
+
+    def simulate_user_activity(self, logger, reason):
+        self.beats.append(reason)
+
+
+@fixture
+def counting_driver(monkeypatch):
+    driver = CountingDriver()
+    monkeypatch.setattr(drivers, "_driver", lambda name=None: driver)
+    monkeypatch.setattr(drivers, "_registry", None)
+    monkeypatch.setattr(drivers, "_heartbeat", Heartbeat())
+    return driver
+
+
+def test_heartbeat_beats_until_stopped():
+    beats = []
+    heartbeat = Heartbeat(INTERVAL)
+    heartbeat.start(lambda: beats.append(time.monotonic()))
+    time.sleep(6 * INTERVAL)
+    heartbeat.stop()
+    count = len(beats)
+    assert count >= 3
+    time.sleep(3 * INTERVAL)
+    assert len(beats) == count
+
+
+def test_blocked_beat_does_not_delay_other_timers():
+    from eugeroic.drivers.timers import call_later
+
+    unblock = threading.Event()
+    fired = threading.Event()
+    beats = []
+
+    def blocked():
+        beats.append(time.monotonic())
+        unblock.wait(5.0)
+
+    heartbeat = Heartbeat(INTERVAL)
+    heartbeat.start(blocked)
+    try:
+        time.sleep(3 * INTERVAL)
+        call_later(INTERVAL, fired.set)
+        assert fired.wait(10 * INTERVAL)
+        # Beats are skipped, rather than queued, while one is blocked
+        assert len(beats) == 1
+    finally:
+        heartbeat.stop()
+        unblock.set()
+
+
+def test_no_heartbeat_without_interval(counting_driver):
+    with wakefulness("Quiet"):
+        time.sleep(3 * INTERVAL)
+    assert counting_driver.beats == []
+
+
+def test_concurrent_blocks_share_one_heartbeat(counting_driver):
+    set_heartbeat(INTERVAL)
+    entered = threading.Barrier(9)
+    release = threading.Event()
+
+    def worker():
+        with wakefulness("Worker"):
+            entered.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    entered.wait()
+    time.sleep(10 * INTERVAL)
+    release.set()
+    for thread in threads:
+        thread.join()
+    beats = len(counting_driver.beats)
+    assert 3 <= beats <= 11
+    time.sleep(3 * INTERVAL)
+    assert len(counting_driver.beats) == beats
+
+
+def test_invalid_interval_raises_value_error():
+    with raises(ValueError):
+        set_heartbeat(0)
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+# Modules which "import eugeroic" must not import, since they are only needed once the display
+# is kept awake, or by optional features, and would multiply the cost of importing eugeroic
+DEFERRED_MODULES = (
+    "asyncio",
+    "ctypes",
+    "dbus_next",
+    "objc",
+    "selectors",
+    "socket",
+    "subprocess",
+    "eugeroic.drivers.breaker",
+    "eugeroic.drivers.heartbeat",
+    "eugeroic.drivers.registry",
+    "eugeroic.drivers.timers",
+    "eugeroic.iterators",
+    "eugeroic.metrics",
+)
+
+
+def test_import_defers_platform_dependencies():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, eugeroic; "
+            f"print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == []
+
+
+def test_platform_driver_loaded_on_first_inhibition():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, eugeroic\n"
+            "with eugeroic.wakefulness('Load the driver'):\n"
+            "    print('eugeroic.drivers.registry' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "True"
+
+
+def test_lazy_attributes_are_imported_on_first_use():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, eugeroic\n"
+            "print(callable(eugeroic.stats), 'eugeroic.metrics' in sys.modules)\n"
+            "from eugeroic import awake_iter\n"
+            "print(list(awake_iter([1], 'Lazy')))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split("\n")[:2] == ["True True", "[1]"]
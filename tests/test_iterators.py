@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from eugeroic import aawake_iter, awake_iter
+from eugeroic.drivers import active_reasons
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_items_pass_through_while_held():
+    seen = []
+    for item in awake_iter(range(5), "Flowing"):
+        seen.append((item, active_reasons()["Flowing"]))
+    assert seen == [(i, 1) for i in range(5)]
+    assert active_reasons()["Flowing"] == 0
+
+
+def test_nothing_is_held_until_iteration_starts():
+    iterator = awake_iter(range(5), "Not started")
+    assert active_reasons()["Not started"] == 0
+    assert next(iterator) == 0
+    assert active_reasons()["Not started"] == 1
+    iterator.close()
+    assert active_reasons()["Not started"] == 0
+
+
+def test_released_when_upstream_raises():
+    def failing():
+        yield 1
+        raise RuntimeError("Upstream died")
+
+    with pytest.raises(RuntimeError):
+        for _ in awake_iter(failing(), "Failing"):
+            pass
+    assert active_reasons()["Failing"] == 0
+
+
+def test_released_after_stall_and_held_again_on_resume():
+    def stalling():
+        yield 1
+        time.sleep(0.5)
+        yield 2
+
+    iterator = awake_iter(stalling(), "Stalling", stall_timeout=0.1)
+    assert next(iterator) == 1
+    assert _wait_for(lambda: active_reasons()["Stalling"] == 0)
+    assert next(iterator) == 2
+    assert active_reasons()["Stalling"] == 1
+    assert list(iterator) == []
+    assert active_reasons()["Stalling"] == 0
+
+
+def test_slow_release_after_stall_does_not_delay_other_timers(monkeypatch):
+    import threading
+
+    from eugeroic import iterators
+    from eugeroic.drivers.timers import call_later
+
+    releasing = threading.Event()
+    unblock = threading.Event()
+    release = iterators._release
+
+    def slow_release(*args):
+        releasing.set()
+        unblock.wait(5.0)
+        release(*args)
+
+    monkeypatch.setattr(iterators, "_release", slow_release)
+    iterator = awake_iter(iter([1, 2]), "Slow release", stall_timeout=0.1)
+    try:
+        assert next(iterator) == 1
+        assert releasing.wait(5.0)
+        fired = threading.Event()
+        call_later(0.01, fired.set)
+        assert fired.wait(1.0)
+    finally:
+        unblock.set()
+        iterator.close()
+    assert _wait_for(lambda: active_reasons()["Slow release"] == 0)
+
+
+def test_steady_items_are_not_a_stall():
+    def steady():
+        for i in range(10):
+            time.sleep(0.03)
+            yield i
+
+    for _ in awake_iter(steady(), "Steady", stall_timeout=0.2):
+        assert active_reasons()["Steady"] == 1
+
+
+def test_stall_timeout_must_be_positive():
+    with pytest.raises(ValueError):
+        awake_iter([], "Invalid", stall_timeout=0)
+    with pytest.raises(ValueError):
+        aawake_iter([], "Invalid", stall_timeout=-1)
+
+
+def test_asynchronous_items_pass_through_and_stall():
+    async def stalling():
+        yield 1
+        await asyncio.sleep(0.5)
+        yield 2
+
+    async def main():
+        seen = []
+        async for item in aawake_iter(stalling(), "Async stalling", stall_timeout=0.1):
+            seen.append((item, active_reasons()["Async stalling"]))
+            if item == 1:
+                deadline = time.monotonic() + 5.0
+                while active_reasons()["Async stalling"] and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                assert active_reasons()["Async stalling"] == 0
+        return seen
+
+    assert asyncio.run(main()) == [(1, 1), (2, 1)]
+    assert active_reasons()["Async stalling"] == 0
@@ -0,0 +1,239 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("Linux D-Bus driver tests", allow_module_level=True)
+
+from dbus_next import BusType
+
+from eugeroic.drivers.linux import bus
+from eugeroic.drivers.linux.bus import (
+    FakeDBus,
+    FakeMessageBus,
+    FakeScreenSaver,
+    bus_manager,
+    inhibited_screensaver,
+    set_backends,
+    set_deadlines,
+)
+
+
+class FakeGnomeSessionManager:
+
+    extant_cookies = set()
+
+    async def call_inhibit(self, app_id, toplevel_xid, reason, flags):
+        cookie = len(self.extant_cookies) + 1000
+        self.extant_cookies.add(cookie)
+        return cookie
+
+    async def call_uninhibit(self, cookie):
+        self.extant_cookies.remove(cookie)
+
+
+class SlowFakeGnomeSessionManager(FakeGnomeSessionManager):
+
+    delay = 0.5
+
+    async def call_inhibit(self, app_id, toplevel_xid, reason, flags):
+        await asyncio.sleep(self.delay)
+        return await super().call_inhibit(app_id, toplevel_xid, reason, flags)
+
+    async def call_uninhibit(self, cookie):
+        await asyncio.sleep(self.delay)
+        await super().call_uninhibit(cookie)
+
+
+class SlowUnInhibit:
+
+    async def call_un_inhibit(self, cookie):
+        await asyncio.sleep(SlowFakeGnomeSessionManager.delay)
+        FakeScreenSaver._extant_cookies.remove(cookie)
+
+
+@pytest.fixture
+def fake_bus(monkeypatch):
+    """A fake session bus, rather than any real one, with fresh discovery."""
+    monkeypatch.setattr(bus, "_make_bus", FakeMessageBus)
+    monkeypatch.setattr(bus, "_discovered_names", {})
+    bus_manager.disconnect()
+    yield
+    bus_manager.disconnect()
+    set_backends(None)
+    set_deadlines()
+
+
+@pytest.fixture
+def fake_gnome(fake_bus, monkeypatch):
+    services = dict(FakeMessageBus.services[BusType.SESSION])
+    services["org.gnome.SessionManager"] = {"org.gnome.SessionManager": FakeGnomeSessionManager}
+    monkeypatch.setitem(FakeMessageBus.services, BusType.SESSION, services)
+    FakeGnomeSessionManager.extant_cookies.clear()
+    return FakeGnomeSessionManager
+
+
+@pytest.fixture
+def slow_fake_gnome(fake_bus, monkeypatch):
+    services = dict(FakeMessageBus.services[BusType.SESSION])
+    services["org.gnome.SessionManager"] = {"org.gnome.SessionManager": SlowFakeGnomeSessionManager}
+    monkeypatch.setitem(FakeMessageBus.services, BusType.SESSION, services)
+    SlowFakeGnomeSessionManager.extant_cookies.clear()
+    return SlowFakeGnomeSessionManager
+
+
+@pytest.fixture
+def list_names_calls(monkeypatch):
+    calls = []
+    list_names = FakeDBus.call_list_names
+
+    async def counting_list_names(self):
+        calls.append(None)
+        return await list_names(self)
+
+    monkeypatch.setattr(FakeDBus, "call_list_names", counting_list_names)
+    return calls
+
+
+def test_inhibits_through_every_available_backend(fake_gnome):
+    with inhibited_screensaver("Both"):
+        assert len(fake_gnome.extant_cookies) == 1
+        assert FakeScreenSaver._extant_cookies
+    assert not fake_gnome.extant_cookies
+    assert not FakeScreenSaver._extant_cookies
+
+
+def test_inhibits_only_through_enabled_backends(fake_gnome):
+    set_backends(["gnome"])
+    with inhibited_screensaver("GNOME only"):
+        assert len(fake_gnome.extant_cookies) == 1
+        assert not FakeScreenSaver._extant_cookies
+    assert not fake_gnome.extant_cookies
+
+
+def test_absent_backends_are_skipped(fake_bus):
+    with inhibited_screensaver("ScreenSaver only"):
+        assert FakeScreenSaver._extant_cookies
+
+
+def test_unknown_backend_raises_value_error():
+    with pytest.raises(ValueError):
+        set_backends(["no-such-backend"])
+
+
+def test_discovery_is_cached_across_inhibitions(fake_bus, list_names_calls):
+    with inhibited_screensaver("First"):
+        pass
+    discoveries = len(list_names_calls)
+    for _ in range(5):
+        with inhibited_screensaver("Repeated"):
+            pass
+    assert len(list_names_calls) == discoveries
+
+
+def test_discovery_is_cached_across_reconnections(fake_bus, list_names_calls):
+    with inhibited_screensaver("Before"):
+        pass
+    discoveries = len(list_names_calls)
+    bus_manager.disconnect()
+    with inhibited_screensaver("After"):
+        pass
+    assert len(list_names_calls) == discoveries
+
+
+def test_entry_is_not_delayed_by_slowest_backend(slow_fake_gnome):
+    with inhibited_screensaver("Warm up"):
+        pass
+    start = time.perf_counter()
+    with inhibited_screensaver("Fast and slow"):
+        entered = time.perf_counter() - start
+        assert FakeScreenSaver._extant_cookies
+    assert entered < slow_fake_gnome.delay
+
+
+def test_exit_releases_backends_which_confirm_after_entry(slow_fake_gnome):
+    with inhibited_screensaver("Fast and slow"):
+        assert not slow_fake_gnome.extant_cookies
+    assert not slow_fake_gnome.extant_cookies
+    assert not FakeScreenSaver._extant_cookies
+
+
+def test_exit_releases_backends_concurrently(slow_fake_gnome, monkeypatch):
+    monkeypatch.setattr(FakeScreenSaver, "call_un_inhibit", SlowUnInhibit.call_un_inhibit)
+    with inhibited_screensaver("Slow release"):
+        time.sleep(slow_fake_gnome.delay)
+        start = time.perf_counter()
+    assert time.perf_counter() - start < 2 * slow_fake_gnome.delay
+
+
+def test_dbus_calls_and_backend_failures_are_counted(fake_gnome, monkeypatch):
+    from dbus_next.errors import DBusError
+
+    from eugeroic import metrics
+
+    async def refuse(self, app_id, toplevel_xid, reason, flags):
+        raise DBusError("org.freedesktop.DBus.Error.AccessDenied", "Refused")
+
+    monkeypatch.setattr(fake_gnome, "call_inhibit", refuse)
+    metrics.reset()
+    with inhibited_screensaver("Counted"):
+        pass
+    s = metrics.stats()
+    assert s.backend_failures == {"gnome": 1}
+    # Discovery on both buses, each Inhibit, GetActive (the screensaver is not active, so no
+    # SimulateUserActivity), and UnInhibit through the ScreenSaver
+    assert s.dbus_calls == 8
+
+
+def test_entry_deadline_releases_late_inhibitions(slow_fake_gnome):
+    set_backends(["gnome"])
+    set_deadlines(enter=slow_fake_gnome.delay / 5)
+    with pytest.raises(TimeoutError):
+        with inhibited_screensaver("Too slow"):
+            pass
+    # The release is referenced until it is done, so it cannot be garbage collected meanwhile
+    assert bus._background_tasks
+    deadline = time.monotonic() + 4 * slow_fake_gnome.delay
+    while time.monotonic() < deadline and not slow_fake_gnome.extant_cookies:
+        time.sleep(0.01)
+    while time.monotonic() < deadline and slow_fake_gnome.extant_cookies:
+        time.sleep(0.01)
+    assert not slow_fake_gnome.extant_cookies
+    while time.monotonic() < deadline and bus._background_tasks:
+        time.sleep(0.01)
+    assert not bus._background_tasks
+
+
+def test_exit_deadline_leaves_release_in_background(slow_fake_gnome):
+    set_backends(["gnome"])
+    set_deadlines(exit=slow_fake_gnome.delay / 5)
+    with pytest.raises(TimeoutError):
+        with inhibited_screensaver("Slow release"):
+            assert slow_fake_gnome.extant_cookies
+    time.sleep(2 * slow_fake_gnome.delay)
+    assert not slow_fake_gnome.extant_cookies
+
+
+def test_failed_screensaver_watch_is_retried(fake_bus, monkeypatch):
+    from dbus_next.errors import DBusError
+
+    watch_screensaver = bus._watch_screensaver
+    attempts = []
+
+    async def fail_once(connection):
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise DBusError("org.freedesktop.DBus.Error.NoReply", "No reply")
+        await watch_screensaver(connection)
+
+    async def ask_twice():
+        connection = await FakeMessageBus().connect()
+        with pytest.raises(DBusError):
+            await bus.screensaver_active(connection)
+        return await bus.screensaver_active(connection)
+
+    monkeypatch.setattr(bus, "_watch_screensaver", fail_once)
+    assert asyncio.run(ask_twice()) is False
+    assert len(attempts) == 2
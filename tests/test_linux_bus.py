@@ -0,0 +1,87 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("Linux D-Bus driver tests", allow_module_level=True)
+
+from eugeroic.drivers.linux.bus import (
+    bus_manager,
+    inhibited_screensaver,
+    set_static_introspection,
+)
+
+
+@pytest.fixture
+def introspections(monkeypatch):
+    bus = bus_manager.run(bus_manager.connection())
+    calls = []
+    introspect = bus.introspect
+
+    async def counting_introspect(name, path):
+        calls.append((name, path))
+        return await introspect(name, path)
+
+    monkeypatch.setattr(bus, "introspect", counting_introspect)
+    yield calls
+    set_static_introspection(True)
+
+
+def _dbus_threads():
+    return [t for t in threading.enumerate() if t.name == "eugeroic-dbus"]
+
+
+def test_inhibitions_share_one_connection():
+    with inhibited_screensaver("First"):
+        first = bus_manager.run(bus_manager.connection())
+    with inhibited_screensaver("Second"):
+        second = bus_manager.run(bus_manager.connection())
+    assert first is second
+
+
+def test_inhibitions_share_one_thread():
+    for _ in range(10):
+        with inhibited_screensaver("Repeated"):
+            pass
+    assert len(_dbus_threads()) == 1
+
+
+def test_reconnects_after_connection_lost():
+    with inhibited_screensaver("Before"):
+        before = bus_manager.run(bus_manager.connection())
+    bus_manager.disconnect()
+    assert not before.connected
+    with inhibited_screensaver("After"):
+        after = bus_manager.run(bus_manager.connection())
+    assert after is not before
+    assert after.connected
+
+
+def test_exit_tolerates_connection_lost_while_inhibited():
+    with inhibited_screensaver("Interrupted"):
+        bus_manager.disconnect()
+
+
+def test_waiting_for_the_bus_loop_consumes_no_cpu():
+    cpu_start = time.process_time()
+    bus_manager.run(asyncio.sleep(0.5))
+    assert time.process_time() - cpu_start < 0.05
+
+
+def test_static_introspection_makes_no_introspection_calls(introspections):
+    set_static_introspection(True)
+    for _ in range(3):
+        with inhibited_screensaver("Static"):
+            pass
+    assert introspections == []
+
+
+def test_runtime_introspection_is_cached_per_connection(introspections):
+    set_static_introspection(False)
+    for _ in range(3):
+        with inhibited_screensaver("Runtime"):
+            pass
+    assert len(introspections) == len(set(introspections))
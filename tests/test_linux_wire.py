@@ -0,0 +1,422 @@
+import array
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("Linux D-Bus driver tests", allow_module_level=True)
+
+from eugeroic.drivers.linux import config, wirebus
+from eugeroic.drivers.linux.wire import (
+    _ERROR_NAME,
+    _REPLY_SERIAL,
+    ERROR,
+    METHOD_RETURN,
+    SIGNAL,
+    Connection,
+    DBusError,
+    Variant,
+    _message,
+    marshal,
+    split_signature,
+    unmarshal,
+)
+from eugeroic.testing.dbus import PrivateBus, dbus_daemon_available
+
+
+def test_marshalling_aligns_each_value():
+    data, fds = marshal("yu", (1, 2))
+    assert data == b"\x01\0\0\0\x02\0\0\0"
+    assert fds == []
+
+
+def test_marshalling_round_trips():
+    signature = "sua{sv}(ib)adog"
+    body = (
+        "",
+        8,
+        {"reason": Variant("s", "Backup"), "n": Variant("ai", [1, 2])},
+        (-3, True),
+        [1.5],
+        "/a/b",
+        "su",
+    )
+    assert unmarshal(signature, marshal(signature, body)[0]) == list(body)
+
+
+def test_unmarshalling_reads_big_endian():
+    assert unmarshal("qs", b"\x01\x02\0\0\0\0\0\x02hi\0", big_endian=True) == [0x0102, "hi"]
+
+
+def test_malformed_signature_is_rejected():
+    with pytest.raises(ValueError):
+        split_signature("a(su")
+    with pytest.raises(ValueError):
+        marshal("u", ("not a number",))
+
+
+def test_wire_backends_match_dbus_next_backends():
+    from eugeroic.drivers.linux.backends import BACKENDS
+
+    def describe(backend):
+        return (
+            backend.name,
+            backend.bus_name,
+            backend.path,
+            backend.interface,
+            backend.held_by_connection,
+        )
+
+    assert [describe(backend) for backend in wirebus.BACKENDS] == [
+        describe(backend) for backend in BACKENDS
+    ]
+    assert tuple(backend.name for backend in BACKENDS) == config.BACKEND_NAMES
+
+
+def test_unknown_transport_raises_value_error():
+    with pytest.raises(ValueError):
+        config.set_transport("no-such-transport")
+
+
+class FakeBus:
+    """A socket-level stand-in for a bus daemon, serving one client at a time.
+
+    Each method call other than Hello is passed to handler, with the client's socket, the
+    call's serial number, its member and its body.
+    """
+
+    def __init__(self, path, handler):
+        self.address = f"unix:path={path}"
+        self.handler = handler
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(str(path))
+        self._listener.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._listener.close()
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            with client:
+                try:
+                    self._serve_client(client)
+                except (OSError, ValueError):
+                    pass
+
+    def _serve_client(self, client):
+        reader = client.makefile("rb")
+        assert reader.read(1) == b"\0"
+        while True:
+            line = reader.readline()
+            if line.startswith(b"AUTH EXTERNAL "):
+                client.sendall(b"OK 0123456789abcdef0123456789abcdef\r\n")
+            elif line == b"NEGOTIATE_UNIX_FD\r\n":
+                client.sendall(b"AGREE_UNIX_FD\r\n")
+            elif line == b"BEGIN\r\n":
+                break
+            else:
+                return
+        while True:
+            header = reader.read(16)
+            if len(header) < 16:
+                return
+            fields_length = int.from_bytes(header[12:16], "little")
+            header_length = 16 + fields_length + (-(16 + fields_length) % 8)
+            rest = reader.read(header_length - 16 + int.from_bytes(header[4:8], "little"))
+            data = header + rest
+            _, _, _, _, _, serial, fields = unmarshal("yyyyuua(yv)", data)
+            fields = {code: variant.value for code, variant in fields}
+            body = unmarshal(fields.get(8, ""), data[header_length:])
+            if fields[3] == "Hello":
+                reply(client, serial, "s", [":1.42"])
+            else:
+                self.handler(client, serial, fields[3], body)
+
+
+def reply(client, serial, signature="", body=()):
+    data, fds = _message(
+        METHOD_RETURN, 1000 + serial, {_REPLY_SERIAL: Variant("u", serial)}, signature, body
+    )
+    ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))] if fds else []
+    client.sendmsg([data], ancillary)
+
+
+def error(client, serial, name, text):
+    fields = {_REPLY_SERIAL: Variant("u", serial), _ERROR_NAME: Variant("s", name)}
+    data, _ = _message(ERROR, 1000 + serial, fields, "s", [text])
+    client.sendall(data)
+
+
+def signal(client):
+    fields = {
+        1: Variant("o", "/org/example"),
+        2: Variant("s", "org.example"),
+        3: Variant("s", "Changed"),
+    }
+    data, _ = _message(SIGNAL, 999, fields, "b", [True])
+    client.sendall(data)
+
+
+@pytest.fixture
+def fake_bus(tmp_path):
+    buses = []
+
+    def make(handler):
+        bus = FakeBus(tmp_path / f"bus-{len(buses)}", handler)
+        buses.append(bus)
+        return bus
+
+    yield make
+    for bus in buses:
+        bus.close()
+
+
+def _call(connection, member, signature="", body=(), timeout=None):
+    return connection.call(
+        "org.example", "/org/example", "org.example", member, signature, body, timeout
+    )
+
+
+def test_hello_gives_unique_name(fake_bus):
+    bus = fake_bus(lambda *args: None)
+    with Connection(bus.address) as connection:
+        assert connection.unique_name == ":1.42"
+
+
+def test_call_returns_reply_and_passes_signals_to_handlers(fake_bus):
+    def handler(client, serial, member, body):
+        signal(client)
+        reply(client, serial, "u", [body[0] + len(body[1])])
+
+    with Connection(fake_bus(handler).address) as connection:
+        signals = []
+        connection.add_signal_handler(signals.append)
+        assert _call(connection, "Add", "us", (40, "ab")) == [42]
+    assert [(s.member, s.body) for s in signals] == [("Changed", [True])]
+
+
+def test_dispatch_receives_signals_without_waiting(fake_bus):
+    def handler(client, serial, member, body):
+        reply(client, serial)
+        signal(client)
+
+    with Connection(fake_bus(handler).address) as connection:
+        signals = []
+        connection.add_signal_handler(signals.append)
+        _call(connection, "Emit")
+        deadline = time.monotonic() + 2.0
+        while not signals and time.monotonic() < deadline:
+            connection.dispatch()
+        assert len(signals) == 1
+        start = time.perf_counter()
+        connection.dispatch()
+        assert time.perf_counter() - start < 0.1
+        assert len(signals) == 1
+
+
+def test_error_reply_raises_dbus_error(fake_bus):
+    def handler(client, serial, member, body):
+        error(client, serial, "org.example.Error.Refused", "Not now")
+
+    with Connection(fake_bus(handler).address) as connection:
+        with pytest.raises(DBusError) as raised:
+            _call(connection, "Inhibit")
+    assert raised.value.type == "org.example.Error.Refused"
+    assert raised.value.text == "Not now"
+
+
+def test_late_reply_is_discarded_after_timeout(fake_bus):
+    pending = []
+
+    def handler(client, serial, member, body):
+        if member == "Slow":
+            pending.append(serial)
+            return
+        for late in pending:
+            reply(client, late, "s", ["late"])
+        reply(client, serial, "s", ["prompt"])
+
+    with Connection(fake_bus(handler).address) as connection:
+        with pytest.raises(TimeoutError):
+            _call(connection, "Slow", timeout=0.1)
+        assert connection.connected
+        assert _call(connection, "Fast") == ["prompt"]
+
+
+def test_connection_closed_by_bus_raises_connection_error(fake_bus):
+    def handler(client, serial, member, body):
+        client.shutdown(socket.SHUT_RDWR)
+
+    with Connection(fake_bus(handler).address) as connection:
+        with pytest.raises(ConnectionError):
+            _call(connection, "Inhibit")
+        assert not connection.connected
+
+
+def test_file_descriptors_are_received(fake_bus):
+    def handler(client, serial, member, body):
+        read_end, write_end = os.pipe()
+        try:
+            reply(client, serial, "h", [write_end])
+        finally:
+            os.close(read_end)
+            os.close(write_end)
+
+    with Connection(fake_bus(handler).address, negotiate_unix_fd=True) as connection:
+        assert connection.unix_fd
+        (fd,) = _call(connection, "Inhibit")
+    try:
+        assert os.fstat(fd)
+    finally:
+        os.close(fd)
+
+
+@pytest.fixture(scope="module")
+def private_bus():
+    if not dbus_daemon_available():
+        pytest.skip("dbus-daemon is not available")
+    with PrivateBus() as bus:
+        yield bus
+
+
+@pytest.fixture
+def service(private_bus, monkeypatch):
+    from eugeroic.testing.screensaver import ScreenSaverService
+
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", private_bus.address)
+    config.set_backends(["screensaver"])
+    wirebus.disconnect()
+    with ScreenSaverService(private_bus.address) as service:
+        yield service
+    wirebus.disconnect()
+    config.set_backends(None)
+    config.set_deadlines()
+    config.set_transport()
+
+
+def test_inhibition_crosses_the_bus(service):
+    with wirebus.inhibited_screensaver("Over the wire"):
+        assert [reason for _, _, reason in service.cookies.values()] == ["Over the wire"]
+    assert service.cookies == {}
+    # The screensaver is not active, so the display is already awake
+    assert service.calls["SimulateUserActivity"] == 0
+
+
+def test_user_activity_is_simulated_only_while_screensaver_active(service):
+    for _ in range(2):
+        with wirebus.inhibited_screensaver("Already awake"):
+            pass
+    assert service.calls["SimulateUserActivity"] == 0
+    service.set_active(True)
+    assert _wait_for(lambda: wirebus.is_screensaver_active())
+    with wirebus.inhibited_screensaver("Asleep"):
+        pass
+    assert service.calls["SimulateUserActivity"] == 1
+    assert service.calls["GetActive"] == 1
+
+
+def test_screensaver_state_follows_active_changed(service):
+    assert wirebus.is_screensaver_active() is False
+    service.set_active(True)
+    assert _wait_for(lambda: wirebus.is_screensaver_active())
+    service.set_active(False)
+    assert _wait_for(lambda: wirebus.is_screensaver_active() is False)
+    assert service.calls["GetActive"] == 1
+
+
+def test_failed_subscription_leaves_inhibition_and_is_retried(service, monkeypatch):
+    add_match = wirebus._add_match
+    attempts = []
+
+    def fail_once(bus_connection, rule, timeout):
+        attempts.append(rule)
+        if len(attempts) == 1:
+            raise DBusError("org.freedesktop.DBus.Error.LimitsExceeded", "Too many matches")
+        add_match(bus_connection, rule, timeout)
+
+    monkeypatch.setattr(wirebus, "_add_match", fail_once)
+    with wirebus.inhibited_screensaver("Unwatched"):
+        assert len(service.cookies) == 1
+    assert wirebus.is_screensaver_active() is False
+    assert len(attempts) == 2
+
+
+def test_session_idle_time_is_asked_of_the_screensaver(service):
+    assert wirebus.session_idle_time() >= 0
+    assert service.calls["GetSessionIdleTime"] == 1
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_asynchronous_inhibition_over_the_wire(service):
+    import asyncio
+    import logging
+
+    from eugeroic.drivers.linux import driver
+
+    async def inhibit():
+        async with driver.awakefulness(logging.getLogger(__name__), "Awaited"):
+            return [reason for _, _, reason in service.cookies.values()]
+
+    config.set_transport("wire")
+    assert asyncio.run(inhibit()) == ["Awaited"]
+    assert service.cookies == {}
+
+
+def test_inhibitions_share_one_connection(service):
+    with wirebus.inhibited_screensaver("First"):
+        first = wirebus.connection()
+    with wirebus.inhibited_screensaver("Second"):
+        second = wirebus.connection()
+    assert first is second
+
+
+def test_entry_deadline_closes_connection(service):
+    config.set_deadlines(enter=0.2)
+    service.inject("Inhibit", drop=True)
+    with pytest.raises(TimeoutError):
+        with wirebus.inhibited_screensaver("Unanswered"):
+            pass
+    closed = wirebus._connections["session"]
+    assert not closed.connected
+    service.clear_faults()
+    with wirebus.inhibited_screensaver("Reconnected"):
+        assert wirebus.connection() is not closed
+        assert [reason for _, _, reason in service.cookies.values()] == ["Reconnected"]
+
+
+def test_wire_transport_needs_neither_dbus_next_nor_a_thread(service, private_bus):
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, threading, eugeroic\n"
+            "from eugeroic.drivers.linux.config import set_backends, set_transport\n"
+            "set_backends(['screensaver'])\n"
+            "set_transport('wire')\n"
+            "with eugeroic.wakefulness('Lightweight'):\n"
+            "    print('dbus_next' in sys.modules, threading.active_count())",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "DBUS_SESSION_BUS_ADDRESS": private_bus.address},
+    )
+    assert result.stdout.split() == ["False", "1"]
+    assert service.calls["Inhibit"] == 1
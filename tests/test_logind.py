@@ -0,0 +1,159 @@
+import os
+import signal
+import stat
+import sys
+import time
+
+import pytest
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("Linux D-Bus driver tests", allow_module_level=True)
+
+from eugeroic.testing.dbus import PrivateBus, dbus_daemon_available
+
+if not dbus_daemon_available():
+    pytest.skip("dbus-daemon is not available", allow_module_level=True)
+
+from eugeroic.drivers.linux import config, wirebus
+from eugeroic.drivers.linux.logind import inhibit, inhibitor
+from eugeroic.drivers.linux.wire import DBusError
+from eugeroic.testing.login1 import Inhibitor, Login1Service
+
+
+@pytest.fixture(scope="module")
+def private_bus():
+    with PrivateBus() as bus:
+        yield bus
+
+
+@pytest.fixture
+def service(private_bus, monkeypatch):
+    monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", private_bus.address)
+    monkeypatch.delenv("DBUS_SESSION_BUS_ADDRESS", raising=False)
+    with Login1Service(private_bus.address) as service:
+        yield service
+    config.set_backends(None)
+    config.set_login1_targets()
+
+
+def _open_fds():
+    return set(os.listdir("/proc/self/fd"))
+
+
+def test_lock_is_held_while_its_file_descriptor_is_open(service):
+    with inhibitor("Nightly backup", ("sleep", "handle-lid-switch"), app_name="backup"):
+        assert service.inhibitors == [
+            Inhibitor("sleep:handle-lid-switch", "backup", "Nightly backup", "block")
+        ]
+    assert service.inhibitors == []
+
+
+def test_no_connection_remains_open(service):
+    before = _open_fds()
+    fd = inhibit("Nothing else")
+    try:
+        opened = _open_fds() - before
+        assert str(fd) in opened
+        # Besides the lock, only the service's own ends of its pipes, and no socket
+        assert all(stat.S_ISFIFO(os.fstat(int(name)).st_mode) for name in opened)
+    finally:
+        os.close(fd)
+
+
+def test_unknown_target_raises_value_error(service):
+    with pytest.raises(ValueError):
+        inhibit("Unknown", ("shutdown",))
+    with pytest.raises(ValueError):
+        config.set_login1_targets(["no-such-target"])
+
+
+def test_refused_lock_raises_dbus_error(service):
+    service.refuse = "org.freedesktop.DBus.Error.AccessDenied"
+    with pytest.raises(DBusError) as raised:
+        inhibit("Refused")
+    assert raised.value.type == "org.freedesktop.DBus.Error.AccessDenied"
+
+
+def test_wire_transport_holds_no_connection_while_inhibited(service):
+    config.set_backends(["login1"])
+    config.set_login1_targets(["idle", "sleep"])
+    with wirebus.inhibited_screensaver("Held by a file descriptor", app_name="test"):
+        assert service.inhibitors == [
+            Inhibitor("idle:sleep", "test", "Held by a file descriptor", "block")
+        ]
+        assert wirebus.SYSTEM not in wirebus._connections
+    assert service.inhibitors == []
+
+
+def test_forked_child_does_not_keep_the_lock(service):
+    config.set_backends(["login1"])
+    with wirebus.inhibited_screensaver("Parent only"):
+        assert len(service.inhibitors) == 1
+        pid = os.fork()
+        if pid == 0:
+            time.sleep(5.0)
+            os._exit(0)
+    try:
+        # The child closes its copy of the lock as it starts, which may be after the fork returns
+        # here
+        deadline = time.monotonic() + 2.0
+        while service.inhibitors and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert service.inhibitors == []
+    finally:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def test_dbus_next_transport_inhibits_configured_targets(service):
+    from eugeroic.drivers.linux.bus import bus_manager, inhibited_screensaver
+
+    config.set_backends(["login1"])
+    config.set_login1_targets(["idle", "handle-lid-switch"])
+    bus_manager.disconnect()
+    try:
+        with inhibited_screensaver("Through dbus_next", app_name="test", wake=False):
+            assert [lock.what for lock in service.inhibitors] == ["idle:handle-lid-switch"]
+        assert service.inhibitors == []
+    finally:
+        bus_manager.disconnect()
+
+
+def test_forked_child_does_not_keep_the_lock_taken_through_dbus_next(service):
+    from eugeroic.drivers.linux.bus import bus_manager, inhibited_screensaver
+
+    config.set_backends(["login1"])
+    bus_manager.disconnect()
+    try:
+        with inhibited_screensaver("Parent only", wake=False):
+            assert len(service.inhibitors) == 1
+            pid = os.fork()
+            if pid == 0:
+                time.sleep(5.0)
+                os._exit(0)
+    finally:
+        bus_manager.disconnect()
+    try:
+        deadline = time.monotonic() + 2.0
+        while service.inhibitors and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert service.inhibitors == []
+    finally:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def test_dbus_next_transport_keeps_no_system_bus_connection(service):
+    from dbus_next import BusType
+
+    from eugeroic.drivers.linux.bus import bus_manager, inhibited_screensaver
+
+    config.set_backends(["login1"])
+    bus_manager.disconnect()
+    try:
+        with inhibited_screensaver("Through dbus_next", app_name="test", wake=False):
+            assert [lock.who for lock in service.inhibitors] == ["test"]
+            assert bus_manager._connections[BusType.SYSTEM]._bus is None
+        assert service.inhibitors == []
+    finally:
+        bus_manager.disconnect()
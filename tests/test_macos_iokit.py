@@ -0,0 +1,131 @@
+"""Tests of the macOS driver's use of IOKit, against stubs of PyObjC and the IOKit library."""
+
+import importlib
+import sys
+import types
+
+from pytest import fixture
+
+
+class FakeCFString:
+
+    created = []
+
+    def __init__(self, value: bytes):
+        self.value = value.decode("utf-8")
+        FakeCFString.created.append(self.value)
+
+    def nsstring(self):
+        return self
+
+
+class FakeIOKit:
+    """A stand-in for the ctypes handle on the IOKit library."""
+
+    def __init__(self):
+        self.next_id = 1
+        self.assertions = {}
+        self.declarations = []
+
+    def IOPMAssertionCreateWithName(self, assertion_type, level, reason, assertion_id):
+        assertion_id._obj.value = self.next_id
+        self.assertions[self.next_id] = (assertion_type, reason)
+        self.next_id += 1
+        return 0
+
+    def IOPMAssertionRelease(self, assertion_id):
+        value = getattr(assertion_id, "value", assertion_id)
+        return 0 if self.assertions.pop(value, None) is not None else 1
+
+    def IOPMAssertionDeclareUserActivity(self, name, user_active_type, assertion_id):
+        if assertion_id._obj.value == 0:
+            assertion_id._obj.value = self.next_id
+            self.assertions[self.next_id] = ("UserIsActive", name)
+            self.next_id += 1
+        elif assertion_id._obj.value not in self.assertions:
+            return 1
+        self.declarations.append(assertion_id._obj.value)
+        return 0
+
+
+@fixture
+def iokit(monkeypatch):
+    objc = types.ModuleType("objc")
+    objc.pyobjc_id = id
+    core_foundation = types.ModuleType("CoreFoundation")
+    core_foundation.CFStringCreateWithCString = lambda allocator, value, encoding: FakeCFString(
+        value
+    )
+    core_foundation.kCFStringEncodingUTF8 = 0x08000100
+    monkeypatch.setitem(sys.modules, "objc", objc)
+    monkeypatch.setitem(sys.modules, "CoreFoundation", core_foundation)
+    for name in ("eugeroic.drivers.macos.cfstringref", "eugeroic.drivers.macos.iokit"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module("eugeroic.drivers.macos.iokit")
+    fake = FakeIOKit()
+    monkeypatch.setattr(module, "_iokit", fake)
+    FakeCFString.created.clear()
+    yield module
+    module.release_user_activity_assertion()
+    for name in ("eugeroic.drivers.macos.cfstringref", "eugeroic.drivers.macos.iokit"):
+        sys.modules.pop(name, None)
+
+
+def test_assertion_type_is_converted_once(iokit):
+    for i in range(10):
+        with iokit.power_management_assertion(
+            iokit.AssertionType.PreventUserIdleDisplaySleep,
+            iokit.Level.On,
+            "Same reason",
+        ):
+            pass
+    assert FakeCFString.created == ["PreventUserIdleDisplaySleep", "Same reason"]
+    assert iokit.get_iokit().assertions == {}
+
+
+def test_reasons_are_cached_in_bounded_lru(iokit, monkeypatch):
+    monkeypatch.setattr(iokit._cfstrings, "maxsize", 4)
+    for i in range(20):
+        with iokit.power_management_assertion(
+            iokit.AssertionType.PreventUserIdleDisplaySleep,
+            iokit.Level.On,
+            f"Reason {i}",
+        ):
+            pass
+    assert len(iokit._cfstrings) == 1 + 4
+    with iokit.power_management_assertion(
+        iokit.AssertionType.PreventUserIdleDisplaySleep,
+        iokit.Level.On,
+        "Reason 19",
+    ):
+        pass
+    assert FakeCFString.created.count("Reason 19") == 1
+
+
+def test_user_activity_reuses_one_assertion(iokit):
+    for _ in range(10):
+        iokit.declare_local_user_activity("Busy")
+    fake = iokit.get_iokit()
+    assert len(set(fake.declarations)) == 1
+    assert len(fake.declarations) == 10
+    assert len(fake.assertions) == 1
+    iokit.release_user_activity_assertion()
+    assert fake.assertions == {}
+
+
+def test_user_activity_assertion_recreated_if_lost(iokit):
+    iokit.declare_local_user_activity("Busy")
+    fake = iokit.get_iokit()
+    fake.assertions.clear()
+    iokit.declare_local_user_activity("Still busy")
+    assert len(fake.assertions) == 1
+    assert fake.declarations[0] != fake.declarations[-1]
+
+
+def test_cache_is_usable_in_forked_child(iokit):
+    iokit._cfstrings.ref("Before fork")
+    # As if another thread held the lock as the process forked
+    iokit._cfstrings._lock.acquire()
+    iokit._after_fork_in_child()
+    iokit._cfstrings.ref("After fork")
+    assert FakeCFString.created == ["Before fork", "After fork"]
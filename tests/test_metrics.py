@@ -0,0 +1,120 @@
+import asyncio
+import contextlib
+
+from pytest import fixture, raises
+
+from eugeroic import awakefulness, drivers, metrics, stats, wakefulness
+from eugeroic.drivers.registry import InhibitionRegistry
+
+
+@fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@fixture
+def events():
+    recorded = []
+    hooks = {
+        event: (lambda *args, event=event: recorded.append((event, *args)))
+        for event in metrics.EVENTS
+    }
+    for event, hook in hooks.items():
+        metrics.add_hook(event, hook)
+    yield recorded
+    for event, hook in hooks.items():
+        metrics.remove_hook(event, hook)
+
+
+@fixture
+def failing_registry(monkeypatch):
+    @contextlib.contextmanager
+    def inhibit(reason, wake):
+        raise OSError("No inhibition for you")
+        yield
+
+    @contextlib.asynccontextmanager
+    async def ainhibit(reason, wake):
+        raise OSError("No inhibition for you")
+        yield
+
+    monkeypatch.setattr(drivers, "_registry", InhibitionRegistry(inhibit, ainhibit))
+
+
+def test_counts_active_and_total_blocks():
+    with wakefulness("Outer"):
+        with wakefulness("Inner"):
+            assert stats().active == 2
+        assert stats().active == 1
+    s = stats()
+    assert s.active == 0
+    assert s.total == 2
+    assert s.inhibitions == 1
+    assert s.enter_latency.count == 2
+    assert s.exit_latency.count == 2
+
+
+def test_accumulates_held_time_per_reason():
+    for _ in range(2):
+        with wakefulness("Repeated"):
+            pass
+    with wakefulness("Once"):
+        pass
+    assert set(stats().held_seconds) == {"Repeated", "Once"}
+
+
+def test_hooks_are_called_on_acquire_and_release(events):
+    with wakefulness("Hooked"):
+        assert [e[:2] for e in events] == [("acquire", "Hooked")]
+    assert [e[:2] for e in events] == [("acquire", "Hooked"), ("release", "Hooked")]
+
+
+def test_asynchronous_blocks_are_counted(events):
+    async def hold():
+        async with awakefulness("Async"):
+            return stats().active
+
+    assert asyncio.run(hold()) == 1
+    assert stats().total == 1
+    assert [e[:2] for e in events] == [("acquire", "Async"), ("release", "Async")]
+
+
+def test_error_hook_is_called_when_acquisition_fails(failing_registry, events):
+    with raises(OSError):
+        with wakefulness("Refused"):
+            pass
+    assert stats().errors == 1
+    assert stats().active == 0
+    [(event, reason, error)] = events
+    assert (event, reason) == ("error", "Refused")
+    assert isinstance(error, OSError)
+
+
+def test_failing_hook_does_not_affect_wakefulness(caplog):
+    def hook(reason, seconds):
+        raise RuntimeError("Broken hook")
+
+    metrics.add_hook("acquire", hook)
+    try:
+        with wakefulness("Despite the hook"):
+            pass
+    finally:
+        metrics.remove_hook("acquire", hook)
+    assert "Broken hook" in caplog.text
+
+
+def test_unknown_event_raises_value_error():
+    with raises(ValueError):
+        metrics.add_hook("no-such-event", print)
+
+
+def test_histogram_quantiles():
+    histogram = metrics.Histogram((0.001, 0.01, 0.1), (50, 45, 4, 1), total=1.0)
+    assert histogram.count == 100
+    assert histogram.mean == 0.01
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.95) == 0.01
+    assert histogram.quantile(0.99) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
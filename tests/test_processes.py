@@ -0,0 +1,71 @@
+import signal
+import subprocess
+import sys
+import time
+
+from eugeroic.processes import run, wait_for_exit
+
+
+def _sleeper(seconds):
+    return subprocess.Popen([sys.executable, "-c", f"import time; time.sleep({seconds})"])
+
+
+def test_wait_for_exit_returns_when_all_processes_exit():
+    processes = [_sleeper(0.1), _sleeper(0.3)]
+    try:
+        start = time.monotonic()
+        assert wait_for_exit([p.pid for p in processes], timeout=10.0) == set()
+        assert time.monotonic() - start < 5.0
+    finally:
+        for process in processes:
+            process.wait()
+
+
+def test_wait_for_exit_timeout_returns_running_processes():
+    process = _sleeper(30)
+    try:
+        assert wait_for_exit([process.pid], timeout=0.1) == {process.pid}
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_wait_for_exit_ignores_exited_processes():
+    process = _sleeper(0)
+    process.wait()
+    assert wait_for_exit([process.pid], timeout=1.0) == set()
+
+
+def test_run_returns_exit_status(caplog):
+    caplog.set_level("DEBUG")
+    assert run([sys.executable, "-c", "raise SystemExit(3)"], "Wrapped command") == 3
+    assert "Entering wakefulness state during: 'Wrapped command'" in caplog.text
+
+
+def test_run_forwards_signals():
+    script = (
+        "import sys\n"
+        "from eugeroic.cli import main\n"
+        "sys.exit(main(['run', '--', sys.executable, '-c', "
+        "'import time; print(\"started\", flush=True); time.sleep(30)']))\n"
+    )
+    process = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+    try:
+        assert process.stdout.readline().strip() == "started"
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10.0) == -signal.SIGTERM
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_run_does_not_pass_on_interrupts_from_the_terminal():
+    # The command receives a terminal's SIGINT itself, so one sent to this process alone is
+    # neither passed on, which would interrupt the command, nor interrupts this process
+    command = (
+        "import os, signal, time\n"
+        "time.sleep(0.1)\n"
+        "os.kill(os.getppid(), signal.SIGINT)\n"
+        "time.sleep(0.5)\n"
+    )
+    assert run([sys.executable, "-c", command], "Interrupted") == 0
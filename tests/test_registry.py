@@ -0,0 +1,359 @@
+import asyncio
+import contextlib
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+from pytest import fixture, raises
+
+from eugeroic import awakefulness, drivers, flush, wakefulness
+from eugeroic.drivers import active_reasons
+from eugeroic.drivers.registry import InhibitionRegistry
+
+
+class CountingDriver:
+
+    def __init__(self):
+        self.acquired = []
+        self.released = 0
+
+    @contextlib.contextmanager
+    def inhibit(self, reason, wake):
+        self.acquired.append((reason, wake))
+        try:
+            yield
+        finally:
+            self.released += 1
+
+    @contextlib.asynccontextmanager
+    async def ainhibit(self, reason, wake):
+        with self.inhibit(reason, wake):
+            yield
+
+
+@fixture
+def driver():
+    return CountingDriver()
+
+
+@fixture
+def registry(driver):
+    return InhibitionRegistry(driver.inhibit, driver.ainhibit)
+
+
+def test_first_holder_acquires_inhibition(registry, driver):
+    with registry.hold("Outer"):
+        assert driver.acquired == [("Outer", True)]
+        assert registry.is_inhibited
+    assert driver.released == 1
+    assert not registry.is_inhibited
+
+
+def test_nested_holders_share_one_inhibition(registry, driver):
+    with registry.hold("Outer"):
+        with registry.hold("Inner", wake=False):
+            with registry.hold("Inner"):
+                assert registry.count == 3
+        assert driver.released == 0
+        assert registry.is_inhibited
+    assert len(driver.acquired) == 1
+    assert driver.released == 1
+
+
+def test_reasons_are_tracked(registry):
+    with registry.hold("Outer"):
+        with registry.hold("Inner"):
+            with registry.hold("Inner"):
+                assert registry.reasons() == {"Outer": 1, "Inner": 2}
+        assert registry.reasons() == {"Outer": 1}
+    assert registry.reasons() == {}
+
+
+def test_concurrent_holders_share_one_inhibition(registry, driver):
+    entered = threading.Barrier(8)
+
+    def worker():
+        with registry.hold("Worker"):
+            entered.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(driver.acquired) == 1
+    assert driver.released == 1
+
+
+def test_release_on_different_thread_from_acquire(registry, driver):
+    registry.acquire("Handed over")
+    thread = threading.Thread(target=registry.release, args=("Handed over",))
+    thread.start()
+    thread.join()
+    assert driver.released == 1
+
+
+def test_async_holders_share_inhibition_with_sync_holders(registry, driver):
+
+    async def main():
+        async with registry.ahold("Async outer"):
+            with registry.hold("Sync inner"):
+                async with registry.ahold("Async inner"):
+                    assert registry.count == 3
+        assert not registry.is_inhibited
+
+    asyncio.run(main())
+    assert len(driver.acquired) == 1
+    assert driver.released == 1
+
+
+class SlowAsyncDriver(CountingDriver):
+
+    @contextlib.asynccontextmanager
+    async def ainhibit(self, reason, wake):
+        await asyncio.sleep(0.05)
+        with self.inhibit(reason, wake):
+            yield
+        await asyncio.sleep(0.05)
+
+
+def _run_in_thread(coro_function, timeout=5.0):
+    """Run a coroutine function on an event loop in a thread, failing rather than deadlocking."""
+    outcome = []
+    thread = threading.Thread(
+        target=lambda: outcome.append(asyncio.run(coro_function())), daemon=True
+    )
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "Deadlocked"
+    return outcome
+
+
+def test_sync_holder_joins_async_acquisition_on_same_loop():
+    driver = SlowAsyncDriver()
+    registry = InhibitionRegistry(driver.inhibit, driver.ainhibit)
+
+    async def main():
+        holder = asyncio.ensure_future(registry.aacquire("Async"))
+        await asyncio.sleep(0)
+        with registry.hold("Sync"):
+            assert registry.reasons()["Sync"] == 1
+        await holder
+        assert registry.is_inhibited
+        await registry.arelease("Async")
+        return registry.is_inhibited
+
+    assert _run_in_thread(main) == [False]
+    assert len(driver.acquired) == 1
+    assert driver.released == 1
+
+
+def test_sync_holder_during_async_release_on_same_loop_raises():
+    driver = SlowAsyncDriver()
+    registry = InhibitionRegistry(driver.inhibit, driver.ainhibit)
+
+    async def main():
+        await registry.aacquire("Async")
+        releasing = asyncio.ensure_future(registry.arelease("Async"))
+        await asyncio.sleep(0)
+        with raises(RuntimeError):
+            registry.acquire("Sync")
+        await releasing
+        with registry.hold("Sync"):
+            return registry.count
+
+    assert _run_in_thread(main) == [1]
+    assert len(driver.acquired) == 2
+    assert driver.released == 2
+
+
+def test_async_acquisition_released_by_sync_holder_on_another_thread(registry, driver):
+
+    async def main():
+        await registry.aacquire("Async")
+        thread = threading.Thread(target=registry.release, args=("Async",))
+        thread.start()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert driver.released == 1
+    assert not registry.is_inhibited
+
+
+def test_failed_acquisition_registers_no_holder(driver):
+    @contextlib.contextmanager
+    def failing_inhibit(reason, wake):
+        raise RuntimeError("No inhibition for you")
+        yield
+
+    registry = InhibitionRegistry(failing_inhibit, driver.ainhibit)
+    with raises(RuntimeError):
+        registry.acquire("Doomed")
+    assert registry.count == 0
+    assert registry.reasons() == {}
+
+
+def test_release_without_holder_raises_value_error(registry):
+    with raises(ValueError):
+        registry.release("Never acquired")
+
+
+def test_lingering_inhibition_is_reused(registry, driver):
+    for _ in range(10):
+        with registry.hold("Bursty", linger=10.0):
+            pass
+    assert len(driver.acquired) == 1
+    assert driver.released == 0
+    assert registry.is_lingering
+    registry.release_lingering()
+    assert driver.released == 1
+    assert not registry.is_inhibited
+
+
+def test_lingering_inhibition_is_released_after_linger_period(registry, driver):
+    with registry.hold("Brief", linger=0.05):
+        pass
+    assert registry.is_inhibited
+    deadline = time.monotonic() + 2.0
+    while driver.released == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert driver.released == 1
+    assert not registry.is_inhibited
+
+
+def test_slow_release_after_linger_period_does_not_delay_other_timers():
+    from eugeroic.drivers.timers import call_later
+
+    releasing = threading.Event()
+    unblock = threading.Event()
+
+    @contextlib.contextmanager
+    def slow_inhibit(reason, wake):
+        yield
+        releasing.set()
+        unblock.wait(5.0)
+
+    registry = InhibitionRegistry(slow_inhibit, CountingDriver().ainhibit)
+    with registry.hold("Slow", linger=0.01):
+        pass
+    try:
+        assert releasing.wait(5.0)
+        fired = threading.Event()
+        call_later(0.01, fired.set)
+        assert fired.wait(1.0)
+    finally:
+        unblock.set()
+    flush()
+    assert not registry.is_inhibited
+
+
+def test_holder_during_linger_period_postpones_release(registry, driver):
+    with registry.hold("First", linger=0.1):
+        pass
+    with registry.hold("Second"):
+        time.sleep(0.2)
+        assert driver.released == 0
+    assert driver.released == 1
+
+
+def test_async_lingering_inhibition_is_released_when_loop_shuts_down(registry, driver):
+
+    async def main():
+        async with registry.ahold("Async", linger=60.0):
+            pass
+        assert registry.is_lingering
+
+    asyncio.run(main())
+    assert driver.released == 1
+    assert not registry.is_inhibited
+
+
+def test_lingering_inhibition_is_released_at_interpreter_exit():
+    script = textwrap.dedent("""
+        import contextlib
+        from eugeroic import drivers, wakefulness
+
+        @contextlib.contextmanager
+        def inhibit(reason, wake):
+            try:
+                yield
+            finally:
+                print("Released", flush=True)
+
+        drivers._get_registry()._inhibit = inhibit
+        with wakefulness("Lingering", linger=60.0):
+            pass
+        print("Exiting", flush=True)
+    """)
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=10,
+    )
+    assert result.stdout.split() == ["Exiting", "Released"]
+
+
+def test_nested_wakefulness_logs_each_holder(caplog):
+    caplog.set_level("DEBUG")
+    with wakefulness("Outer message"):
+        with wakefulness("Inner message"):
+            assert active_reasons() == {"Outer message": 1, "Inner message": 1}
+        assert "Exiting wakefulness state after: 'Inner message'" in caplog.text
+    assert "Entering wakefulness state during: 'Inner message'" in caplog.text
+    assert "Exiting wakefulness state after: 'Outer message'" in caplog.text
+
+
+def test_non_blocking_wakefulness_returns_before_inhibition(monkeypatch, driver):
+    acquiring = threading.Event()
+    proceed = threading.Event()
+
+    @contextlib.contextmanager
+    def slow_inhibit(reason, wake):
+        acquiring.set()
+        proceed.wait()
+        with driver.inhibit(reason, wake):
+            yield
+
+    monkeypatch.setattr(drivers, "_registry", InhibitionRegistry(slow_inhibit, driver.ainhibit))
+    with wakefulness("Best effort", blocking=False) as handle:
+        assert acquiring.wait(2.0)
+        assert not handle.acquired.done()
+        proceed.set()
+        handle.acquired.result(2.0)
+        assert driver.acquired == [("Best effort", True)]
+    assert flush(2.0)
+    assert handle.released.done()
+    assert driver.released == 1
+
+
+def test_non_blocking_wakefulness_reports_failure(monkeypatch, driver):
+    @contextlib.contextmanager
+    def failing_inhibit(reason, wake):
+        raise RuntimeError("No inhibition for you")
+        yield
+
+    monkeypatch.setattr(drivers, "_registry", InhibitionRegistry(failing_inhibit, driver.ainhibit))
+    with wakefulness("Doomed", blocking=False) as handle:
+        pass
+    assert flush(2.0)
+    assert isinstance(handle.acquired.exception(), RuntimeError)
+    assert handle.released.result() is None
+    assert drivers.active_reasons() == {}
+
+
+def test_non_blocking_awakefulness_does_not_await(monkeypatch, driver):
+    monkeypatch.setattr(drivers, "_registry", InhibitionRegistry(driver.inhibit, driver.ainhibit))
+
+    async def main():
+        async with awakefulness("Async best effort", blocking=False) as handle:
+            return handle
+
+    handle = asyncio.run(main())
+    assert flush(2.0)
+    assert handle.acquired.done() and handle.released.done()
+    assert driver.released == 1
@@ -0,0 +1,149 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("Linux D-Bus driver tests", allow_module_level=True)
+
+from eugeroic.testing.dbus import PrivateBus, dbus_daemon_available
+
+if not dbus_daemon_available():
+    pytest.skip("dbus-daemon is not available", allow_module_level=True)
+
+from dbus_next.aio import MessageBus
+
+from eugeroic.drivers.linux.bus import (
+    bus_manager,
+    inhibited_screensaver,
+    is_screensaver_active,
+    session_idle_time,
+)
+from eugeroic.testing.screensaver import ScreenSaverService
+
+
+@pytest.fixture(scope="module")
+def private_bus():
+    with PrivateBus() as bus:
+        yield bus
+
+
+@pytest.fixture
+def service(private_bus, monkeypatch):
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", private_bus.address)
+    bus_manager.disconnect()
+    with ScreenSaverService(private_bus.address) as service:
+        yield service
+    bus_manager.disconnect()
+
+
+def _call(address, member, signature="", body=(), timeout=1.0):
+    from dbus_next import Message
+
+    async def call():
+        bus = await MessageBus(bus_address=address).connect()
+        try:
+            reply = await asyncio.wait_for(
+                bus.call(
+                    Message(
+                        destination="org.freedesktop.ScreenSaver",
+                        path="/org/freedesktop/ScreenSaver",
+                        interface="org.freedesktop.ScreenSaver",
+                        member=member,
+                        signature=signature,
+                        body=list(body),
+                    )
+                ),
+                timeout,
+            )
+            return reply
+        finally:
+            bus.disconnect()
+
+    return asyncio.run(call())
+
+
+def test_inhibition_crosses_the_bus(service):
+    with inhibited_screensaver("Over the socket"):
+        assert [reason for _, _, reason in service.cookies.values()] == ["Over the socket"]
+    assert service.cookies == {}
+    assert service.calls["Inhibit"] == 1
+    assert service.calls["UnInhibit"] == 1
+
+
+def test_injected_latency_delays_reply(service, private_bus):
+    service.inject("GetActive", latency=0.3)
+    start = time.perf_counter()
+    _call(private_bus.address, "GetActive")
+    assert time.perf_counter() - start >= 0.3
+
+
+def test_injected_error_is_replied(service, private_bus):
+    service.inject("GetActive", error="org.freedesktop.DBus.Error.AccessDenied")
+    reply = _call(private_bus.address, "GetActive")
+    assert reply.error_name == "org.freedesktop.DBus.Error.AccessDenied"
+
+
+def test_dropped_reply_never_arrives(service, private_bus):
+    service.inject("GetActive", drop=True)
+    with pytest.raises(asyncio.TimeoutError):
+        _call(private_bus.address, "GetActive", timeout=0.3)
+
+
+def test_injected_inhibit_error_does_not_prevent_entry(service):
+    service.inject("Inhibit", error="org.freedesktop.DBus.Error.Failed")
+    with inhibited_screensaver("Refused"):
+        assert service.cookies == {}
+
+
+def test_inhibitions_released_when_client_disconnects(service):
+    with inhibited_screensaver("Abandoned"):
+        bus_manager.disconnect()
+        deadline = time.monotonic() + 2.0
+        while service.cookies and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert service.cookies == {}
+
+
+def test_restart_mid_session_forgets_inhibitions(service):
+    with inhibited_screensaver("Interrupted"):
+        service.restart()
+        assert service.cookies == {}
+    with inhibited_screensaver("After restart"):
+        assert len(service.cookies) == 1
+    assert service.cookies == {}
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_user_activity_is_simulated_only_while_screensaver_active(service):
+    for _ in range(2):
+        with inhibited_screensaver("Already awake"):
+            pass
+    assert service.calls["SimulateUserActivity"] == 0
+    service.set_active(True)
+    assert _wait_for(is_screensaver_active)
+    with inhibited_screensaver("Asleep"):
+        pass
+    assert service.calls["SimulateUserActivity"] == 1
+    assert service.calls["GetActive"] == 1
+
+
+def test_screensaver_state_follows_active_changed(service):
+    assert is_screensaver_active() is False
+    service.set_active(True)
+    assert _wait_for(is_screensaver_active)
+    service.set_active(False)
+    assert _wait_for(lambda: is_screensaver_active() is False)
+    assert service.calls["GetActive"] == 1
+
+
+def test_session_idle_time_is_asked_of_the_screensaver(service):
+    assert session_idle_time() >= 0
+    assert service.calls["GetSessionIdleTime"] == 1
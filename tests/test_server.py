@@ -0,0 +1,156 @@
+import asyncio
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from eugeroic.client import Client, DaemonError
+from eugeroic.drivers import active_reasons
+from eugeroic.server import Server
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "eugeroic.sock")
+    server = Server(path)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5.0)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(5.0)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_ping(server):
+    with Client(server.path) as client:
+        assert client.ping().startswith("eugeroic ")
+
+
+def test_lease_keeps_display_awake(server):
+    with Client(server.path) as client:
+        with client.lease("Cron job") as lease_id:
+            assert server.leases == {lease_id: "Cron job"}
+            assert active_reasons()["Cron job"] == 1
+        assert server.leases == {}
+    assert active_reasons()["Cron job"] == 0
+
+
+def test_leases_listed_across_clients(server):
+    with Client(server.path) as first, Client(server.path) as second:
+        a = first.acquire("First job")
+        b = second.acquire("Second job")
+        assert first.leases() == {a: "First job", b: "Second job"}
+
+
+def test_leases_released_when_client_disconnects(server):
+    client = Client(server.path)
+    client.acquire("Crashed job")
+    client.acquire("Crashed job")
+    assert len(server.leases) == 2
+    client.close()
+    assert _wait_for(lambda: server.leases == {})
+    assert _wait_for(lambda: active_reasons()["Crashed job"] == 0)
+
+
+def test_leases_released_when_client_process_dies(server):
+    script = (
+        "import os, sys\n"
+        "from eugeroic.client import Client\n"
+        f"client = Client({server.path!r})\n"
+        "client.acquire('Killed job')\n"
+        "print('acquired', flush=True)\n"
+        "sys.stdin.read()\n"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", script],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert process.stdout.readline().strip() == "acquired"
+        assert list(server.leases.values()) == ["Killed job"]
+        process.kill()
+        process.wait()
+        assert _wait_for(lambda: server.leases == {})
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_cannot_release_another_clients_lease(server):
+    with Client(server.path) as owner, Client(server.path) as other:
+        lease_id = owner.acquire("Owned")
+        with pytest.raises(DaemonError):
+            other.release(lease_id)
+        assert server.leases == {lease_id: "Owned"}
+
+
+def test_unknown_command_is_an_error(server):
+    with Client(server.path) as client:
+        with pytest.raises(DaemonError):
+            client._request("FROBNICATE")
+        assert client.ping()
+
+
+def test_second_daemon_refuses_to_start(server):
+    with pytest.raises(OSError):
+        asyncio.run(Server(server.path).start())
+
+
+def test_status_command_lists_leases(server):
+    with Client(server.path) as client, client.lease("Listed"):
+        result = subprocess.run(
+            [sys.executable, "-m", "eugeroic", "status", "--socket", server.path],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    assert "Listed" in result.stdout
+
+
+def test_socket_is_private(server):
+    assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600
+
+
+def test_default_socket_directory_is_created_private(tmp_path, monkeypatch):
+    monkeypatch.delenv("EUGEROIC_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+
+    async def serve():
+        server = Server()
+        await server.start()
+        try:
+            return await asyncio.to_thread(lambda: Client().ping())
+        finally:
+            await server.close()
+
+    assert asyncio.run(serve()).startswith("eugeroic ")
+    assert stat.S_IMODE(os.stat(tmp_path / "run").st_mode) == 0o700
+
+
+def test_shared_default_socket_directory_is_refused(tmp_path, monkeypatch):
+    monkeypatch.delenv("EUGEROIC_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    tmp_path.chmod(0o777)
+    try:
+        with pytest.raises(PermissionError):
+            Client()
+        with pytest.raises(PermissionError):
+            asyncio.run(Server().start())
+    finally:
+        tmp_path.chmod(0o700)
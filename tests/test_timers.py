@@ -0,0 +1,31 @@
+import threading
+
+from eugeroic.drivers.timers import TimerThread
+
+
+def test_callbacks_run_in_order_of_due_time():
+    timers = TimerThread()
+    order = []
+    done = threading.Event()
+    timers.call_later(0.1, lambda: (order.append("late"), done.set()))
+    timers.call_later(0.01, order.append, "early")
+    assert done.wait(2.0)
+    assert order == ["early", "late"]
+
+
+def test_cancelled_callback_is_not_run():
+    timers = TimerThread()
+    called = []
+    done = threading.Event()
+    timers.call_later(0.01, called.append, "cancelled").cancel()
+    timers.call_later(0.05, done.set)
+    assert done.wait(2.0)
+    assert called == []
+
+
+def test_failing_callback_does_not_stop_the_thread():
+    timers = TimerThread()
+    done = threading.Event()
+    timers.call_later(0.0, lambda: 1 / 0)
+    timers.call_later(0.01, done.set)
+    assert done.wait(2.0)
@@ -36,3 +36,12 @@ def test_wakefulness_logging_on_exit_negative(caplog):
     with wakefulness("A test message"):
         time.sleep(0.1)
         assert "Exiting wakefulness state after: 'A test message'" not in caplog.text
+
+
+def test_held_wakefulness_consumes_no_cpu():
+    with wakefulness("An idle test message"):
+        cpu_start = time.process_time()
+        time.sleep(1.0)
+        cpu_held = time.process_time() - cpu_start
+    # A spinning wait would consume close to a full second of CPU time
+    assert cpu_held < 0.1